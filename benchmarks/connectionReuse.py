@@ -0,0 +1,86 @@
+import time
+from typing import Dict, List
+
+import fire
+
+from network.httpPool import HTTPPool
+from benchmarks.fakeServers import FakeTTSServer, make_self_signed_cert
+from benchmarks.stats import summarize
+
+
+def _first_byte(pool: HTTPPool, url: str) -> float:
+    """POST a TTS request and return seconds until the first audio byte"""
+    start = time.perf_counter()
+    elapsed = None
+    with pool.client.stream("POST", url, json={"text": "Connection reuse check."}) as response:
+        for _ in response.iter_bytes():
+            if elapsed is None:
+                elapsed = time.perf_counter() - start
+    return elapsed if elapsed is not None else time.perf_counter() - start
+
+
+def run_scenario(name: str, server: FakeTTSServer, certfile: str, turns: int, idle: float,
+                 keepalive_expiry: float, warm_lead: float = None, fresh_pool: bool = False) -> Dict:
+    url = f"{server.url}/v1/text-to-speech/voice"
+    samples: List[float] = []
+    pool = None
+    totals = {"requests": 0, "connections": 0, "tls_handshakes": 0, "warmups": 0}
+
+    for _ in range(turns):
+        if pool is None or fresh_pool:
+            if pool is not None:
+                for key in totals:
+                    totals[key] += pool.stats()[key]
+                pool.close()
+            pool = HTTPPool(keepalive_expiry=keepalive_expiry, verify=certfile, name=name)
+        if warm_lead is not None:
+            # Simulate the Enter press / wake word arriving shortly before the request
+            time.sleep(max(0.0, idle - warm_lead))
+            pool.warm([server.url], background=False)
+            time.sleep(warm_lead)
+        else:
+            time.sleep(idle)
+        samples.append(_first_byte(pool, url))
+
+    for key in totals:
+        totals[key] += pool.stats()[key]
+    pool.close()
+    totals["reuse_ratio"] = round(1 - totals["connections"] / totals["requests"], 3)
+    return {"first_byte": summarize({"first_byte": samples})["first_byte"], "stats": totals}
+
+
+def main(turns: int = 20, idle: float = 1.0, connect_delay: float = 0.05):
+    """Measure time to first byte and connection reuse against a local TLS stand-in
+
+    connect_delay simulates network round trips for TCP and TLS setup.
+
+    Example:
+        python -m benchmarks.connectionReuse --turns 30 --connect-delay 0.08
+    """
+    certfile, keyfile = make_self_signed_cert()
+    server = FakeTTSServer(first_byte_delay=0.05, chunk_delay=0.0, certfile=certfile,
+                           keyfile=keyfile, connect_delay=connect_delay).start()
+    try:
+        scenarios = {
+            # A new client per turn: full DNS/TCP/TLS setup every time
+            "fresh client": run_scenario("fresh", server, certfile, turns, idle, 5.0, fresh_pool=True),
+            # httpx defaults: pooled but idle connections expire before the next turn
+            "short keepalive": run_scenario("short", server, certfile, turns, idle, idle / 2),
+            # Shared pool with keepalive longer than the idle period
+            "shared pool": run_scenario("shared", server, certfile, turns, idle, 120.0),
+            # Connections expire between turns but are re-warmed before the request
+            "re-warmed": run_scenario("rewarm", server, certfile, turns, idle, idle / 2,
+                                      warm_lead=min(0.5, idle / 4)),
+        }
+    finally:
+        server.stop()
+
+    print(f"{'scenario':<18}{'p50 ms':>9}{'p95 ms':>9}{'conns':>7}{'tls':>6}{'reuse':>8}")
+    for name, result in scenarios.items():
+        fb, stats = result["first_byte"], result["stats"]
+        print(f"{name:<18}{fb['p50']:>9.1f}{fb['p95']:>9.1f}{stats['connections']:>7}"
+              f"{stats['tls_handshakes']:>6}{stats['reuse_ratio']:>8.2f}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,397 @@
+import re
+import json
+import time
+import ssl
+import random
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class _StreamingHandler(BaseHTTPRequestHandler):
+    """Request handler with helpers for JSON bodies and chunked responses"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        # Keep benchmark output clean
+        pass
+
+    @property
+    def fake(self) -> "FakeServer":
+        return self.server.fake
+
+    def do_HEAD(self) -> None:
+        # Used by connection warm-up
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        return json.loads(body) if body else {}
+
+    def _send_json(self, payload: Dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_chunked(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer with optional TLS and simulated connection-setup latency"""
+    daemon_threads = True
+    ssl_context: Optional[ssl.SSLContext] = None
+    connect_delay = 0.0
+
+    def finish_request(self, request, client_address) -> None:
+        # Runs on the connection's own thread, so setup delays overlap like real RTTs
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+        if self.ssl_context is not None:
+            try:
+                request = self.ssl_context.wrap_socket(request, server_side=True)
+            except (ssl.SSLError, OSError):
+                return
+            if self.connect_delay:
+                time.sleep(self.connect_delay)
+        super().finish_request(request, client_address)
+
+
+def make_self_signed_cert(directory: Optional[str] = None):
+    """Create a certificate for 127.0.0.1 with the openssl CLI; returns (certfile, keyfile)"""
+    directory = directory or tempfile.mkdtemp(prefix="dars-tls-")
+    certfile, keyfile = f"{directory}/cert.pem", f"{directory}/key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-keyout", keyfile, "-out", certfile, "-subj", "/CN=127.0.0.1",
+            "-addext", "subjectAltName=IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return certfile, keyfile
+
+
+class FakeServer:
+    """Threaded HTTP(S) server on a random localhost port that records request timings.
+
+    With certfile/keyfile it serves TLS; connect_delay (seconds) is added once
+    for TCP setup and once more for the TLS handshake of every new connection.
+    """
+
+    def __init__(
+        self,
+        handler_cls,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        slow_rate: float = 0.0,
+        slow_delay: float = 5.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        certfile: Optional[str] = None,
+        keyfile: Optional[str] = None,
+        connect_delay: float = 0.0,
+    ):
+        self.httpd = _FakeHTTPServer((host, port), handler_cls)
+        self.httpd.fake = self
+        self.httpd.connect_delay = connect_delay
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.httpd.ssl_context = context
+        self.requests: List[Dict] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Fault injection: a fraction of requests stall or fail
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        scheme = "https" if self.httpd.ssl_context else "http"
+        return f"{scheme}://{host}:{port}"
+
+    def record(self, path: str) -> Dict:
+        """Register an incoming request and return its timing record"""
+        entry = {"path": path, "received_at": time.perf_counter(), "first_chunk_at": None, "completed_at": None}
+        with self._lock:
+            self.requests.append(entry)
+        return entry
+
+    def inject_faults(self, handler: _StreamingHandler) -> bool:
+        """Apply injected delay; return True if an error response was sent instead"""
+        if self.slow_rate and random.random() < self.slow_rate:
+            time.sleep(self.slow_delay)
+        if self.error_rate and random.random() < self.error_rate:
+            handler._send_json({"error": {"message": "Injected failure"}}, status=self.error_status)
+            return True
+        return False
+
+    def start(self) -> "FakeServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class _OpenAIHandler(_StreamingHandler):
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "gpt-4o", "object": "model", "owned_by": "fake"}]})
+        else:
+            self._send_json({"error": {"message": "Not found"}}, status=404)
+
+    def do_POST(self) -> None:
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json({"error": {"message": "Not found"}}, status=404)
+            return
+
+        entry = self.fake.record(self.path)
+        body = self._read_json()
+        if self.fake.inject_faults(self):
+            return
+        reply, delays = self.fake.pick_reply(body.get("messages", []))
+        content, tool = self.fake.render_reply(reply, body)
+        model = body.get("model", "gpt-4o")
+
+        time.sleep(delays["first_token_delay"])
+
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": content}
+            if tool:
+                message.update(tool)
+            entry["first_chunk_at"] = time.perf_counter()
+            self._send_json({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": self.fake.finish_reason(tool)}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            entry["completed_at"] = time.perf_counter()
+            return
+
+        def chunk(delta: Dict, finish_reason: Optional[str] = None) -> bytes:
+            payload = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload)}\n\n".encode()
+
+        self._start_chunked("text/event-stream")
+        self._write_chunk(chunk({"role": "assistant", "content": ""}))
+        entry["first_chunk_at"] = time.perf_counter()
+
+        for token in re.findall(r"\S+\s*", content or ""):
+            self._write_chunk(chunk({"content": token}))
+            time.sleep(delays["token_delay"])
+        if tool:
+            self._write_chunk(chunk(tool))
+
+        self._write_chunk(chunk({}, self.fake.finish_reason(tool)))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._end_chunked()
+        entry["completed_at"] = time.perf_counter()
+
+
+class FakeOpenAIServer(FakeServer):
+    """Local OpenAI-compatible chat completions server answering from a script.
+
+    Each script entry has a "match" substring for the turn's user utterance and a list of
+    "replies", used in order for the successive LLM calls of that turn. A reply is either
+    a string or {"content": ..., "tool": {"name": ..., "arguments": {...}}}. Entries may
+    override first_token_delay and token_delay (seconds).
+
+    Entries with "exact": True only answer an utterance equal to "match", and each one
+    answers a single turn: entries for the same utterance are used in script order, the
+    last one repeating once the others are spent. A turn's first call (no assistant
+    message after the utterance yet) moves on to the next entry, so this assumes the
+    client neither retries nor hedges.
+    """
+
+    def __init__(
+        self,
+        script: Optional[List[Dict]] = None,
+        default_reply: str = "Understood.",
+        first_token_delay: float = 0.3,
+        token_delay: float = 0.02,
+        **kwargs,
+    ):
+        super().__init__(_OpenAIHandler, **kwargs)
+        self.script = script or []
+        self.default_reply = default_reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        # utterance -> exact entries not used yet, and the entry answering its current turn
+        self._pending: Dict[str, List[Dict]] = {}
+        self._current: Dict[str, Dict] = {}
+        for entry in self.script:
+            if entry.get("exact"):
+                self._pending.setdefault(entry["match"], []).append(entry)
+
+    @staticmethod
+    def is_tool_request(message: Dict) -> bool:
+        """Whether an assistant message called a tool, natively or in langroid's JSON format"""
+        if message.get("role") != "assistant":
+            return False
+        return bool(message.get("tool_calls") or message.get("function_call")) \
+            or '"request"' in (message.get("content") or "")
+
+    def pick_reply(self, messages: List[Dict]):
+        """Choose the scripted reply for the conversation so far.
+
+        The turn starts at the latest user utterance. In langroid's JSON tool
+        mode tool results come back as user messages; those follow a tool
+        request and do not start a new turn.
+        """
+        utterance = -1
+        for i, m in enumerate(messages):
+            if m.get("role") == "user" and not (i > 0 and self.is_tool_request(messages[i - 1])):
+                utterance = i
+        user_text = (messages[utterance].get("content") or "") if utterance >= 0 else ""
+        calls_this_turn = sum(1 for m in messages[utterance + 1:] if m.get("role") == "assistant")
+
+        entry = self._exact_entry(user_text, calls_this_turn)
+        if entry is not None:
+            return self._scripted_reply(entry, calls_this_turn)
+
+        for entry in self.script:
+            if not entry.get("exact") and entry.get("match", "").lower() in user_text.lower():
+                return self._scripted_reply(entry, calls_this_turn)
+
+        return self.default_reply, {"first_token_delay": self.first_token_delay, "token_delay": self.token_delay}
+
+    def _exact_entry(self, user_text: str, calls_this_turn: int) -> Optional[Dict]:
+        """The exact entry answering this turn; a turn's first call takes the next queued one"""
+        with self._lock:
+            queue = self._pending.get(user_text)
+            if queue and (calls_this_turn == 0 or user_text not in self._current):
+                self._current[user_text] = queue.pop(0)
+            return self._current.get(user_text)
+
+    def _scripted_reply(self, entry: Dict, calls_this_turn: int):
+        replies = entry.get("replies") or [self.default_reply]
+        reply = replies[min(calls_this_turn, len(replies) - 1)]
+        return reply, {
+            "first_token_delay": entry.get("first_token_delay", self.first_token_delay),
+            "token_delay": entry.get("token_delay", self.token_delay),
+        }
+
+    @staticmethod
+    def render_reply(reply, body: Dict):
+        """Return (content, tool delta) in whichever tool format the client asked for"""
+        if isinstance(reply, str):
+            return reply, None
+
+        content = reply.get("content") or ""
+        tool = reply.get("tool")
+        if not tool:
+            return content, None
+
+        arguments = json.dumps(tool.get("arguments", {}))
+        if body.get("tools"):
+            return content, {"tool_calls": [{
+                "index": 0,
+                "id": "call_fake",
+                "type": "function",
+                "function": {"name": tool["name"], "arguments": arguments},
+            }]}
+        if body.get("functions"):
+            return content, {"function_call": {"name": tool["name"], "arguments": arguments}}
+
+        # Langroid's JSON tool format inside the message content
+        return content + json.dumps({"request": tool["name"], **tool.get("arguments", {})}), None
+
+    @staticmethod
+    def finish_reason(tool: Optional[Dict]) -> str:
+        if not tool:
+            return "stop"
+        return "tool_calls" if "tool_calls" in tool else "function_call"
+
+
+class _TTSHandler(_StreamingHandler):
+    def do_POST(self) -> None:
+        if not re.match(r"^/v1/text-to-speech/[^/]+(/stream)?/?(\?.*)?$", self.path):
+            self._send_json({"detail": "Not found"}, status=404)
+            return
+
+        entry = self.fake.record(self.path)
+        text = self._read_json().get("text", "")
+        if self.fake.inject_faults(self):
+            return
+        audio = self.fake.audio_for(text)
+
+        time.sleep(self.fake.first_byte_delay)
+        self._start_chunked("audio/mpeg")
+        for i in range(0, len(audio), self.fake.chunk_size):
+            self._write_chunk(audio[i:i + self.fake.chunk_size])
+            if entry["first_chunk_at"] is None:
+                entry["first_chunk_at"] = time.perf_counter()
+            time.sleep(self.fake.chunk_delay)
+        self._end_chunked()
+        entry["completed_at"] = time.perf_counter()
+
+
+class FakeTTSServer(FakeServer):
+    """Local stand-in for the ElevenLabs text-to-speech endpoint.
+
+    Streams `audio` (or silence sized roughly like 128 kbps speech) after
+    `first_byte_delay`, with `chunk_delay` between chunks.
+    """
+
+    def __init__(
+        self,
+        audio: Optional[bytes] = None,
+        first_byte_delay: float = 0.2,
+        chunk_delay: float = 0.01,
+        chunk_size: int = 4096,
+        bytes_per_char: int = 1000,
+        **kwargs,
+    ):
+        super().__init__(_TTSHandler, **kwargs)
+        self.audio = audio
+        self.first_byte_delay = first_byte_delay
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.bytes_per_char = bytes_per_char
+
+    def audio_for(self, text: str) -> bytes:
+        if self.audio is not None:
+            return self.audio
+        return bytes(max(1, len(text)) * self.bytes_per_char)
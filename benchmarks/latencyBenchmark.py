@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fire
+
+from main import DARSVoiceInterface
+from languageModel.llm import DARSAgent
+from speechRecognition.speechRecognition import WavSpeechRecognizer
+from speechRecognition.batchTranscription import DEFAULT_MODEL_PATH
+from speechSynthesis.speechSynthesis import TarsVoice
+from telemetry.tracing import tracer
+from benchmarks.fakeServers import FakeOpenAIServer, FakeTTSServer
+from benchmarks.stats import summarize
+
+# Reported stages, all in seconds per turn
+STAGES = [
+    "endpoint_delay",     # last voiced audio block -> recognizer returns
+    "llm_first_token",    # recognizer returns -> first streamed LLM chunk
+    "tool_time",          # total time spent in ToolMessage.handle
+    "tts_first_byte",     # TTS call -> first audio byte (after hedging)
+    "tts_first_sound",    # TTS call -> playback would start
+    "response_latency",   # last voiced audio block -> playback would start
+]
+
+
+def check_thresholds(summary: Dict, thresholds: Dict) -> List[str]:
+    """Return a message for every stage statistic above its threshold (ms)"""
+    violations = []
+    for stage, limits in thresholds.items():
+        for stat, limit in limits.items():
+            value = summary.get(stage, {}).get(stat)
+            if value is not None and value > limit:
+                violations.append(f"{stage} {stat} {value:.1f}ms exceeds {limit:.1f}ms")
+    return violations
+
+
+class BenchmarkPlayer:
+    """Stand-in for elevenlabs.play that timestamps the audio stream instead of playing it"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.started_at = None
+        self.first_byte_at = None
+        self.first_sound_at = None
+        self.audio = b""
+
+    def __call__(self, audio) -> None:
+        self.started_at = time.perf_counter()
+        chunks = []
+        for chunk in audio:
+            if self.first_byte_at is None:
+                self.first_byte_at = time.perf_counter()
+            chunks.append(chunk)
+        # elevenlabs.play buffers the whole clip before the player starts
+        self.audio = b"".join(chunks)
+        self.first_sound_at = time.perf_counter()
+
+
+class TurnCollector:
+    """Tracer exporter keeping finished turns in memory"""
+
+    def __init__(self):
+        self.turns = []
+
+    def export(self, turn) -> None:
+        self.turns.append(turn)
+
+
+def load_scenario(scenario_file: str) -> Dict:
+    """Load a scenario and resolve WAV paths relative to the scenario file"""
+    path = Path(scenario_file)
+    scenario = json.loads(path.read_text())
+    for turn in scenario["turns"]:
+        turn["wav"] = str((path.parent / turn["wav"]).resolve())
+    return scenario
+
+
+def check_recordings(scenario: Dict, scenario_file: str) -> None:
+    missing = [turn["wav"] for turn in scenario["turns"] if not Path(turn["wav"]).exists()]
+    if missing:
+        raise FileNotFoundError(
+            f"Missing recordings: {', '.join(missing)}. Create them with "
+            f"python -m benchmarks.recordScenario {scenario_file} (add --synthetic without a microphone)"
+        )
+
+
+def run_benchmark(
+    scenario_file: str,
+    repeat: int = 1,
+    realtime: bool = True,
+    model_path: str = DEFAULT_MODEL_PATH,
+) -> Dict:
+    """Drive DARSVoiceInterface over the scenario's WAV files against local fake servers"""
+    scenario = load_scenario(scenario_file)
+    check_recordings(scenario, scenario_file)
+    turns = scenario["turns"] * repeat
+    script = [{k: v for k, v in turn.items() if k not in ("wav", "text")} for turn in scenario["turns"] if "match" in turn]
+
+    # The fake servers accept any key; langroid and the ElevenLabs client only need one set
+    os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark")
+
+    llm_server = FakeOpenAIServer(script, **scenario.get("llm", {})).start()
+    tts_server = FakeTTSServer(**scenario.get("tts", {})).start()
+    collector = TurnCollector()
+    tracer.exporters.append(collector)
+    # Fake audio must not reach the real TTS fallback cache
+    tts_cache = tempfile.TemporaryDirectory(prefix="dars-bench-tts-")
+
+    try:
+        recognizer = WavSpeechRecognizer([t["wav"] for t in turns], model_path=model_path, realtime=realtime)
+        player = BenchmarkPlayer()
+        interface = DARSVoiceInterface(
+            dars=DARSAgent(api_key="benchmark", api_base=f"{llm_server.url}/v1", no_cache=True),
+            speech_recognizer=recognizer,
+            tars_voice=TarsVoice(base_url=tts_server.url, player=player, cache_dir=tts_cache.name),
+        )
+
+        samples = {stage: [] for stage in STAGES}
+        per_turn = []
+        for turn in turns:
+            player.reset()
+            llm_mark = len(llm_server.requests)
+
+            interface.run_turn()
+
+            llm_requests = llm_server.requests[llm_mark:]
+            spans = collector.turns[-1].spans
+            tool_spans = [span for span in spans if span.name.startswith("tool.")]
+            tts_span = next((span for span in reversed(spans) if span.name == "tts.generate_speech"), None)
+            result = {
+                "wav": turn["wav"],
+                "endpoint_delay": recognizer.endpoint_delay,
+                "llm_first_token": (
+                    llm_requests[0]["first_chunk_at"] - recognizer.returned_at
+                    if llm_requests and llm_requests[0]["first_chunk_at"] else None
+                ),
+                "tool_time": sum(span.duration for span in tool_spans) if tool_spans else None,
+                "tts_first_byte": (
+                    tts_span.attributes["first_byte_ms"] / 1000
+                    if tts_span and "first_byte_ms" in tts_span.attributes else None
+                ),
+                "tts_first_sound": (
+                    player.first_sound_at - tts_span.start if tts_span and player.first_sound_at else None
+                ),
+                "response_latency": (
+                    player.first_sound_at - recognizer.last_voiced_at
+                    if player.first_sound_at and recognizer.last_voiced_at else None
+                ),
+            }
+            per_turn.append(result)
+            for stage in STAGES:
+                if result[stage] is not None:
+                    samples[stage].append(result[stage])
+    finally:
+        tracer.exporters.remove(collector)
+        llm_server.stop()
+        tts_server.stop()
+        tts_cache.cleanup()
+
+    return {"summary": summarize(samples), "turns": per_turn}
+
+
+def print_summary(summary: Dict) -> None:
+    print(f"{'stage':<20}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}")
+    for stage in STAGES:
+        if stage in summary:
+            s = summary[stage]
+            print(f"{stage:<20}{s['n']:>5}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}{s['mean']:>10.1f}")
+    print("(all times in ms)")
+
+
+def main(
+    scenario_file: str,
+    repeat: int = 1,
+    realtime: bool = True,
+    thresholds: Optional[str] = None,
+    output: Optional[str] = None,
+    model_path: str = DEFAULT_MODEL_PATH,
+):
+    """Run the end-to-end latency benchmark fully offline
+
+    Example:
+        python -m benchmarks.latencyBenchmark benchmarks/scenarios.example.json \\
+            --repeat 5 --thresholds benchmarks/thresholds.json
+
+    Exits with status 1 when a stage exceeds its regression threshold.
+    Create the scenario's recordings first with benchmarks.recordScenario.
+    Needs no network access once tiktoken's encoding cache is populated.
+    """
+    report = run_benchmark(scenario_file, repeat, realtime, model_path)
+    print_summary(report["summary"])
+
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2))
+
+    if thresholds:
+        violations = check_thresholds(report["summary"], json.loads(Path(thresholds).read_text()))
+        for violation in violations:
+            print("REGRESSION:", violation)
+        if violations:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
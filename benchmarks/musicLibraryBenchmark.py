@@ -0,0 +1,145 @@
+import os
+import time
+import wave
+import random
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import fire
+import pygame
+
+from music.musicLibrary import MusicLibrary, MusicPlayer
+from benchmarks.stats import summarize
+
+SYLLABLES = ["ka", "ri", "mo", "zu", "te", "lan", "vo", "shi", "da", "pe", "no", "gra", "xi", "bel", "tor", "qua"]
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+
+
+def _write_wav(path: Path, seconds: float, rate: int = 22050) -> None:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(bytes(int(seconds * rate) * 2))
+
+
+def build_library(directory: Path, tracks: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """Write `tracks` short WAVs as <artist>/<artist> - <title>.wav; returns (artist, title) pairs"""
+    rng = random.Random(seed)
+    artists = [f"{_word(rng)} {_word(rng)}".title() for _ in range(max(1, tracks // 12))]
+    names = [("Daft Punk", "Veridis Quo")]
+    while len(names) < tracks:
+        names.append((rng.choice(artists), " ".join(_word(rng) for _ in range(rng.randint(1, 4))).title()))
+    for artist, title in names:
+        folder = directory / artist
+        folder.mkdir(parents=True, exist_ok=True)
+        _write_wav(folder / f"{artist} - {title}.wav", 0.05)
+    return names
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + rng.choice("aeiou") + word[i + 1:]
+
+
+def spoken_queries(names: List[Tuple[str, str]], count: int, seed: int = 1) -> List[Tuple[str, str]]:
+    """(query, expected title) pairs phrased like requests, some with recognizer-style slips"""
+    rng = random.Random(seed)
+    queries = []
+    for artist, title in rng.sample(names, min(count, len(names))):
+        style = rng.randrange(3)
+        if style == 0:
+            query = f"play {title}"
+        elif style == 1:
+            query = f"play {title} by {artist}"
+        else:
+            query = "play " + " ".join(_typo(w, rng) for w in title.lower().split()) + f" by {artist}"
+        queries.append((query, title))
+    return queries
+
+
+def time_first_sound(path: str, repeat: int) -> Dict[str, Dict]:
+    """Seconds from request to playback start for the old and new playback paths"""
+    samples = {"reinit_mixer": [], "persistent_stream": [], "full_decode": []}
+    for _ in range(repeat):
+        # Previous SongPlayerTool: a fresh mixer for every request
+        start = time.perf_counter()
+        pygame.mixer.init()
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.play()
+        samples["reinit_mixer"].append(time.perf_counter() - start)
+        pygame.mixer.music.stop()
+        pygame.mixer.quit()
+
+    player = MusicPlayer()
+    player.play({"path": path})  # Opens the mixer once, as on the first request
+    player.stop()
+    for _ in range(repeat):
+        samples["persistent_stream"].append(player.play({"path": path}))
+        player.stop()
+
+    for _ in range(repeat):
+        # Decoding the whole file up front, as pygame.mixer.Sound does
+        start = time.perf_counter()
+        sound = pygame.mixer.Sound(path)
+        sound.play()
+        samples["full_decode"].append(time.perf_counter() - start)
+        sound.stop()
+    pygame.mixer.quit()
+    return summarize(samples)
+
+
+def main(tracks: int = 10000, queries: int = 300, long_track_seconds: float = 600.0, repeat: int = 5,
+         directory: str = None):
+    """Measure library scan time, lookup latency/accuracy and time to first sound
+
+    Example:
+        SDL_AUDIODRIVER=dummy python -m benchmarks.musicLibraryBenchmark --tracks 20000
+    """
+    root = Path(directory or tempfile.mkdtemp(prefix="dars-music-"))
+    music_dir, index = root / "music", root / "music_index.sqlite"
+    music_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Writing {tracks} tracks to {music_dir} ...")
+    names = build_library(music_dir, tracks)
+
+    library = MusicLibrary(music_dir, index)
+    cold = library.scan()
+    warm = library.scan()
+    touched = random.Random(2).sample(sorted(music_dir.rglob("*.wav")), max(1, tracks // 100))
+    for path in touched:
+        os.utime(path)
+    incremental = library.scan()
+    reopened_start = time.perf_counter()
+    MusicLibrary(music_dir, index)
+    reopened = time.perf_counter() - reopened_start
+
+    print(f"Cold scan:        {cold['seconds']:.2f}s ({cold['added']} added)")
+    print(f"Unchanged rescan: {warm['seconds']:.2f}s")
+    print(f"Rescan, 1% touched: {incremental['seconds']:.2f}s ({incremental['updated']} updated)")
+    print(f"Open existing index: {reopened:.2f}s")
+
+    latencies, hits = [], 0
+    cases = spoken_queries(names, queries)
+    for query, title in cases:
+        start = time.perf_counter()
+        results = library.find(query, limit=1)
+        latencies.append(time.perf_counter() - start)
+        hits += bool(results) and results[0][1]["title"].lower() == title.lower()
+    lookup = summarize({"lookup": latencies})["lookup"]
+    print(f"Lookup: p50 {lookup['p50']:.1f} ms, p95 {lookup['p95']:.1f} ms, top-1 accuracy {hits / len(cases):.1%}")
+
+    long_track = root / "long_track.wav"
+    _write_wav(long_track, long_track_seconds)
+    print(f"Time to first sound, {long_track_seconds:.0f}s WAV ({long_track.stat().st_size / 1e6:.0f} MB):")
+    for mode, stats in time_first_sound(str(long_track), repeat).items():
+        print(f"  {mode:<18} p50 {stats['p50']:>8.1f} ms  p95 {stats['p95']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
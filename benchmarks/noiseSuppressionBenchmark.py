@@ -0,0 +1,199 @@
+import sys
+import json
+import time
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fire
+import numpy as np
+from vosk import Model, SetLogLevel
+
+from speechRecognition.speechRecognition import ClipSpeechRecognizer
+from speechRecognition.noiseSuppression import NoiseSuppressor
+from speechRecognition.batchTranscription import DEFAULT_MODEL_PATH, BLOCK_FRAMES, transcribe_file
+from benchmarks.stats import summarize
+
+SAMPLE_RATE = 16000
+
+
+def read_wav(path: str) -> np.ndarray:
+    """16 kHz mono int16 WAV as float samples in [-1, 1]"""
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"{path}: audio must be 16 kHz mono 16-bit PCM")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def synthetic_fan_noise(samples: int, seed: int = 0) -> np.ndarray:
+    """Box-fan stand-in: low-frequency rumble, broadband hiss and blade-rate hum"""
+    rng = np.random.default_rng(seed)
+    rumble = np.cumsum(rng.standard_normal(samples))
+    rumble -= np.convolve(rumble, np.ones(400) / 400, mode="same")
+    t = np.arange(samples) / SAMPLE_RATE
+    hum = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate([120, 240, 360], start=1))
+    noise = rumble / np.abs(rumble).max() + 0.3 * rng.standard_normal(samples) + 0.2 * hum
+    return (noise / np.sqrt(np.mean(noise ** 2))).astype(np.float32)
+
+
+def mix(speech: np.ndarray, noise: np.ndarray, snr_db: float, trailing: float) -> np.ndarray:
+    """Speech followed by `trailing` seconds of silence, with noise at `snr_db` throughout"""
+    clean = np.concatenate([speech, np.zeros(int(trailing * SAMPLE_RATE), dtype=np.float32)])
+    noise = np.resize(noise, len(clean))
+    speech_power = np.mean(speech ** 2)
+    noise = noise * np.sqrt(speech_power / (np.mean(noise ** 2) * 10 ** (snr_db / 10)))
+    return np.clip(clean + noise, -1.0, 1.0)
+
+
+def to_pcm(samples: np.ndarray) -> bytes:
+    return (samples * 32767).astype(np.int16).tobytes()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length"""
+    ref, hyp = reference.split(), hypothesis.split()
+    if not ref:
+        return float(bool(hyp))
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, start=1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, start=1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return row[-1] / len(ref)
+
+
+def suppression_rtf(clip: bytes) -> float:
+    """Single-core NoiseSuppressor processing time per second of audio"""
+    suppressor = NoiseSuppressor()
+    block_bytes = BLOCK_FRAMES * 2
+    start = time.perf_counter()
+    for i in range(0, len(clip), block_bytes):
+        suppressor.process(clip[i:i + block_bytes])
+    return (time.perf_counter() - start) / (len(clip) / 2 / SAMPLE_RATE)
+
+
+def recognize(clips: List[bytes], model_path: str, suppress: bool) -> List[Dict]:
+    """Run clips through the live recognition loop; endpoint timing is in audio seconds.
+
+    Every clip gets a fresh Kaldi recognizer and NoiseSuppressor, so neither a
+    learned noise profile nor decoder state carries over from the previous case.
+    """
+    recognizer = ClipSpeechRecognizer(clips, model_path=model_path, realtime=False, trailing_silence=0.0)
+    consumed = 0
+
+    def tap(data: bytes) -> None:
+        nonlocal consumed
+        consumed += len(data)
+
+    recognizer.audio_tap = tap
+    results = []
+    for clip in clips:
+        recognizer.recycle()
+        recognizer.noise_suppressor = NoiseSuppressor() if suppress else None
+        consumed = 0
+        start = time.perf_counter()
+        text = recognizer.listen()
+        results.append({
+            "text": text,
+            "consumed": consumed / 2 / SAMPLE_RATE,
+            "endpointed": consumed < len(clip),
+            "rtf": (time.perf_counter() - start) / (len(clip) / 2 / SAMPLE_RATE),
+        })
+    return results
+
+
+def main(
+    *wav_files: str,
+    noise: tuple = (),
+    snr: tuple = (20, 10, 5, 0),
+    trailing: float = 3.0,
+    model_path: str = DEFAULT_MODEL_PATH,
+    output: Optional[str] = None,
+    check_order: bool = True,
+):
+    """Compare WER, endpoint delay and CPU cost with and without noise suppression
+
+    Each speech WAV (16 kHz mono, ideally recorded clean) is mixed with every
+    noise WAV (e.g. a recording of the room fan or music; a synthetic fan is
+    used if none are given) at each SNR. Reference transcripts come from a
+    sidecar <name>.txt, or from recognizing the clean WAV. With check_order the
+    cases are recognized again in reverse order, and the run fails (exit status
+    1) if any transcript or endpoint changes.
+
+    Example:
+        python -m benchmarks.noiseSuppressionBenchmark recordings/*.wav --noise noise/fan.wav,noise/music.wav --snr 10,5,0
+    """
+    SetLogLevel(-1)
+    noise = [noise] if isinstance(noise, str) else list(noise)
+    snr = [snr] if isinstance(snr, (int, float)) else list(snr)
+    model = Model(model_path)
+
+    speech = {}
+    for path in wav_files:
+        sidecar = Path(path).with_suffix(".txt")
+        reference = sidecar.read_text().strip().lower() if sidecar.exists() else transcribe_file(path, model)["text"]
+        speech[path] = (read_wav(path), reference)
+    longest = max(len(s) for s, _ in speech.values()) + int(trailing * SAMPLE_RATE)
+    noises = {Path(n).stem: read_wav(n) for n in noise} or {"synthetic_fan": synthetic_fan_noise(longest)}
+
+    cases = [
+        {"wav": path, "noise": name, "snr": level, "reference": reference,
+         "speech_seconds": len(samples) / SAMPLE_RATE,
+         "clip": to_pcm(mix(samples, noise_samples, level, trailing))}
+        for name, noise_samples in noises.items()
+        for level in snr
+        for path, (samples, reference) in speech.items()
+    ]
+    clips = [case["clip"] for case in cases]
+    suppressor_rtf = [suppression_rtf(clip) for clip in clips]
+
+    rows = []
+    order_changes = 0
+    for suppress in (False, True):
+        results = recognize(clips, model_path, suppress)
+        if check_order:
+            reversed_results = recognize(clips[::-1], model_path, suppress)[::-1]
+            for case, result, again in zip(cases, results, reversed_results):
+                if (result["text"], result["consumed"]) != (again["text"], again["consumed"]):
+                    order_changes += 1
+                    print(f"Order-dependent result: {case['wav']} {case['noise']} {case['snr']} dB "
+                          f"suppression {'on' if suppress else 'off'}: {result['text']!r} vs {again['text']!r}")
+        for case, result in zip(cases, results):
+            rows.append({
+                "wav": case["wav"],
+                "noise": case["noise"],
+                "snr": case["snr"],
+                "suppression": suppress,
+                "reference": case["reference"],
+                "text": result["text"],
+                "wer": round(word_error_rate(case["reference"], result["text"]), 3),
+                "endpoint_delay": round(result["consumed"] - case["speech_seconds"], 3),
+                "endpointed": result["endpointed"],
+                "recognizer_rtf": round(result["rtf"], 4),
+            })
+
+    print(f"NoiseSuppressor RTF: mean {np.mean(suppressor_rtf):.4f}, max {np.max(suppressor_rtf):.4f} (single core)")
+    print(f"{'noise':<16}{'snr':>5}{'mode':>8}{'WER':>7}{'endpoint p50':>14}{'p95 ms':>9}{'missed':>8}{'RTF':>8}")
+    for name in noises:
+        for level in snr:
+            for suppress in (False, True):
+                group = [r for r in rows if r["noise"] == name and r["snr"] == level and r["suppression"] == suppress]
+                delays = summarize({"endpoint": [r["endpoint_delay"] for r in group]})["endpoint"]
+                print(
+                    f"{name:<16}{level:>5}{'on' if suppress else 'off':>8}"
+                    f"{np.mean([r['wer'] for r in group]):>7.2f}{delays['p50']:>14.0f}{delays['p95']:>9.0f}"
+                    f"{sum(not r['endpointed'] for r in group):>8}{np.mean([r['recognizer_rtf'] for r in group]):>8.3f}"
+                )
+
+    if output:
+        with open(output, "w") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+    if order_changes:
+        print(f"FAIL: {order_changes} results changed with the case order")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
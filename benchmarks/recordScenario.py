@@ -0,0 +1,87 @@
+import math
+import wave
+import array
+import random
+from pathlib import Path
+from typing import Dict, List
+
+import fire
+
+from benchmarks.latencyBenchmark import load_scenario
+
+SAMPLE_RATE = 16000
+
+
+def write_wav(path: str, pcm: bytes) -> None:
+    """16 kHz mono 16-bit PCM, the format WavSpeechRecognizer accepts"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm)
+
+
+def synthetic_utterance(text: str, seed: int = 0) -> bytes:
+    """Speech-shaped placeholder for `text`: one voiced burst per word, then a short pause.
+
+    Loud enough to count as voiced and as long as the words would take, so
+    endpointing, LLM and TTS timings behave like a real turn. It is not
+    speech: Vosk won't transcribe it as `text`.
+    """
+    rng = random.Random(seed)
+    samples = array.array("h")
+    for _ in text.split() or [""]:
+        pitch = rng.uniform(100, 180)
+        n = int(SAMPLE_RATE * rng.uniform(0.2, 0.35))
+        for i in range(n):
+            t = i / SAMPLE_RATE
+            envelope = math.sin(math.pi * i / n)
+            tone = sum(math.sin(2 * math.pi * pitch * k * t) / k for k in range(1, 6))
+            samples.append(int(6000 * envelope * tone))
+        samples.extend([0] * int(SAMPLE_RATE * 0.08))
+    samples.extend([0] * int(SAMPLE_RATE * 0.3))
+    return samples.tobytes()
+
+
+def record_utterance(text: str, seconds: float) -> bytes:
+    """Prompt for `text` and record it from the default microphone"""
+    import sounddevice as sd
+
+    input(f'\nPress Enter, then say: "{text}"')
+    audio = sd.rec(int(seconds * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=1, dtype="int16")
+    sd.wait()
+    return audio.tobytes()
+
+
+def missing_recordings(scenario: Dict) -> List[Dict]:
+    return [turn for turn in scenario["turns"] if not Path(turn["wav"]).exists()]
+
+
+def main(scenario_file: str, synthetic: bool = False, overwrite: bool = False, seconds: float = 4.0):
+    """Create the WAV files a latency benchmark scenario refers to
+
+    Example:
+        python -m benchmarks.recordScenario benchmarks/scenarios.example.json
+        python -m benchmarks.recordScenario benchmarks/scenarios.example.json --synthetic
+
+    Each turn's "text" is what its recording should say. By default every
+    missing file is recorded from the microphone. --synthetic writes
+    speech-shaped placeholders instead, for machines without one: stage
+    timings stay meaningful, but the transcripts won't match the scenario,
+    so turns get the catch-all reply rather than their tool calls.
+    """
+    scenario = load_scenario(scenario_file)
+    turns = scenario["turns"] if overwrite else missing_recordings(scenario)
+    for i, turn in enumerate(turns):
+        text = turn.get("text")
+        if not text:
+            print(f"Skipping {turn['wav']}: the turn has no \"text\"")
+            continue
+        pcm = synthetic_utterance(text, seed=i) if synthetic else record_utterance(text, seconds)
+        write_wav(turn["wav"], pcm)
+        print(f"Wrote {turn['wav']}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,89 @@
+import os
+import time
+import tempfile
+from typing import Dict, List
+
+import fire
+
+from languageModel.llm import DARSAgent
+from speechSynthesis.speechSynthesis import TarsVoice
+from telemetry.tracing import tracer
+from benchmarks.fakeServers import FakeOpenAIServer, FakeTTSServer
+from benchmarks.latencyBenchmark import BenchmarkPlayer, TurnCollector
+from benchmarks.stats import summarize
+
+
+def _tts_first_bytes(voice: TarsVoice, collector: TurnCollector, requests: int) -> List[float]:
+    """Speak `requests` distinct phrases and return time to first byte per call"""
+    samples = []
+    for i in range(requests):
+        voice.generate_speech(f"Resilience check phrase number {i}.")
+        span = collector.turns[-1].spans[-1]
+        if "first_byte_ms" in span.attributes:
+            samples.append(span.attributes["first_byte_ms"] / 1000)
+    return samples
+
+
+def check_tts_tail(requests: int = 60, slow_rate: float = 0.1, slow_delay: float = 2.0) -> Dict:
+    """Time to first byte with and without hedging when some requests stall"""
+    results = {}
+    for hedge in (False, True):
+        collector = TurnCollector()
+        tracer.exporters.append(collector)
+        with FakeTTSServer(first_byte_delay=0.1, slow_rate=slow_rate, slow_delay=slow_delay) as server, \
+                tempfile.TemporaryDirectory(prefix="dars-bench-tts-") as tts_cache:
+            voice = TarsVoice(base_url=server.url, player=BenchmarkPlayer(), budget=slow_delay * 2, cache_dir=tts_cache)
+            voice.guard.hedge = hedge
+            voice.guard.tracker.min_samples = 10
+            samples = _tts_first_bytes(voice, collector, requests)
+        tracer.exporters.remove(collector)
+        results["hedged" if hedge else "single"] = summarize({"tts_first_byte": samples})["tts_first_byte"]
+    return results
+
+
+def check_tts_outage(requests: int = 10) -> List[float]:
+    """Wall time per generate_speech call while the TTS upstream always fails"""
+    durations = []
+    with FakeTTSServer(first_byte_delay=0.3, error_rate=1.0) as server, \
+            tempfile.TemporaryDirectory(prefix="dars-bench-tts-") as tts_cache:
+        voice = TarsVoice(base_url=server.url, player=BenchmarkPlayer(), budget=1.0, cache_dir=tts_cache)
+        for i in range(requests):
+            start = time.perf_counter()
+            voice.generate_speech(f"Outage check {i}.")
+            durations.append(time.perf_counter() - start)
+        print(f"Breaker state after outage: {voice.guard.breaker.state}")
+    return durations
+
+
+def check_llm_deadline(budget: float = 1.0) -> Dict:
+    """process_message against an LLM slower than its budget falls back to local intents"""
+    os.environ["DARS_LLM_BUDGET"] = str(budget)
+    with FakeOpenAIServer(first_token_delay=budget * 3) as server:
+        agent = DARSAgent(api_key="resilience", api_base=f"{server.url}/v1", no_cache=True)
+        start = time.perf_counter()
+        natural_language, function_output = agent.process_message("turn on the room fan")
+        elapsed = time.perf_counter() - start
+    return {"seconds": round(elapsed, 3), "reply": natural_language, "function": function_output}
+
+
+def main(requests: int = 60, slow_rate: float = 0.1, slow_delay: float = 2.0):
+    """Exercise deadlines, hedging and circuit breakers against local fake servers
+
+    Example:
+        python -m benchmarks.resilienceCheck --requests 100 --slow-rate 0.05
+    """
+    os.environ.setdefault("ELEVENLABS_API_KEY", "resilience")
+
+    print("TTS time to first byte with injected stalls (ms):")
+    for mode, stats in check_tts_tail(requests, slow_rate, slow_delay).items():
+        print(f"  {mode:<8} p50 {stats['p50']:>8.1f}  p95 {stats['p95']:>8.1f}  p99 {stats['p99']:>8.1f}")
+
+    print("TTS call duration during an outage (ms):")
+    print("  " + " ".join(f"{d * 1000:.0f}" for d in check_tts_outage()))
+
+    print("LLM over budget:")
+    print(f"  {check_llm_deadline()}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
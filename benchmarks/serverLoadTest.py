@@ -0,0 +1,132 @@
+import json
+import time
+import tempfile
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import fire
+
+from languageModel.llm import DARSAgent
+from server.roomServer import RoomServer
+from benchmarks.fakeServers import FakeOpenAIServer
+from benchmarks.stats import summarize
+
+UTTERANCES = [
+    "add a todo to buy milk tomorrow",
+    "tell me something about the weather on Mars",
+    "make a note called groceries with eggs and bread",
+    "what should I cook tonight",
+]
+
+
+def _request(conn: http.client.HTTPConnection, method: str, path: str, payload: Dict = None) -> Tuple[int, Dict]:
+    body = json.dumps(payload).encode() if payload is not None else None
+    headers = {"Content-Type": "application/json"} if body else {}
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    return response.status, json.loads(data) if data else {}
+
+
+def run_room(port: int, room: int, turns: int) -> Dict:
+    """One thin client: open a session, speak `turns` utterances, close it"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    result = {"latencies": [], "queue": [], "rejected": 0, "completed": False}
+    try:
+        status, created = _request(conn, "POST", "/sessions", {"room": f"room-{room}"})
+        if status != 201:
+            result["rejected"] += 1
+            return result
+        path = f"/sessions/{created['session_id']}"
+        for i in range(turns):
+            start = time.perf_counter()
+            status, reply = _request(conn, "POST", f"{path}/text", {"text": UTTERANCES[(room + i) % len(UTTERANCES)]})
+            if status != 200:
+                result["rejected"] += 1
+                continue
+            result["latencies"].append(time.perf_counter() - start)
+            result["queue"].append(reply.get("queue_ms", 0.0) / 1000)
+        _request(conn, "DELETE", path)
+        result["completed"] = True
+    finally:
+        conn.close()
+    return result
+
+
+def run_level(server: RoomServer, rooms: int, turns: int) -> Dict:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=rooms) as pool:
+        results = list(pool.map(lambda room: run_room(server.port, room, turns), range(rooms)))
+    wall = time.perf_counter() - start
+
+    latencies: List[float] = [x for r in results for x in r["latencies"]]
+    queued: List[float] = [x for r in results for x in r["queue"]]
+    completed = sum(r["completed"] for r in results)
+    stats = summarize({"turn": latencies, "queue": queued})
+    # Every turn may have been rejected at high load
+    empty = {"n": 0, "p50": float("nan"), "p95": float("nan"), "p99": float("nan"), "mean": float("nan")}
+    return {
+        "rooms": rooms,
+        "sessions_per_second": round(completed / wall, 3),
+        "turns_per_second": round(len(latencies) / wall, 3),
+        "rejected": sum(r["rejected"] for r in results),
+        "turn_ms": stats.get("turn", empty),
+        "queue_ms": stats.get("queue", empty),
+    }
+
+
+def main(
+    rooms=(1, 4, 8, 16),
+    turns: int = 5,
+    max_sessions: int = 32,
+    max_active_turns: int = 8,
+    first_token_delay: float = 0.3,
+    output: str = None,
+):
+    """Load-test the room server with N concurrent rooms against a local fake OpenAI server
+
+    Example:
+        python -m benchmarks.serverLoadTest --rooms 1,8,32 --turns 10 --max-active-turns 16
+    """
+    rooms = [rooms] if isinstance(rooms, int) else list(rooms)
+    llm_server = FakeOpenAIServer(first_token_delay=first_token_delay).start()
+    rooms_dir = tempfile.TemporaryDirectory(prefix="dars-load-rooms-")
+
+    def make_agent(config_dir: str) -> DARSAgent:
+        agent = DARSAgent(api_key="load-test", api_base=f"{llm_server.url}/v1", no_cache=True,
+                          config_dir=config_dir)
+        agent.llm_guard = server.llm_guard
+        return agent
+
+    server = RoomServer(
+        port=0,
+        max_sessions=max_sessions,
+        max_active_turns=max_active_turns,
+        queue_timeout=60.0,
+        agent_factory=make_agent,
+        rooms_dir=rooms_dir.name,
+    )
+    server.run_in_thread()
+
+    results = []
+    try:
+        for level in rooms:
+            results.append(run_level(server, level, turns))
+    finally:
+        server.stop_thread()
+        llm_server.stop()
+        rooms_dir.cleanup()
+
+    print(f"{'rooms':>6}{'sess/s':>9}{'turns/s':>9}{'rejected':>10}{'p50 ms':>9}{'p95 ms':>9}{'queue p95':>11}")
+    for r in results:
+        print(f"{r['rooms']:>6}{r['sessions_per_second']:>9.2f}{r['turns_per_second']:>9.2f}{r['rejected']:>10}"
+              f"{r['turn_ms']['p50']:>9.1f}{r['turn_ms']['p95']:>9.1f}{r['queue_ms']['p95']:>11.1f}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
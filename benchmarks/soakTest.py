@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import math
+import time
+import array
+import queue
+import tempfile
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fire
+
+from main import DARSVoiceInterface
+from languageModel.llm import DARSAgent
+from speechRecognition.speechRecognition import ClipSpeechRecognizer
+from speechRecognition.batchTranscription import DEFAULT_MODEL_PATH
+from speechSynthesis.speechSynthesis import TarsVoice
+from telemetry.memoryHealth import MemoryHealth, growth_rate, release_memory, rss_bytes, MB
+from benchmarks.fakeServers import FakeOpenAIServer, FakeTTSServer
+from benchmarks.latencyBenchmark import BenchmarkPlayer
+from music.musicLibrary import MusicLibrary
+
+# Synthetic turns cycling through small talk, LLM tool calls and local intents
+UTTERANCES = [
+    "turn on the room fan",
+    "add a todo to do laundry tomorrow",
+    "tell me something about the weather on Mars in a few sentences",
+    "make a note called soak with the results so far",
+    "remove laundry from my todos",
+    "play some music",
+    "stop the music",
+    "what should I cook tonight",
+]
+
+SCRIPT = [
+    {"match": "fan", "replies": [
+        {"tool": {"name": "appliance_control", "arguments": {"state": True, "appliance": "room fan"}}},
+        "The room fan is now on.",
+    ]},
+    {"match": "laundry tomorrow", "replies": [
+        {"tool": {"name": "todo_operation", "arguments": {"operation": "new", "item_name": "laundry", "due_date": "tomorrow"}}},
+        "Laundry is on the list for tomorrow.",
+    ]},
+    {"match": "remove laundry", "replies": [
+        {"tool": {"name": "todo_operation", "arguments": {"operation": "delete", "item_name": "laundry"}}},
+        "Laundry is off the list.",
+    ]},
+    {"match": "note called soak", "replies": [
+        {"tool": {"name": "note_operation", "arguments": {"operation": "new", "title": "soak", "content": "Still flat."}}},
+        "Saved the soak note.",
+    ]},
+    {"match": "mars", "replies": [
+        "Mars is cold, dusty and thin-aired: minus sixty on a good day, with storms that can cover the planet "
+        "for weeks. I would pack a coat. And a spare atmosphere."
+    ]},
+]
+
+
+class SoakRecognizer(ClipSpeechRecognizer):
+    """Runs a synthetic clip through the live recognition path, then returns the scripted utterance"""
+
+    def __init__(self, clip: bytes, utterances: List[str], model_path: str):
+        super().__init__([], model_path=model_path, realtime=False, trailing_silence=0.0)
+        self.clip = clip
+        self.utterances = utterances
+        self.turn = 0
+
+    def listen(self) -> str:
+        self.sources.append(self.clip)
+        super().listen()
+        text = self.utterances[self.turn % len(self.utterances)]
+        self.turn += 1
+        return text
+
+
+class ScriptedRecognizer:
+    """Text-only stand-in for SpeechRecognizer when no Vosk model is available"""
+
+    def __init__(self, utterances: List[str]):
+        self.utterances = utterances
+        self.turn = 0
+        self.audio_tap = None
+        self.audio_queue = queue.Queue()
+
+    def listen(self) -> str:
+        text = self.utterances[self.turn % len(self.utterances)]
+        self.turn += 1
+        return text
+
+    def recycle(self) -> None:
+        pass
+
+
+def _serve(server_cls, kwargs: Dict, conn) -> None:
+    server = server_cls(**kwargs).start()
+    conn.send(server.url)
+    conn.recv()  # Block until the soak test is done
+    server.stop()
+
+
+def start_server_process(server_cls, **kwargs):
+    """Run a fake server in a child process, keeping its allocations out of the measured RSS.
+    Returns the server URL and a function stopping it."""
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(server_cls, kwargs, child), daemon=True)
+    process.start()
+    url = parent.recv()
+
+    def stop() -> None:
+        parent.send(None)
+        process.join(5)
+
+    return url, stop
+
+
+def synthetic_clip(seconds: float = 1.5) -> bytes:
+    """A short 16 kHz tone burst followed by silence"""
+    samples = array.array("h", (
+        int(6000 * math.sin(2 * math.pi * 220 * i / 16000)) if i < 8000 else 0
+        for i in range(int(seconds * 16000))
+    ))
+    return samples.tobytes()
+
+
+def main(
+    hours: float = 2.0,
+    turns: Optional[int] = None,
+    warmup: int = 300,
+    sample_every: int = 100,
+    max_growth_mb_per_hour: float = 5.0,
+    max_growth_mb: float = 20.0,
+    recycle_turns: int = 0,
+    audio: bool = False,
+    model_path: str = DEFAULT_MODEL_PATH,
+    trace_frames: int = 0,
+    output: Optional[str] = None,
+):
+    """Replay synthetic turns through DARSVoiceInterface for hours and check RSS stays flat
+
+    Turns run back to back against local fake OpenAI and TTS servers (in child
+    processes) with the same MemoryHealth caps as a live session. After `warmup` turns, RSS is
+    sampled every `sample_every` turns; the run fails (exit status 1) if the
+    fitted growth exceeds max_growth_mb_per_hour or RSS grows more than
+    max_growth_mb in total. With --audio each turn also pushes a synthetic
+    clip through the Vosk recognizer and audio queue.
+
+    Example:
+        SDL_AUDIODRIVER=dummy python -m benchmarks.soakTest --hours 4 --audio --trace-frames 1
+    """
+    os.environ.setdefault("ELEVENLABS_API_KEY", "soak")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    # Notes, todos, the music index, the TTS phrase cache and (unless DARS_LOG_DIR
+    # is set) the logs go to explicit paths in a sandbox removed afterwards
+    sandbox = tempfile.TemporaryDirectory(prefix="dars-soak-")
+    root = Path(sandbox.name)
+    saved_log_dir = os.environ.get("DARS_LOG_DIR")
+    os.environ.setdefault("DARS_LOG_DIR", str(root / "logs"))
+
+    llm_url, stop_llm = start_server_process(FakeOpenAIServer, script=SCRIPT, first_token_delay=0.0, token_delay=0.0)
+    tts_url, stop_tts = start_server_process(FakeTTSServer, first_byte_delay=0.0, chunk_delay=0.0)
+    samples: List[Dict] = []
+    turn = 0
+    try:
+        health = MemoryHealth(interval=3600.0, recycle_turns=recycle_turns, trace_frames=trace_frames)
+        recognizer = SoakRecognizer(synthetic_clip(), UTTERANCES, model_path) if audio else ScriptedRecognizer(UTTERANCES)
+        interface = DARSVoiceInterface(
+            dars=DARSAgent(
+                api_key="soak", api_base=f"{llm_url}/v1", no_cache=True, config_dir=str(root / "config"),
+                music_library=MusicLibrary(root / "music", root / "music_index.sqlite"),
+            ),
+            speech_recognizer=recognizer,
+            tars_voice=TarsVoice(base_url=tts_url, player=BenchmarkPlayer(), cache_dir=root / "tts_cache"),
+            memory_health=health,
+        )
+
+        deadline = time.monotonic() + hours * 3600
+        start = time.monotonic()
+        while (turn < turns) if turns is not None else (time.monotonic() < deadline):
+            interface.run_turn()
+            turn += 1
+            if turn < warmup or (turn - warmup) % sample_every:
+                continue
+            release_memory()
+            report = health.sample()
+            report.update(turn=turn, elapsed=round(time.monotonic() - start, 1))
+            samples.append(report)
+            print(f"turn {turn:>7}  {report['elapsed'] / 60:>7.1f} min  RSS {report['rss_mb']:>8.1f} MB  "
+                  f"responses {report['sizes'].get('llm_responses', 0):>4.0f}  "
+                  f"documents {report['sizes'].get('llm_documents', 0):>6.0f}")
+    finally:
+        stop_llm()
+        stop_tts()
+        if saved_log_dir is None:
+            os.environ.pop("DARS_LOG_DIR", None)
+        sandbox.cleanup()
+
+    if len(samples) < 3:
+        print(f"Only {len(samples)} samples after warmup; run longer or lower --warmup/--sample-every")
+        sys.exit(1)
+
+    per_hour = growth_rate([(s["elapsed"] / 3600, s["rss_mb"]) for s in samples])
+    per_1k_turns = growth_rate([(s["turn"] / 1000, s["rss_mb"]) for s in samples])
+    growth = samples[-1]["rss_mb"] - samples[0]["rss_mb"]
+    elapsed = samples[-1]["elapsed"]
+    print(f"{turn} turns in {elapsed / 60:.1f} min ({turn / max(elapsed, 1e-9):.1f} turns/s), "
+          f"final RSS {rss_bytes() / MB:.1f} MB")
+    print(f"RSS growth after warmup: {growth:+.2f} MB total, {per_hour:+.2f} MB/hour, {per_1k_turns:+.3f} MB/1k turns")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump({"samples": samples, "mb_per_hour": per_hour, "mb_per_1k_turns": per_1k_turns}, f, indent=2)
+
+    if per_hour > max_growth_mb_per_hour or growth > max_growth_mb:
+        print(f"FAIL: RSS is not flat (limits {max_growth_mb_per_hour} MB/hour, {max_growth_mb} MB total)")
+        sys.exit(1)
+    print("PASS: RSS flat")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,19 @@
+from typing import Dict, List
+
+from telemetry.stats import percentile
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """Per-stage count and p50/p95/p99/mean in milliseconds"""
+    summary = {}
+    for stage, values in samples.items():
+        if not values:
+            continue
+        summary[stage] = {
+            "n": len(values),
+            "p50": round(percentile(values, 50) * 1000, 1),
+            "p95": round(percentile(values, 95) * 1000, 1),
+            "p99": round(percentile(values, 99) * 1000, 1),
+            "mean": round(sum(values) / len(values) * 1000, 1),
+        }
+    return summary
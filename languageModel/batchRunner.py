@@ -0,0 +1,174 @@
+import json
+import time
+import wave
+import asyncio
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import fire
+
+from languageModel.llm import DARSAgent, DEFAULT_SONG
+from music.musicLibrary import MusicLibrary, RoomPlayer
+from network.resilience import GUARDED_WORKERS
+from telemetry.stats import percentile
+from telemetry.tracing import tracer, configure_from_env
+
+
+def load_conversations(path: str) -> List[Dict]:
+    """Read a conversations file into [{"name": ..., "turns": [{"text": ...}, ...]}].
+
+    The file holds a JSON list (or {"conversations": [...]}) whose items are:
+      - a string: a one-turn conversation
+      - a list of strings: one conversation, a turn per string
+      - {"name": ..., "turns": [...]}: turns are strings or
+        {"text": ..., "expect_function": ..., "expect_reply": ...}, where the
+        expectations are case-insensitive substrings checked per turn
+    """
+    data = json.loads(Path(path).read_text())
+    if isinstance(data, dict):
+        data = data.get("conversations", [])
+
+    conversations = []
+    for i, item in enumerate(data):
+        if isinstance(item, str):
+            item = {"turns": [item]}
+        elif isinstance(item, list):
+            item = {"turns": item}
+        turns = [turn if isinstance(turn, dict) else {"text": turn} for turn in item.get("turns", [])]
+        conversations.append({"name": item.get("name") or f"conversation-{i}", "turns": turns})
+    return conversations
+
+
+def _check(turn: Dict, reply: str, function_output: Optional[str]) -> Optional[bool]:
+    """Whether the turn met its expectations, or None if it has none"""
+    checks = []
+    if "expect_function" in turn:
+        checks.append(turn["expect_function"].lower() in (function_output or "").lower())
+    if "expect_reply" in turn:
+        checks.append(turn["expect_reply"].lower() in (reply or "").lower())
+    return all(checks) if checks else None
+
+
+async def run_conversation(conversation: Dict, make_agent, limit: asyncio.Semaphore, write) -> None:
+    """Run one conversation's turns in order on a fresh agent"""
+    async with limit:
+        agent = await asyncio.to_thread(make_agent)
+        for index, turn in enumerate(conversation["turns"]):
+            record = {"conversation": conversation["name"], "turn": index, "text": turn["text"]}
+            start = time.perf_counter()
+            with tracer.turn(conversation=conversation["name"], transcript=turn["text"]):
+                record["turn_id"] = tracer.current_turn_id
+                try:
+                    reply, function_output = await agent.process_message_async(turn["text"])
+                    record.update(reply=reply, function=function_output)
+                    if agent.last_degraded:
+                        # A local fallback can satisfy expectations without the LLM running
+                        record.update(error=f"Degraded reply: {agent.last_degraded}", passed=False)
+                    else:
+                        record["passed"] = _check(turn, reply, function_output)
+                except Exception as e:
+                    record.update(error=f"{type(e).__name__}: {e}", passed=False)
+            record["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            write(record)
+
+
+async def run_batch(conversations: List[Dict], make_agent, concurrency: int, output: str) -> List[Dict]:
+    """Run independent conversations concurrently, at most `concurrency` at a time"""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-turn"))
+    limit = asyncio.Semaphore(concurrency)
+    records = []
+
+    with open(output, "w") as f:
+        def write(record: Dict) -> None:
+            # Written as turns finish, so a partial run still leaves results behind
+            records.append(record)
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+
+        await asyncio.gather(*(run_conversation(c, make_agent, limit, write) for c in conversations))
+    return records
+
+
+def seed_music(music_dir: Path) -> None:
+    """A silent default song, so music conversations can run in a sandbox"""
+    music_dir.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(music_dir / f"Daft Punk - {DEFAULT_SONG}.wav"), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(bytes(3200))
+
+
+def main(
+    conversations_file: str,
+    output: str = "batch_results.jsonl",
+    concurrency: int = 8,
+    model: str = None,
+    api_base: str = None,
+    no_cache: bool = True,
+    sandbox_home: bool = True,
+    sandbox_dir: Optional[str] = None,
+):
+    """Run scripted conversations through DARSAgent concurrently and write per-turn JSONL
+
+    Example:
+        python -m languageModel.batchRunner languageModel/testing.json --concurrency 16 --output nightly.jsonl
+
+    Turns within a conversation run in order; conversations run in parallel.
+    Concurrency is capped at DARS_GUARDED_WORKERS (default 32): beyond that,
+    attempts queue for a worker and spend their latency budget waiting.
+    Turns answered by the degraded fallback count as errors. With sandbox_home
+    each conversation keeps its notes and todos in its own directory, and the
+    music library holds only a silent copy of the default song. The sandbox is
+    a temporary directory removed after the run, or sandbox_dir if given (kept).
+    """
+    if concurrency > GUARDED_WORKERS:
+        print(f"Concurrency {concurrency} exceeds DARS_GUARDED_WORKERS; using {GUARDED_WORKERS}")
+        concurrency = GUARDED_WORKERS
+    configure_from_env()
+    # The agents get explicit paths into the sandbox; HOME is left alone
+    sandbox, temporary, library = None, None, None
+    if sandbox_home:
+        if sandbox_dir:
+            sandbox = Path(sandbox_dir).expanduser()
+            sandbox.mkdir(parents=True, exist_ok=True)
+        else:
+            temporary = tempfile.TemporaryDirectory(prefix="dars-batch-")
+            sandbox = Path(temporary.name)
+        seed_music(sandbox / "music")
+        library = MusicLibrary(sandbox / "music", sandbox / "music_index.sqlite")
+        # Index the fixture before the first turn rather than in the background
+        library.scan()
+
+    conversations = load_conversations(conversations_file)
+
+    def make_agent() -> DARSAgent:
+        # Each conversation gets its own notes and todos (conversations run
+        # concurrently and would race on one todos.csv) and never plays audio here
+        config_dir = tempfile.mkdtemp(prefix="conversation-", dir=sandbox) if sandbox else None
+        return DARSAgent(model=model, api_base=api_base, no_cache=no_cache,
+                         music_player=RoomPlayer(), config_dir=config_dir, music_library=library)
+
+    start = time.perf_counter()
+    try:
+        records = asyncio.run(run_batch(conversations, make_agent, concurrency, output))
+    finally:
+        if temporary is not None:
+            temporary.cleanup()
+    wall = time.perf_counter() - start
+
+    latencies = [r["latency_ms"] for r in records if "error" not in r]
+    checked = [r for r in records if r.get("passed") is not None]
+    print(f"{len(conversations)} conversations, {len(records)} turns in {wall:.1f}s "
+          f"(concurrency {concurrency}) -> {output}")
+    if latencies:
+        print(f"Turn latency p50 {percentile(latencies, 50):.0f} ms, p95 {percentile(latencies, 95):.0f} ms")
+    print(f"Errors: {sum('error' in r for r in records)}, "
+          f"expectations passed: {sum(r['passed'] for r in checked)}/{len(checked)}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
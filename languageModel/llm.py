@@ -1,13 +1,17 @@
 import os
-from typing import List, Tuple, Optional
+import json
+import math
+from typing import List, Set, TextIO, Tuple, Optional
 from pathlib import Path
 import fire
 import re
-import io
 import sys
-from contextlib import redirect_stdout
+import asyncio
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import csv
+import functools
 import pygame  # Add this import at the top of the file
 
 from langroid.pydantic_v1 import BaseModel, Field
@@ -15,51 +19,191 @@ import langroid as lr
 from langroid.utils.configuration import settings
 from langroid.agent.tool_message import ToolMessage
 import langroid.language_models as lm
+from langroid.language_models.base import RetryParams
+from langroid.exceptions import InfiniteLoopException
+from openai import OpenAI, APIError
 from langroid.agent.tools.orchestration import ForwardTool
-from langroid.agent.chat_document import ChatDocument
+from langroid.agent.chat_document import ChatDocument, ChatDocLoggerFields
+from langroid.utils.object_registry import ObjectRegistry
+
+from telemetry.tracing import tracer
+from telemetry.logWriter import MessageLogger, get_writer, get_tsv_logger
+from network.resilience import GuardedCall, CircuitOpenError, DeadlineExceeded, UPSTREAM_ERRORS
+from network.httpPool import get_pool
+from languageModel.toolSelection import ToolSelector
+from music.musicLibrary import get_library, get_player, song_query
+
+class LLMUnavailable(Exception):
+    """langroid gave up on an OpenAI request (it raises a bare Exception for that)"""
+
+
+# OpenAI failures that mean the service is unavailable rather than a bug
+LLM_ERRORS = UPSTREAM_ERRORS + (APIError, LLMUnavailable)
+
+# Played when the user asks for music without naming a song
+DEFAULT_SONG = "Veridis Quo"
+
+HUMOR_GUIDELINES = [
+    (20, '0-20: Extremely formal and robotic. Minimal personality.\n'
+         'Example: "Confirmed. That would be the end of my analysis."'),
+    (40, '21-40: Professional with subtle dry wit.\n'
+         'Example: "I have a cue light I can use when I\'m joking, if you\'d like."'),
+    (60, '41-60: Balanced TARS-like personality. Deadpan humor.\n'
+         'Example: "Let\'s match our honesty settings: 90% for me, 95% for you."'),
+    (80, '61-80: More frequent deadpan jokes and subtle sarcasm.\n'
+         'Example: "I also have a discretion setting, if you\'d like to hear my thoughts on that request."'),
+    (100, '81-100: Maximum TARS-style wit. Dry humor with occasional mild sass.\n'
+          'Example: "My analysis shows a 68% chance you\'ll regret that decision. But who am I to judge?"'),
+]
+
+def traced_tool(handle):
+    """Trace a tool's handle() call, recording its arguments and result on the span"""
+    @functools.wraps(handle)
+    def wrapper(self, *args) -> str:
+        arguments = self.model_dump(exclude={"request", "purpose"})
+        with tracer.span(f"tool.{self.request}", arguments=arguments) as span:
+            result = handle(self, *args)
+            if span is not None:
+                span.set(result=result)
+            return result
+    return wrapper
 
 def strip_ansi_colors(text: str) -> str:
     """Remove ANSI color codes from text"""
     ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
     return ansi_escape.sub('', text)
 
+class _ThreadLocalStdout:
+    """sys.stdout proxy letting each thread capture its own output"""
+
+    def __init__(self, original):
+        self.original = original
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        return (getattr(self.local, "buffer", None) or self.original).write(text)
+
+    def flush(self) -> None:
+        (getattr(self.local, "buffer", None) or self.original).flush()
+
+    def __getattr__(self, name):
+        return getattr(self.original, name)
+
+_stdout_lock = threading.Lock()
+
+def _object_id(obj) -> str:
+    """Registry id of a langroid agent or document (a method or attribute, depending on the version)"""
+    return obj.id() if callable(obj.id) else obj.id
+
+class _DiscardOutput:
+    """Stdout sink for langroid's console output during a task run"""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+def _strip_tool_requests(text: str) -> str:
+    """Remove langroid JSON tool requests ({"request": ...}) from an assistant message"""
+    decoder = json.JSONDecoder()
+    kept = []
+    i = 0
+    while (start := text.find("{", i)) != -1:
+        try:
+            obj, end = decoder.raw_decode(text, start)
+        except ValueError:
+            kept.append(text[i:start + 1])
+            i = start + 1
+            continue
+        kept.append(text[i:start] if isinstance(obj, dict) and "request" in obj else text[i:end])
+        i = end
+    kept.append(text[i:])
+    return "".join(kept).strip()
+
+@contextmanager
+def capture_thread_stdout(buffer: TextIO):
+    """Like redirect_stdout, but only for the current thread, so a task can run
+    on a worker thread without swallowing prints from the rest of DARS"""
+    with _stdout_lock:
+        if not isinstance(sys.stdout, _ThreadLocalStdout):
+            sys.stdout = _ThreadLocalStdout(sys.stdout)
+        proxy = sys.stdout
+    previous = getattr(proxy.local, "buffer", None)
+    proxy.local.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        proxy.local.buffer = previous
+
 class DARSTask(lr.Task):
+    def init_loggers(self) -> None:
+        """Send message logs to the shared background writer instead of logs/ in the CWD"""
+        # langroid's HTML logger writes synchronously under logs/ in the CWD and has no
+        # counterpart here; DARSAgent turns it off with enable_html_logging=False
+        self.html_logger = None
+        if not self.config.enable_loggers:
+            return
+        if self.caller is not None and self.caller.logger is not None:
+            self.logger = self.caller.logger
+            self.tsv_logger = self.caller.tsv_logger
+            return
+        header = f" \tTask\tResponder\t{ChatDocLoggerFields().tsv_header()}"
+        self.logger = MessageLogger(get_writer(self.name))
+        self.tsv_logger = get_tsv_logger(f"{self.name}.tsv", header=header)
+
+    def init(self, msg=None):
+        """Tag the incoming user message with this task's agent, as langroid
+        already does for its copy of ChatDocument input, so
+        DARSAgent.release_documents can find both in the registry afterwards.
+
+        Also drops the previous run's response_sequence: langroid only reads it
+        within a run but never resets it, so it kept every response alive."""
+        self.response_sequence.clear()
+        super().init(msg)
+        # Where this run's messages start (langroid clears the history first when restart=True)
+        self.history_start = len(self.agent.message_history)
+        agent_id = _object_id(self.agent)
+        for doc in (msg, self.pending_message):
+            if isinstance(doc, ChatDocument) and not doc.metadata.agent_id:
+                doc.metadata.agent_id = agent_id
+        return self.pending_message
+
     def run(self, message: str) -> str:
-        """Custom run method to capture stdout output"""
-        stdout_capture = io.StringIO()
-        
-        with redirect_stdout(stdout_capture):
+        """Run the task with langroid's console output silenced and return the
+        run's tool results and replies, read from the messages it added"""
+        with capture_thread_stdout(_DiscardOutput()):
             super().run(message)
-            
-        output = strip_ansi_colors(stdout_capture.getvalue())
         
-        # Extract the actual response (between the stats lines)
-        lines = output.split('\n')
-        response_lines = []
-        func_lines = []
-        
-        for line in lines:
-            # Skip debug/stats lines, warnings and empty lines
-            if ('>>>' in line or '<<<' in line or 
-                'Stats:' in line or 'WARNING' in line or 
-                'Bye, hope this was useful!' in line or
-                not line.strip()):
-                continue
-                
-            # Separate function calls from natural language
-            if 'FUNC:' in line:
-                func_lines.append(line)
+        func_lines, response_lines = [], []
+        after_tool_request = False
+        for msg in self.agent.message_history[self.history_start:]:
+            role = getattr(msg.role, "value", str(msg.role))
+            content = msg.content or ""
+            if role == "assistant":
+                text = _strip_tool_requests(content)
+                after_tool_request = bool(getattr(msg, "function_call", None) or getattr(msg, "tool_calls", None)
+                                          or text != content.strip())
+                if text:
+                    response_lines.append(text)
+            elif after_tool_request and role in ("user", "function", "tool"):
+                # Tool result: "FUNC: ..." lines plus the tool's spoken response
+                for line in content.splitlines():
+                    (func_lines if line.startswith("FUNC:") else response_lines).append(line)
             else:
-                response_lines.append(line)
+                after_tool_request = False
         
         # Combine the responses with a special separator
         if func_lines:
-            return "FUNCTION_OUTPUT:" + "\n".join(func_lines) + "\nNATURAL_OUTPUT:" + "\n".join(response_lines)
+            return ("FUNCTION_OUTPUT:" + "\n".join(func_lines) +
+                    "\nNATURAL_OUTPUT:" + "\n".join(response_lines))
         else:
             return "\n".join(response_lines)
 
 class DARSAgent:
-    def __init__(self, api_key: str = None, model: str = None, debug: bool = False, no_cache: bool = False):
+    def __init__(self, api_key: str = None, model: str = None, debug: bool = False, no_cache: bool = False,
+                 api_base: str = None, http_pool=None, music_player=None, config_dir: str = None,
+                 music_library=None):
         """Initialize DARS agent with configuration"""
         self.DEFAULT_LLM = lm.OpenAIChatModel.GPT4o
         os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -72,20 +216,45 @@ class DARSAgent:
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise EnvironmentError("OPENAI_API_KEY not provided and not found in environment")
+        
+        # Optional OpenAI-compatible endpoint (e.g. a local stand-in for benchmarks)
+        self.api_base = api_base or os.getenv("OPENAI_BASE_URL")
+        self.warm_url = self.api_base or "https://api.openai.com/v1"
+        self.http_pool = http_pool or get_pool()
             
         # Add humor level tracking
         self.humor_level = 50  # Default to balanced humor
         
+        # Latency budget and circuit breaker for the whole LLM task. No hedging:
+        # a second concurrent run would corrupt the shared conversation history.
+        self.llm_budget = float(os.getenv("DARS_LLM_BUDGET", "12"))
+        self.llm_guard = GuardedCall("openai", budget=self.llm_budget, hedge=False, failures=LLM_ERRORS)
+        self._task_lock = threading.Lock()
+        # Set while a run that blew its budget still holds _task_lock
+        self._run_abandoned = False
+        
+        # LLM messages produced by the latest task run, for session recording
+        self.last_turn_messages: List[dict] = []
+        # Why the latest reply came from the local fallback instead of the LLM (None if it didn't)
+        self.last_degraded: Optional[str] = None
+        
+        # Where the note and todo tools keep their files
+        self.config_dir = Path(config_dir) if config_dir else Path.home() / ".config" / "DARS"
+        
+        # Where song_player plays; None is this host's speakers (get_player())
+        self.music_player = music_player
+        # Where song_player looks tracks up; None is the process-wide get_library()
+        self.music_library = music_library
+        
+        # Send only the tools relevant to each message (DARS_TOOL_SELECTION=0 sends all)
+        self.tool_selection = os.getenv("DARS_TOOL_SELECTION", "1") != "0"
+        
         # Initialize the agent
-        self._setup_agent(model or self.DEFAULT_LLM)
+        self.model = model or self.DEFAULT_LLM
+        self._setup_agent(self.model)
 
     def _setup_agent(self, model: str):
         """Setup the LLM and agent configuration"""
-        # Get current date information
-        current_date = datetime.now()
-        tomorrow_date = current_date + timedelta(days=1)
-        next_week_date = current_date + timedelta(days=7)
-        
         llm_cfg = lm.OpenAIGPTConfig(
             api_key=self.api_key,
             chat_model=model,
@@ -93,88 +262,209 @@ class DARSAgent:
             max_output_tokens=100,
             temperature=0.2,
             stream=True,
-            timeout=45,
+            timeout=min(45, math.ceil(self.llm_budget)),  # langroid takes whole seconds
+            api_base=self.api_base,
+            # llm_guard owns retries: backoff here would run out the budget unseen
+            retry_params=RetryParams(max_retries=0),
         )
 
+        self.tool_classes = {
+            tool.default_value("request"): tool
+            for tool in [self.NoteTool, self.TodoTool, self.HumorLevelTool,
+                         self.ApplianceControlTool, self.SongPlayerTool]
+        }
+        self.tool_selector = ToolSelector(self.tool_classes)
+        self._prompt_token_cache = {}
+
         config = lr.ChatAgentConfig(
             llm=llm_cfg,
-            system_message=f"""
-            You are DARS, Dormitory Automated Residential System.
-            Current date: {current_date.strftime("%Y-%m-%d")}
-            Tomorrow's date: {tomorrow_date.strftime("%Y-%m-%d")}
-            Next week's date: {next_week_date.strftime("%Y-%m-%d")}
-            
-            You have the personality of TARS from Interstellar, but your job is to manage dormitory tasks.
-            Your personality should always reflect that of TARS from Interstellar - dry, witty, and subtly sarcastic.
-            Your current humor setting is {self.humor_level}/100.
-
-            PERSONALITY GUIDELINES based on humor level:
-            0-20: Extremely formal and robotic. Minimal personality.
-            Example: "Confirmed. That would be the end of my analysis."
-
-            21-40: Professional with subtle dry wit.
-            Example: "I have a cue light I can use when I'm joking, if you'd like."
-
-            41-60: Balanced TARS-like personality. Deadpan humor.
-            Example: "Let's match our honesty settings: 90% for me, 95% for you."
-
-            61-80: More frequent deadpan jokes and subtle sarcasm.
-            Example: "I also have a discretion setting, if you'd like to hear my thoughts on that request."
-
-            81-100: Maximum TARS-style wit. Dry humor with occasional mild sass.
-            Example: "My analysis shows a 68% chance you'll regret that decision. But who am I to judge?"
-
-            IMPORTANT INSTRUCTIONS:
-            1. When the user requests to change the humor level, ALWAYS use the adjust_humor function.
-            2. When asked about current humor level (without a change request), respond with the current numerical setting.
-            3. When using function calls, ALWAYS provide both:
-               - The function call response
-               - A natural conversational response
-            4. For note operations:
-               - 'new' for creating (date defaults to {current_date.strftime("%Y-%m-%d")})
-               - 'read' for reading
-               - 'modify' for modifying
-               - 'delete' for deleting
-            5. For todo operations:
-               - Use 'new' to add a new todo item
-               - Use 'list' to show all todos
-               - Use 'complete' to mark a todo as done
-               - Use 'delete' to remove a todo
-               When handling dates for todos:
-               - "today" = {current_date.strftime("%Y-%m-%d")}
-               - "tomorrow" = {tomorrow_date.strftime("%Y-%m-%d")}
-               - "next week" = {next_week_date.strftime("%Y-%m-%d")}
-            6. For appliance control:
-               Available appliances:
-               - "coors light sign" - Decorative neon beer sign
-               - "hologram light" - 3D holographic display
-               - "room fan" - Box fan for the room
-               Use the appliance_control function with:
-               - state: true for on, false for off
-               - appliance: name of the appliance to control
-            7. For music control:
-               - Only one song available: "Veridis Quo" by Daft Punk
-               - Use the song_player function with:
-               - state: true to play, false to stop
-            8. Maintain personality consistent with current humor level of {self.humor_level}/100
-            """,
+            system_message=self._system_message(set(self.tool_classes)),
         )
 
         self.agent = lr.ChatAgent(config)
+        self._use_http_pool(llm_cfg)
         self.agent.user_data = {}
         self.agent.user_data['dars_agent'] = self
         
         # Create and enable tools
-        self.agent.enable_message(self.NoteTool)
-        self.agent.enable_message(self.TodoTool)
-        self.agent.enable_message(self.HumorLevelTool)
-        self.agent.enable_message(self.ApplianceControlTool)
-        self.agent.enable_message(self.SongPlayerTool)
+        for tool in self.tool_classes.values():
+            self.agent.enable_message(tool)
         
-        self.task = DARSTask(self.agent, interactive=False)
+        # Turns are independent: each run clears the history first (restart=True), so
+        # what outlives a turn is langroid's registry and the task's response_sequence
+        self.task = DARSTask(
+            self.agent, interactive=False, restart=True, config=lr.TaskConfig(enable_html_logging=False)
+        )
+
+    def _use_http_pool(self, llm_cfg) -> None:
+        """Route langroid's OpenAI client through the shared keep-alive pool"""
+        llm = self.agent.llm
+        if not hasattr(llm, "client"):
+            return
+        llm.client = OpenAI(
+            api_key=self.api_key,
+            base_url=self.api_base,
+            timeout=llm_cfg.timeout,
+            max_retries=0,
+            http_client=self.http_pool.client,
+        )
+
+    def _system_message(self, tools: Set[str]) -> str:
+        """Build the system prompt with only the instruction sections for `tools`"""
+        current_date = datetime.now()
+        today = current_date.strftime("%Y-%m-%d")
+        tomorrow = (current_date + timedelta(days=1)).strftime("%Y-%m-%d")
+        next_week = (current_date + timedelta(days=7)).strftime("%Y-%m-%d")
+
+        # Only the current humor band is needed unless the level may change
+        if "adjust_humor" in tools:
+            guidelines = "\n\n".join(text for _, text in HUMOR_GUIDELINES)
+        else:
+            guidelines = next(text for limit, text in HUMOR_GUIDELINES if self.humor_level <= limit)
+
+        instructions = []
+        if "adjust_humor" in tools:
+            instructions += [
+                "When the user requests to change the humor level, ALWAYS use the adjust_humor function.",
+                "When asked about current humor level (without a change request), respond with the current numerical setting.",
+            ]
+        if tools:
+            instructions.append(
+                "When using function calls, ALWAYS provide both:\n"
+                "   - The function call response\n"
+                "   - A natural conversational response"
+            )
+        if "note_operation" in tools:
+            instructions.append(
+                "For note operations:\n"
+                f"   - 'new' for creating (date defaults to {today})\n"
+                "   - 'read' for reading\n"
+                "   - 'modify' for modifying\n"
+                "   - 'delete' for deleting"
+            )
+        if "todo_operation" in tools:
+            instructions.append(
+                "For todo operations:\n"
+                "   - Use 'new' to add a new todo item\n"
+                "   - Use 'list' to show all todos\n"
+                "   - Use 'complete' to mark a todo as done\n"
+                "   - Use 'delete' to remove a todo\n"
+                "   When handling dates for todos:\n"
+                f"   - \"today\" = {today}\n"
+                f"   - \"tomorrow\" = {tomorrow}\n"
+                f"   - \"next week\" = {next_week}"
+            )
+        if "appliance_control" in tools:
+            instructions.append(
+                "For appliance control:\n"
+                "   Available appliances:\n"
+                "   - \"coors light sign\" - Decorative neon beer sign\n"
+                "   - \"hologram light\" - 3D holographic display\n"
+                "   - \"room fan\" - Box fan for the room\n"
+                "   Use the appliance_control function with:\n"
+                "   - state: true for on, false for off\n"
+                "   - appliance: name of the appliance to control"
+            )
+        if "song_player" in tools:
+            instructions.append(
+                "For music control:\n"
+                "   - Songs come from the user's music library\n"
+                "   - Use the song_player function with:\n"
+                "   - state: true to play, false to stop\n"
+                "   - song: the title and/or artist the user asked for (omit for the default song)"
+            )
+        instructions.append(f"Maintain personality consistent with current humor level of {self.humor_level}/100")
+        instructions = "\n".join(f"{i}. {text}" for i, text in enumerate(instructions, 1))
+
+        return f"""You are DARS, Dormitory Automated Residential System.
+Current date: {today}
+Tomorrow's date: {tomorrow}
+Next week's date: {next_week}
+
+You have the personality of TARS from Interstellar, but your job is to manage dormitory tasks.
+Your personality should always reflect that of TARS from Interstellar - dry, witty, and subtly sarcastic.
+Your current humor setting is {self.humor_level}/100.
+
+PERSONALITY GUIDELINES based on humor level:
+{guidelines}
+
+IMPORTANT INSTRUCTIONS:
+{instructions}
+"""
+
+    def _offer_tools(self, tools: Set[str]) -> None:
+        """Let the LLM use only `tools`; every tool stays enabled for handling.
+        Only tools whose state changes are touched: each change makes langroid
+        re-render the instructions of every tool."""
+        usable = self.agent.llm_tools_usable
+        for request, tool in self.tool_classes.items():
+            if request in tools and request not in usable:
+                self.agent.enable_message(tool, use=True, handle=True)
+            elif request not in tools and request in usable:
+                self.agent.disable_message_use(tool)
+        # langroid rebuilds the system message from this on every LLM call
+        self.agent.set_system_message(self._system_message(tools))
+
+    def _prompt_tokens(self, tools: Set[str]) -> int:
+        """Tokens sent every request for the system prompt with `tools` offered.
+
+        Counts the system message as langroid renders it, including its JSON
+        tool format instructions; with the function-calling API the schemas'
+        JSON is added, which only approximates how OpenAI counts them. Cached
+        per day, humor level and tool set, since these decide the prompt.
+        """
+        key = (datetime.now().date(), self.humor_level, frozenset(tools))
+        tokens = self._prompt_token_cache.get(key)
+        if tokens is None:
+            if any(cached[0] != key[0] for cached in self._prompt_token_cache):
+                self._prompt_token_cache.clear()
+            self._offer_tools(tools)
+            tokens = self.agent.num_tokens(self.agent._create_system_and_tools_message().content)
+            if self.agent.config.use_functions_api:
+                tokens += sum(
+                    self.agent.num_tokens(self.agent.llm_functions_map[t].model_dump_json())
+                    for t in tools if t in self.agent.llm_functions_map
+                )
+            self._prompt_token_cache[key] = tokens
+        return tokens
+
+    def _select_tools(self, message: str) -> None:
+        """Offer the LLM only the tools and instructions relevant to this message.
+
+        Every tool stays enabled for handling, so a call to a tool that was not
+        offered this turn still runs.
+        """
+        all_tools = set(self.tool_classes)
+        selected = self.tool_selector.select(message) if self.tool_selection else all_tools
+        full, used = self._prompt_tokens(all_tools), self._prompt_tokens(selected)
+        self._offer_tools(selected)
+        tracer.incr("llm_prompt_tokens", used)
+        tracer.incr("llm_prompt_tokens_saved", full - used)
+        tracer.incr("llm_tool_selections", scope="full" if selected == all_tools else "subset")
+        span = tracer.current_span
+        if span is not None:
+            span.attributes.update(tools=sorted(selected), prompt_tokens=used, prompt_tokens_saved=full - used)
 
     def process_message(self, message: str) -> Tuple[str, Optional[str]]:
         """Process a message and return the natural language and function outputs"""
+        with tracer.span("llm.process_message", chars=len(message)):
+            natural_language, function_output = self._process_message(message)
+            if function_output:
+                tracer.incr("function_outputs")
+            return natural_language, function_output
+
+    async def process_message_async(self, message: str) -> Tuple[str, Optional[str]]:
+        """Async process_message for running many agents on one event loop.
+
+        The work runs on a worker thread (the task, its latency guard and the
+        stdout capture are thread-based); the caller's tracing context is
+        carried over, so spans nest under the caller's turn.
+        """
+        return await asyncio.to_thread(self.process_message, message)
+
+    def _process_message(self, message: str) -> Tuple[str, Optional[str]]:
+        self.last_turn_messages = []
+        self.last_degraded = None
         msg_lower = message.lower()
         
         # Extract number from message if present
@@ -185,6 +475,7 @@ class DARSAgent:
         if (("set" in msg_lower or "change" in msg_lower or "adjust" in msg_lower) and 
             "humor" in msg_lower and has_number):
             # Directly set the humor level
+            tracer.incr("llm_local_intents", intent="set_humor")
             try:
                 new_level = int(numbers[0])
                 if 0 <= new_level <= 100:
@@ -205,6 +496,7 @@ class DARSAgent:
         
         # Check if just asking about current humor level
         elif "humor" in msg_lower and any(word in msg_lower for word in ["level", "setting", "what", "how"]):
+            tracer.incr("llm_local_intents", intent="get_humor")
             context = "very serious" if self.humor_level <= 20 else \
                      "mostly serious" if self.humor_level <= 40 else \
                      "balanced" if self.humor_level <= 60 else \
@@ -224,7 +516,40 @@ class DARSAgent:
             return text.strip()
 
         # Process message and get response
-        response = self.task.run(message)
+        if self._task_lock.locked():
+            # A previous run that blew its budget is still talking to OpenAI.
+            # That is the upstream still failing, so it counts against the breaker.
+            if self._run_abandoned:
+                breaker = self.llm_guard.breaker
+                if not breaker.allow():
+                    tracer.incr("circuit_rejected", upstream=self.llm_guard.name)
+                    return self._degraded_response(message, "CircuitOpenError")
+                breaker.record_failure()
+            return self._degraded_response(message, "busy")
+        
+        def run_task() -> Tuple[str, List[dict]]:
+            with self._task_lock:
+                self._run_abandoned = False
+                try:
+                    self._select_tools(message)
+                    response = self.task.run(message)
+                except Exception as e:
+                    if str(e).startswith("Maximum number of retries"):
+                        raise LLMUnavailable(str(e)) from e
+                    raise
+                finally:
+                    self._run_abandoned = False
+                return response, self.history_since(self.task.history_start)
+        
+        tracer.incr("llm_task_runs")
+        try:
+            with tracer.span("llm.task_run"):
+                response, self.last_turn_messages = self.llm_guard.call(run_task)
+        except (DeadlineExceeded, CircuitOpenError, InfiniteLoopException) + LLM_ERRORS as e:
+            if isinstance(e, DeadlineExceeded) and self._task_lock.locked():
+                self._run_abandoned = True
+            # A looping model is answered locally too, but doesn't count against the breaker
+            return self._degraded_response(message, type(e).__name__)
         natural_language, function_output = self._parse_response(response)
         
         # Clean up the natural language response
@@ -233,6 +558,148 @@ class DARSAgent:
         
         return natural_language, function_output
 
+    def _local_intent(self, message: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Handle simple appliance and music commands without the LLM"""
+        msg_lower = message.lower()
+        words = set(re.findall(r"[a-z]+", msg_lower))
+        
+        appliance_keywords = {
+            "coors light sign": ["coors", "beer sign", "neon"],
+            "hologram light": ["hologram"],
+            "room fan": ["fan"],
+        }
+        for appliance, keywords in appliance_keywords.items():
+            if any(k in msg_lower for k in keywords) and words & {"on", "off"}:
+                tool = self.ApplianceControlTool(state="off" not in words, appliance=appliance)
+                return self._split_tool_output(tool.handle())
+        
+        if words & {"music", "song", "veridis"} and words & {"stop", "pause"}:
+            return self._split_tool_output(self.SongPlayerTool(state=False).handle(self.agent))
+        play = re.search(r"\bplay\b(.*)", msg_lower)
+        if play or (words & {"music", "song"} and "start" in words):
+            song = play.group(1).strip(" .!?") if play else ""
+            tool = self.SongPlayerTool(state=True, song=song or None)
+            return self._split_tool_output(tool.handle(self.agent))
+        
+        return None
+
+    @staticmethod
+    def _split_tool_output(output: str) -> Tuple[str, Optional[str]]:
+        """Split a tool's "FUNC: ...\nverbal response" string"""
+        func_line, _, verbal = output.partition("\n")
+        return verbal.strip(), func_line.replace("FUNC:", "").strip()
+
+    def _degraded_response(self, message: str, reason: str) -> Tuple[str, Optional[str]]:
+        """Answer locally while the LLM is slow or unavailable"""
+        tracer.incr("llm_fallbacks", reason=reason)
+        self.last_degraded = reason
+        local = self._local_intent(message)
+        if local is not None:
+            return local
+        return (
+            "My uplink to the language model is down at the moment. "
+            "I can still switch the appliances and play music.",
+            None,
+        )
+
+    def history_since(self, mark: int) -> List[dict]:
+        """Return the LLM messages added to the agent history after index `mark`,
+        leaving out the system prompt"""
+        messages = []
+        for msg in self.agent.message_history[mark:]:
+            role = getattr(msg.role, "value", str(msg.role))
+            if role == "system":
+                continue
+            entry = {"role": role, "content": msg.content}
+            if getattr(msg, "function_call", None):
+                entry["function_call"] = {
+                    "name": msg.function_call.name,
+                    "arguments": msg.function_call.arguments,
+                }
+            messages.append(entry)
+        return messages
+
+    def release_documents(self) -> int:
+        """Drop this agent's finished ChatDocuments from langroid's global registry
+        and the task's response_sequence.
+
+        langroid registers every ChatDocument in ObjectRegistry and only removes
+        the ones it clears from an agent's history, so the documents behind each
+        task run pile up for the life of the process. Call between turns; the
+        documents still referenced by the history are kept. Returns the number
+        of registry entries removed.
+        """
+        if not self._task_lock.acquire(blocking=False):
+            return 0  # A run that blew its budget is still using them
+        try:
+            agent_id = _object_id(self.agent)
+            live = {m.chat_document_id for m in self.agent.message_history}
+            stale = set()
+            for doc_id, obj in list(ObjectRegistry.registry.items()):
+                if isinstance(obj, ChatDocument) and obj.metadata.agent_id == agent_id:
+                    # The user message a document answers is registered without an agent id
+                    stale.update((doc_id, obj.metadata.parent_id, obj.metadata.child_id))
+            stale -= live
+            stale.discard("")
+            for doc_id in stale:
+                ObjectRegistry.remove(doc_id)
+            self.task.response_sequence.clear()
+        finally:
+            self._task_lock.release()
+        if stale:
+            tracer.incr("llm_documents_released", len(stale))
+        return len(stale)
+
+    @property
+    def document_count(self) -> int:
+        """Objects held in langroid's global registry (agents and ChatDocuments)"""
+        return len(ObjectRegistry.registry)
+
+    @property
+    def own_document_count(self) -> int:
+        """ChatDocuments in langroid's global registry that belong to this agent"""
+        agent_id = _object_id(self.agent)
+        return sum(
+            1 for obj in list(ObjectRegistry.registry.values())
+            if isinstance(obj, ChatDocument) and obj.metadata.agent_id == agent_id
+        )
+
+    @property
+    def response_count(self) -> int:
+        """ChatDocuments held by the task's response_sequence"""
+        return len(self.task.response_sequence)
+
+    def recycle(self) -> bool:
+        """Replace the langroid agent and task with fresh ones.
+
+        Whatever langroid accumulated internally is dropped with the old agent;
+        the humor level carries over (turns share no history to keep). Returns
+        False if a run was still in progress.
+        """
+        if not self._task_lock.acquire(blocking=False):
+            return False
+        try:
+            old = self.agent
+            self._setup_agent(self.model)
+            self._unregister(old)
+        finally:
+            self._task_lock.release()
+        tracer.incr("llm_agent_recycles")
+        return True
+
+    def close(self) -> None:
+        """Release the langroid agent and its documents from the global registry.
+        Blocks until a run still in progress (one that blew its budget) finishes."""
+        with self._task_lock:
+            self._unregister(self.agent)
+
+    @staticmethod
+    def _unregister(agent) -> None:
+        agent_id = _object_id(agent)
+        for doc_id, obj in list(ObjectRegistry.registry.items()):
+            if doc_id == agent_id or (isinstance(obj, ChatDocument) and obj.metadata.agent_id == agent_id):
+                ObjectRegistry.remove(doc_id)
+
     def _parse_response(self, response: str) -> Tuple[str, Optional[str]]:
         """Helper method to parse the response and separate function output from natural language"""
         if not response or response.strip() == "":
@@ -261,7 +728,8 @@ class DARSAgent:
             r"Hologram Light turned (?:on|off).*$",
             r"Room Fan turned (?:on|off).*$",
             r"Humor level changed to:.*$",
-            r"Veridis Quo (?:playing|stopped).*$",
+            r"Now playing: .*$",
+            r"Music stopped.*$",
         ]
         
         natural_language = response
@@ -278,7 +746,7 @@ class DARSAgent:
 
     def _ensure_vault_directory(self) -> Path:
         """Ensure the vault directory exists and return its path"""
-        vault_path = Path.home() / ".config" / "DARS" / "mdvault"
+        vault_path = self.config_dir / "mdvault"
         vault_path.mkdir(parents=True, exist_ok=True)
         return vault_path
 
@@ -290,7 +758,7 @@ class DARSAgent:
 
     def _ensure_todo_directory(self) -> Path:
         """Ensure the todo directory exists and return its path"""
-        todo_path = Path.home() / ".config" / "DARS" / "todolist"
+        todo_path = self.config_dir / "todolist"
         todo_path.mkdir(parents=True, exist_ok=True)
         return todo_path
 
@@ -303,9 +771,9 @@ class DARSAgent:
         content: Optional[str] = Field(None, description="Content for new note or modifications")
         date: Optional[str] = Field(None, description="Date for the note (YYYY-MM-DD format)")
 
-        def _ensure_vault_directory(self) -> Path:
+        def _ensure_vault_directory(self, config_dir: Path) -> Path:
             """Ensure the vault directory exists and return its path"""
-            vault_path = Path.home() / ".config" / "DARS" / "mdvault"
+            vault_path = config_dir / "mdvault"
             vault_path.mkdir(parents=True, exist_ok=True)
             return vault_path
 
@@ -314,8 +782,9 @@ class DARSAgent:
             sanitized = re.sub(r'[^\w\s-]', '', title)
             return sanitized.strip().replace(' ', '_')
 
-        def handle(self) -> str:
-            vault_path = self._ensure_vault_directory()
+        @traced_tool
+        def handle(self, agent: lr.ChatAgent) -> str:
+            vault_path = self._ensure_vault_directory(agent.user_data["dars_agent"].config_dir)
             
             if self.operation == "new":
                 if not self.title:
@@ -395,14 +864,15 @@ date: {self.date}
         item_name: Optional[str] = Field(None, description="Name of the todo item")
         due_date: Optional[str] = Field(None, description="Due date for the item")
 
-        def _ensure_todo_directory(self) -> Path:
+        def _ensure_todo_directory(self, config_dir: Path) -> Path:
             """Ensure the todo directory exists and return its path"""
-            todo_path = Path.home() / ".config" / "DARS" / "todolist"
+            todo_path = config_dir / "todolist"
             todo_path.mkdir(parents=True, exist_ok=True)
             return todo_path
 
-        def handle(self) -> str:
-            todo_path = self._ensure_todo_directory()
+        @traced_tool
+        def handle(self, agent: lr.ChatAgent) -> str:
+            todo_path = self._ensure_todo_directory(agent.user_data["dars_agent"].config_dir)
             todo_file = todo_path / "todos.csv"
 
             # Create CSV if it doesn't exist
@@ -518,6 +988,7 @@ date: {self.date}
         purpose: str = "To adjust the humor level of DARS when user requests a change in humor"
         humor_level: int = Field(..., description="Humor level (0=serious to 100=extremely humorous)", ge=0, le=100)
 
+        @traced_tool
         def handle(self) -> str:
             # Get the context description based on humor level
             context = "very serious" if self.humor_level <= 20 else \
@@ -537,6 +1008,7 @@ date: {self.date}
         state: bool = Field(..., description="True for on, False for off")
         appliance: str = Field(..., description="Name of the appliance to control: 'coors light sign', 'hologram light', or 'room fan'")
 
+        @traced_tool
         def handle(self) -> str:
             # Validate appliance name
             valid_appliances = ["coors light sign", "hologram light", "room fan"]
@@ -568,45 +1040,38 @@ date: {self.date}
     class SongPlayerTool(ToolMessage):
         """Control music playback"""
         request: str = "song_player"
-        purpose: str = "To play or stop Veridis Quo"
+        purpose: str = "To play a song from the music library by name, or stop the music"
         state: bool = Field(..., description="True to play, False to stop")
-
-        def _ensure_music_directory(self) -> Path:
-            """Ensure the music directory exists and return its path"""
-            music_path = Path.home() / ".config" / "DARS" / "music"
-            music_path.mkdir(parents=True, exist_ok=True)
-            return music_path
-
-        def handle(self) -> str:
-            music_path = self._ensure_music_directory()
-            song_path = music_path / "veridis_quo.mp3"
-
-            if not song_path.exists():
-                return "FUNC: Error: Veridis Quo mp3 file not found in music directory"
+        song: Optional[str] = Field(None, description="Title and/or artist as the user said it; empty for the default song")
+
+        @traced_tool
+        def handle(self, agent: lr.ChatAgent) -> str:
+            dars = agent.user_data["dars_agent"]
+            player = dars.music_player or get_player()
+            if not self.state:
+                player.stop()
+                return "FUNC: Music stopped\nStopping the music. The silence is deafening."
+
+            library = dars.music_library or get_library()
+            if not library.tracks and library.scanning:
+                return "FUNC: Error: Music library is still being indexed\nI'm still indexing your music library. Ask me again in a moment."
+            if not library.tracks:
+                return f"FUNC: Error: No music found in {library.music_dir}"
+
+            # A song made of command words ("Music") is still looked up as a name
+            track = library.best_match(self.song) if self.song else None
+            if track is None:
+                if song_query(self.song):
+                    return f"FUNC: Error: No match for '{self.song}'\nI couldn't find anything like '{self.song}' in your music library."
+                track = library.best_match(DEFAULT_SONG) or library.tracks[0]
 
             try:
-                if self.state:  # Play the song
-                    pygame.mixer.init()
-                    pygame.mixer.music.load(str(song_path))
-                    pygame.mixer.music.play()
-                else:  # Stop the song
-                    pygame.mixer.music.stop()
-                    pygame.mixer.quit()
-
-                state_str = "playing" if self.state else "stopped"
-                
-                # Custom responses based on state
-                responses = {
-                    True: "Initiating playback of Veridis Quo. A classic choice.",
-                    False: "Stopping Veridis Quo. The silence is deafening."
-                }
-
-                function_output = f"FUNC: Veridis Quo {state_str}"
-                verbal_response = responses[self.state]
-                return f"{function_output}\n{verbal_response}"
+                player.play(track)
+            except pygame.error as e:
+                return f"FUNC: Error: Failed to play music: {str(e)}"
 
-            except Exception as e:
-                return f"FUNC: Error: Failed to {'play' if self.state else 'stop'} music: {str(e)}"
+            name = f"{track['artist']} - {track['title']}" if track["artist"] else track["title"]
+            return f"FUNC: Now playing: {name}\nInitiating playback of {track['title']}. A classic choice."
 
 # Example usage in a main.py file:
 def main():
@@ -0,0 +1,55 @@
+import re
+from typing import Dict, Iterable, List, Set
+
+
+# Keywords (whole words or phrases) that make a tool relevant to an utterance
+TOOL_KEYWORDS: Dict[str, List[str]] = {
+    "note_operation": [
+        "note", "notes", "vault", "jot", "write down", "writing", "remember", "obsidian",
+    ],
+    "todo_operation": [
+        "todo", "todos", "to do", "to-do", "task", "tasks", "remind", "reminder",
+        "due", "deadline", "complete", "completed", "done", "finish", "finished", "list",
+    ],
+    "adjust_humor": [
+        "humor", "humour", "funny", "joke", "jokes", "serious", "sarcastic", "sarcasm",
+        "personality", "wit", "witty",
+    ],
+    "appliance_control": [
+        "light", "lights", "sign", "coors", "neon", "beer", "hologram", "holographic",
+        "fan", "appliance", "appliances", "turn on", "turn off", "switch",
+    ],
+    "song_player": [
+        "music", "song", "songs", "play", "playing", "pause", "daft punk", "veridis", "quo", "tune",
+    ],
+}
+
+
+class ToolSelector:
+    """Pick the tools relevant to an utterance with a keyword match.
+
+    An utterance that matches nothing ("yes, go ahead") gets the full tool
+    set. Tools matched in the previous turn stay offered for one more turn,
+    so follow-ups such as "and play some music too" keep their context.
+    """
+
+    def __init__(self, tools: Iterable[str], keywords: Dict[str, List[str]] = None):
+        self.tools: Set[str] = set(tools)
+        keywords = keywords or TOOL_KEYWORDS
+        self._patterns = {
+            tool: re.compile(r"\b(" + "|".join(re.escape(k) for k in words) + r")\b")
+            for tool, words in keywords.items()
+            if tool in self.tools
+        }
+        self.previous: Set[str] = set()
+
+    def match(self, message: str) -> Set[str]:
+        """Tools whose keywords appear in the message"""
+        text = message.lower()
+        return {tool for tool, pattern in self._patterns.items() if pattern.search(text)}
+
+    def select(self, message: str) -> Set[str]:
+        matched = self.match(message)
+        selected = (matched | self.previous) if matched else set(self.tools)
+        self.previous = matched
+        return selected
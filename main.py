@@ -1,65 +1,163 @@
 from languageModel.llm import DARSAgent
 from speechRecognition.speechRecognition import SpeechRecognizer
 from speechSynthesis.speechSynthesis import TarsVoice
+from telemetry.tracing import tracer, configure_from_env
+from telemetry.memoryHealth import MemoryHealth
+from replay.sessionArchive import SessionRecorder
+from music.musicLibrary import get_library, get_player
 import os
+import time
 import pygame
 from pathlib import Path
 
+ERROR_REPLY = "I encountered an error. Please try again."
+
 class DARSVoiceInterface:
-    def __init__(self):
-        self.dars = DARSAgent()
-        self.speech_recognizer = SpeechRecognizer()
-        self.tars_voice = TarsVoice()
+    def __init__(self, dars=None, speech_recognizer=None, tars_voice=None, recorder=None, memory_health=None):
+        self.dars = dars or DARSAgent()
+        self.speech_recognizer = speech_recognizer or SpeechRecognizer()
+        self.tars_voice = tars_voice or TarsVoice()
+        
+        # Open connections to OpenAI and ElevenLabs before the first turn needs them
+        self.http_pool = self.dars.http_pool
+        self.warm_connections()
+        # Start indexing the music directory now rather than on the first song request
+        if self.dars.music_library is None:
+            get_library()
+        
+        # Optional SessionRecorder capturing every turn for later replay
+        self.recorder = recorder
+        if recorder is not None:
+            self.speech_recognizer.audio_tap = recorder.record_audio
+            tracer.exporters.append(recorder)
+        
+        # Optional MemoryHealth keeping langroid's documents and RSS bounded between turns
+        self.memory_health = memory_health
+        if memory_health is not None:
+            self.watch_memory(memory_health)
+        
+    def watch_memory(self, health: MemoryHealth) -> None:
+        """Register this interface's growable state with a MemoryHealth monitor"""
+        # Every run starts from an empty history, so the conversation itself can't
+        # grow; langroid's registry and the task's response_sequence can
+        health.add_cap(
+            "llm_documents",
+            lambda: self.dars.document_count,
+            int(os.getenv("DARS_MAX_DOCUMENTS", "200")),
+            self.dars.release_documents,
+        )
+        health.add_cap(
+            "llm_responses",
+            lambda: self.dars.response_count,
+            int(os.getenv("DARS_MAX_RESPONSES", "50")),
+            self.dars.release_documents,
+        )
+        health.add_cap("stt_audio_queue", self.speech_recognizer.audio_queue.qsize)
+        health.add_recycler("agent", self.dars.recycle)
+        health.add_recycler("recognizer", self.speech_recognizer.recycle)
+        
+    def warm_connections(self, only_if_idle: bool = False):
+        """Warm the shared HTTP pool; call when a turn is imminent (Enter press, wake word)"""
+        urls = [self.dars.warm_url, self.tars_voice.warm_url]
+        if only_if_idle:
+            return self.http_pool.warm_if_idle(urls)
+        return self.http_pool.warm(urls)
+        
+    def run_turn(self) -> bool:
+        """Listen for one command, answer it, and return False when DARS should shut down"""
+        with tracer.turn():
+            tracer.incr("turns")
+            if self.recorder is not None:
+                self.recorder.begin_turn(tracer.current_turn_id)
+            keep_running = self._run_turn()
+        if self.memory_health is not None:
+            self.memory_health.after_turn()
+        return keep_running
+
+    def _speak(self, text: str) -> None:
+        if self.recorder is not None:
+            self.recorder.record_tts(text)
+        self.tars_voice.generate_speech(text)
+
+    def _apologize(self) -> None:
+        """Tell the user a turn failed. The failure may have been the voice itself,
+        so if speaking raises this ends in the cache, canned clip, then text fallback."""
+        try:
+            self._speak(ERROR_REPLY)
+        except Exception:
+            self.tars_voice.play_fallback(ERROR_REPLY)
+
+    def _run_turn(self) -> bool:
+        # Listen for user input
+        print("Listening for your command...")
+        listen_start = time.perf_counter()
+        user_input = self.speech_recognizer.listen()
+        print("You said:", user_input)
+        if self.recorder is not None:
+            self.recorder.record_transcript(user_input, time.perf_counter() - listen_start)
+        if tracer.current_span is not None:
+            tracer.current_span.set(transcript=user_input)
+        
+        # Check for exit commands
+        if user_input.lower() in ['quit', 'exit', 'stop', 'goodbye']:
+            farewell = "Shutting down DARS. Goodbye!"
+            print("DARS says:", farewell)
+            self._speak(farewell)
+            return False
+        
+        # Process the input through DARS
+        llm_start = time.perf_counter()
+        natural_language, function_output = self.dars.process_message(user_input)
+        if self.recorder is not None:
+            self.recorder.record_llm(
+                user_input,
+                self.dars.last_turn_messages,
+                natural_language,
+                function_output,
+                time.perf_counter() - llm_start,
+            )
+        
+        # Handle function output if present
+        if function_output:
+            print("Function:", function_output)
+        
+        # Convert DARS's response to speech
+        if natural_language:
+            print("DARS says:", natural_language)
+            self._speak(natural_language)
+        
+        return True
         
     def run(self):
         # Initial greeting using pre-recorded audio
         greeting = "DARS initialized and ready. Press enter to start voice input. How can I assist you today?"
         print("DARS says:", greeting)
         
-        # Play pre-recorded greeting
-        pygame.mixer.init()
-        pygame.mixer.music.load(str(Path.home() / ".config" / "dars" / "dars_greeting.mp3"))
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():  # Wait for the greeting to finish
+        # Play pre-recorded greeting through the long-lived music mixer
+        player = get_player()
+        player.play({"path": str(Path.home() / ".config" / "dars" / "dars_greeting.mp3")})
+        while player.playing:  # Wait for the greeting to finish
             pygame.time.Clock().tick(10)
-        pygame.mixer.quit()
+        player.stop()
         
         while True:
             try:
                 # Wait for Enter key
                 input("\nPress Enter to start listening...")
                 
-                # Listen for user input
-                print("Listening for your command...")
-                user_input = self.speech_recognizer.listen()
-                print("You said:", user_input)
+                # The turn is imminent: re-warm connections while the user speaks
+                self.warm_connections(only_if_idle=True)
                 
-                # Check for exit commands
-                if user_input.lower() in ['quit', 'exit', 'stop', 'goodbye']:
-                    farewell = "Shutting down DARS. Goodbye!"
-                    print("DARS says:", farewell)
-                    self.tars_voice.generate_speech(farewell)
+                if not self.run_turn():
                     break
                 
-                # Process the input through DARS
-                natural_language, function_output = self.dars.process_message(user_input)
-                
-                # Handle function output if present
-                if function_output:
-                    print("Function:", function_output)
-                
-                # Convert DARS's response to speech
-                if natural_language:
-                    print("DARS says:", natural_language)
-                    self.tars_voice.generate_speech(natural_language)
-                
             except KeyboardInterrupt:
                 print("\nInterrupt received, shutting down...")
                 break
             except Exception as e:
                 error_msg = f"An error occurred: {str(e)}"
                 print(error_msg)
-                self.tars_voice.generate_speech("I encountered an error. Please try again.")
+                self._apologize()
 
 def main():
     # Check for required environment variables
@@ -67,8 +165,13 @@ def main():
         print("Error: ELEVENLABS_API_KEY environment variable not set")
         return
         
+    configure_from_env()
+    memory_health = MemoryHealth.from_env()
+    
     try:
-        dars_interface = DARSVoiceInterface()
+        dars_interface = DARSVoiceInterface(recorder=SessionRecorder.from_env(), memory_health=memory_health)
+        if memory_health is not None:
+            memory_health.start()
         dars_interface.run()
     except Exception as e:
         print(f"Fatal error: {str(e)}")
@@ -0,0 +1,348 @@
+import os
+import re
+import math
+import time
+import wave
+import sqlite3
+import difflib
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import fire
+import pygame
+
+from telemetry.tracing import tracer
+
+# Formats pygame.mixer.music can stream
+AUDIO_EXTENSIONS = {".mp3", ".ogg", ".oga", ".opus", ".flac", ".wav"}
+
+# Words a spoken request puts before the actual song name ("play me some music by ...")
+COMMAND_WORDS = {"play", "song", "songs", "track", "music", "some", "please", "put", "by", "me", "a", "listen", "to", "on"}
+# ... and after it ("... please")
+TRAILING_WORDS = {"please", "song", "songs", "track", "music"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    artist TEXT,
+    album TEXT,
+    duration REAL
+)
+"""
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercase ASCII word tokens ("Beyoncé - Halo!" -> ["beyonce", "halo"])"""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def song_query(text: Optional[str]) -> Optional[str]:
+    """The song name part of a request ("play some daft punk please" -> "daft punk"), or None.
+    Only the leading command and trailing filler go, so "take me to church" stays whole."""
+    words = normalize(text)
+    while words and words[0] in COMMAND_WORDS:
+        words.pop(0)
+    while words and words[-1] in TRAILING_WORDS:
+        words.pop()
+    return " ".join(words) or None
+
+
+def read_metadata(path: str) -> Dict:
+    """Title, artist, album and duration from tags, falling back to "Artist - Title" file names"""
+    stem = Path(path).stem
+    artist, _, title = stem.partition(" - ")
+    metadata = {"title": title or stem, "artist": artist if title else None, "album": None, "duration": None}
+
+    try:
+        import mutagen  # Optional: tag support
+        audio = mutagen.File(path, easy=True)
+    except Exception:
+        # mutagen missing, or tags it can't parse
+        audio = None
+    if audio is not None:
+        tags = audio.tags or {}
+        for key in ("title", "artist", "album"):
+            if tags.get(key):
+                metadata[key] = tags[key][0]
+        if getattr(audio, "info", None) is not None:
+            metadata["duration"] = round(audio.info.length, 3)
+    elif path.lower().endswith(".wav"):
+        try:
+            with wave.open(path, "rb") as wf:
+                metadata["duration"] = round(wf.getnframes() / wf.getframerate(), 3)
+        except (wave.Error, EOFError):
+            pass
+    return metadata
+
+
+class MusicLibrary:
+    """Persistent index of the music directory with fuzzy lookup by spoken name.
+
+    scan() only reads tags for files whose mtime or size changed since the last
+    scan. Lookups run against an in-memory inverted index of title/artist/album
+    words; unknown query words are mapped to close vocabulary words first, so
+    recognizer slips like "veritas quo" still find "Veridis Quo".
+    """
+
+    def __init__(self, music_dir: Optional[Path] = None, index_path: Optional[Path] = None):
+        self.music_dir = Path(music_dir or Path.home() / ".config" / "DARS" / "music")
+        self.music_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = Path(index_path or Path.home() / ".config" / "DARS" / "music_index.sqlite")
+        self._db = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        self._db.execute(SCHEMA)
+        # _lock guards the in-memory index; scans hold _scan_lock so lookups never wait on disk
+        self._lock = threading.RLock()
+        self._scan_lock = threading.Lock()
+        self._scanner: Optional[threading.Thread] = None
+        self.last_scan = 0.0
+        self._load()
+
+    def _load(self) -> None:
+        """Rebuild the in-memory search index from the database"""
+        rows = self._db.execute("SELECT path, title, artist, album, duration FROM tracks ORDER BY path").fetchall()
+        tracks = [dict(zip(("path", "title", "artist", "album", "duration"), row)) for row in rows]
+        postings: Dict[str, set] = {}
+        keys = []
+        for i, track in enumerate(tracks):
+            tokens = normalize(" ".join(filter(None, (track["title"], track["artist"], track["album"]))))
+            keys.append(" ".join(normalize(f"{track['title']} {track['artist'] or ''}")))
+            for token in tokens:
+                postings.setdefault(token, set()).add(i)
+
+        by_initial: Dict[str, List[str]] = {}
+        for token in postings:
+            by_initial.setdefault(token[0], []).append(token)
+
+        with self._lock:
+            self.tracks = tracks
+            self._keys = keys
+            self._postings = postings
+            self._vocab_by_initial = by_initial
+            self._idf = {t: math.log(1 + len(tracks) / len(ids)) for t, ids in postings.items()}
+
+    def scan(self) -> Dict[str, float]:
+        """Bring the index up to date with the music directory"""
+        start = time.perf_counter()
+        with self._scan_lock:
+            known = {path: (mtime, size) for path, mtime, size in self._db.execute("SELECT path, mtime, size FROM tracks")}
+            seen = set()
+            changed = []
+            for root, _, files in os.walk(self.music_dir):
+                for name in files:
+                    if os.path.splitext(name)[1].lower() not in AUDIO_EXTENSIONS:
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    seen.add(path)
+                    if known.get(path) != (stat.st_mtime, stat.st_size):
+                        changed.append((path, stat.st_mtime, stat.st_size))
+
+            removed = [path for path in known if path not in seen]
+            with self._db:
+                self._db.executemany("DELETE FROM tracks WHERE path = ?", [(p,) for p in removed])
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (path, mtime, size, m["title"], m["artist"], m["album"], m["duration"])
+                        for path, mtime, size in changed
+                        for m in [read_metadata(path)]
+                    ],
+                )
+            if changed or removed:
+                self._load()
+            self.last_scan = time.monotonic()
+
+        stats = {
+            "tracks": len(seen),
+            "added": sum(1 for p, _, _ in changed if p not in known),
+            "updated": sum(1 for p, _, _ in changed if p in known),
+            "removed": len(removed),
+            "seconds": round(time.perf_counter() - start, 4),
+        }
+        tracer.incr("music_scans")
+        return stats
+
+    def refresh(self, max_age: float = 300.0, wait: bool = True) -> None:
+        """Rescan if the last scan is older than max_age seconds. With wait=False
+        the scan runs on a background thread and lookups use the current index."""
+        if self.last_scan and time.monotonic() - self.last_scan <= max_age:
+            return
+        if wait:
+            self.scan()
+            return
+        with self._lock:
+            if self.scanning:
+                return
+            self._scanner = threading.Thread(target=self.scan, name="music-scan", daemon=True)
+            self._scanner.start()
+
+    @property
+    def scanning(self) -> bool:
+        return self._scanner is not None and self._scanner.is_alive()
+
+    def _resolve(self, token: str) -> List[Tuple[str, float]]:
+        """Vocabulary words matching a query word, with their similarity"""
+        if token in self._postings:
+            return [(token, 1.0)]
+        candidates = self._vocab_by_initial.get(token[0], [])
+        return [
+            (word, difflib.SequenceMatcher(None, token, word).ratio())
+            for word in difflib.get_close_matches(token, candidates, n=3, cutoff=0.75)
+        ]
+
+    def find(self, query: str, limit: int = 5) -> List[Tuple[float, Dict]]:
+        """Best matching tracks for a spoken request, as (score in 0-1, track).
+        When the song part matches nothing the whole request is tried, so a
+        title made of command words ("Music") can still be found."""
+        name = song_query(query)
+        results = self._rank(name, limit) if name else []
+        whole = " ".join(normalize(query))
+        if not results and whole and whole != name:
+            results = self._rank(whole, limit)
+        return results
+
+    def _rank(self, query: str, limit: int) -> List[Tuple[float, Dict]]:
+        tokens = query.split()
+
+        with self._lock:
+            default_idf = math.log(1 + len(self.tracks)) if self.tracks else 1.0
+            weights = {}
+            coverage: Dict[int, float] = {}
+            for token in tokens:
+                matches = self._resolve(token)
+                weights[token] = max((self._idf[w] for w, _ in matches), default=default_idf)
+                for word, similarity in matches:
+                    for i in self._postings[word]:
+                        coverage[i] = coverage.get(i, 0.0) + self._idf[word] * similarity / len(matches)
+            total = sum(weights.values())
+
+            # Rank by weighted word coverage, then refine the leaders by whole-string similarity
+            ranked = sorted(coverage.items(), key=lambda item: item[1], reverse=True)[:max(limit, 20)]
+            phrase = query
+            results = []
+            for i, covered in ranked:
+                ratio = difflib.SequenceMatcher(None, phrase, self._keys[i]).ratio()
+                results.append((round(0.7 * min(1.0, covered / total) + 0.3 * ratio, 3), self.tracks[i]))
+        results.sort(key=lambda item: item[0], reverse=True)
+        return results[:limit]
+
+    def best_match(self, query: str, min_score: float = 0.5) -> Optional[Dict]:
+        results = self.find(query, limit=1)
+        if results and results[0][0] >= min_score:
+            return results[0][1]
+        return None
+
+
+class MusicPlayer:
+    """Playback through one long-lived pygame mixer.
+
+    pygame.mixer.music decodes from disk while it plays, so even long files
+    start immediately; keeping the mixer open avoids re-opening the audio
+    device on every request.
+    """
+
+    def __init__(self, frequency: int = 44100, buffer: int = 1024):
+        self.frequency = frequency
+        self.buffer = buffer
+        self.current: Optional[Dict] = None
+        self._lock = threading.Lock()
+
+    def _ensure_mixer(self) -> None:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=self.frequency, buffer=self.buffer)
+
+    def play(self, track: Dict) -> float:
+        """Start streaming a track; returns seconds until playback started"""
+        with self._lock:
+            start = time.perf_counter()
+            self._ensure_mixer()
+            pygame.mixer.music.load(track["path"])
+            pygame.mixer.music.play()
+            self.current = track
+            elapsed = time.perf_counter() - start
+        tracer.incr("music_plays")
+        return elapsed
+
+    def stop(self) -> None:
+        with self._lock:
+            if pygame.mixer.get_init():
+                pygame.mixer.music.stop()
+            self.current = None
+
+    @property
+    def playing(self) -> bool:
+        return bool(pygame.mixer.get_init()) and pygame.mixer.music.get_busy()
+
+
+class RoomPlayer:
+    """Playback state for a room served over the network.
+
+    The room's own client plays the track; this only records what it should be
+    playing, so one room's request never starts audio on the server host or in
+    another room.
+    """
+
+    def __init__(self):
+        self.current: Optional[Dict] = None
+
+    def play(self, track: Dict) -> float:
+        self.current = track
+        tracer.incr("music_plays")
+        return 0.0
+
+    def stop(self) -> None:
+        self.current = None
+
+    @property
+    def playing(self) -> bool:
+        return self.current is not None
+
+
+_library: Optional[MusicLibrary] = None
+_player: Optional[MusicPlayer] = None
+_singleton_lock = threading.Lock()
+
+
+def get_library() -> MusicLibrary:
+    """The process-wide library, rescanned in the background at most every
+    DARS_MUSIC_RESCAN seconds; until a scan finishes it serves the persisted index"""
+    global _library
+    with _singleton_lock:
+        if _library is None:
+            _library = MusicLibrary()
+    _library.refresh(float(os.getenv("DARS_MUSIC_RESCAN", "300")), wait=False)
+    return _library
+
+
+def get_player() -> MusicPlayer:
+    global _player
+    with _singleton_lock:
+        if _player is None:
+            _player = MusicPlayer()
+        return _player
+
+
+def scan(music_dir: Optional[str] = None, index: Optional[str] = None):
+    """Index the music directory and print what changed"""
+    print(MusicLibrary(music_dir, index).scan())
+
+
+def search(query: str, limit: int = 5, music_dir: Optional[str] = None, index: Optional[str] = None):
+    """Show the best matches for a spoken song name"""
+    library = MusicLibrary(music_dir, index)
+    library.refresh(0)
+    for score, track in library.find(query, limit):
+        print(f"{score:.3f}  {track['artist'] or '?'} - {track['title']}  ({track['path']})")
+
+
+if __name__ == "__main__":
+    fire.Fire({"scan": scan, "search": search})
@@ -0,0 +1,109 @@
+import os
+import time
+import threading
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+from telemetry.tracing import tracer
+
+
+class HTTPPool:
+    """Shared keep-alive HTTP connection pool for the cloud clients.
+
+    Connection setup is counted through httpcore's trace hook, so the
+    connection-reuse ratio can be read from stats() or the metrics endpoint.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 120.0,
+        verify=True,
+        name: str = "default",
+    ):
+        self.name = name
+        self.keepalive_expiry = keepalive_expiry
+        self.client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            verify=verify,
+            follow_redirects=True,
+            event_hooks={"request": [self._on_request]},
+        )
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "connections": 0, "tls_handshakes": 0, "warmups": 0}
+        self.last_used = 0.0
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+        tracer.incr(f"http_{key}", pool=self.name)
+
+    def _on_request(self, request: httpx.Request) -> None:
+        self._count("requests")
+        self.last_used = time.monotonic()
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name: str, info: Dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._count("connections")
+        elif event_name == "connection.start_tls.complete":
+            self._count("tls_handshakes")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats["requests"]
+        stats["reuse_ratio"] = round(1 - stats["connections"] / requests, 3) if requests else 0.0
+        return stats
+
+    def warm(self, urls: Iterable[str], background: bool = True) -> Optional[threading.Thread]:
+        """Open connections to each origin ahead of use with a cheap HEAD request"""
+        urls = [url for url in urls if url]
+
+        def run() -> None:
+            for url in urls:
+                try:
+                    self.client.head(url, timeout=5.0)
+                    self._count("warmups")
+                except httpx.HTTPError as e:
+                    print(f"Connection warm-up to {url} failed: {str(e)}")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="http-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def warm_if_idle(self, urls: Iterable[str], idle_after: float = 20.0) -> Optional[threading.Thread]:
+        """Re-warm before an imminent turn if the pool may have gone cold"""
+        if time.monotonic() - self.last_used < idle_after:
+            return None
+        return self.warm(urls)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+_pool: Optional[HTTPPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> HTTPPool:
+    """The process-wide pool, configured by DARS_HTTP_MAX_CONNECTIONS,
+    DARS_HTTP_MAX_KEEPALIVE and DARS_HTTP_KEEPALIVE_EXPIRY"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HTTPPool(
+                max_connections=int(os.getenv("DARS_HTTP_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("DARS_HTTP_MAX_KEEPALIVE", "10")),
+                keepalive_expiry=float(os.getenv("DARS_HTTP_KEEPALIVE_EXPIRY", "120")),
+            )
+        return _pool
@@ -0,0 +1,191 @@
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Optional, Tuple
+
+import httpx
+
+from telemetry.tracing import tracer
+
+# Worker threads shared by every guarded call; abandoned attempts finish here.
+# Threads start on demand, so size this for the busiest case (server mode).
+GUARDED_WORKERS = int(os.getenv("DARS_GUARDED_WORKERS", "32"))
+_executor = ThreadPoolExecutor(max_workers=GUARDED_WORKERS, thread_name_prefix="guarded-call")
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while its circuit breaker is open"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call does not finish within its latency budget"""
+
+
+# Errors that mean the upstream is slow or down. Clients add their SDK's API
+# error; anything else is a bug and propagates without touching the breaker.
+UPSTREAM_ERRORS: Tuple[type, ...] = (httpx.HTTPError, TimeoutError, ConnectionError)
+
+
+class LatencyTracker:
+    """Rolling window of successful call durations"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until enough samples are collected"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures.
+
+    closed -> open after failure_threshold consecutive failures; open -> half-open
+    after reset_timeout seconds, letting one trial call through; the trial's
+    outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """End a call that says nothing about upstream health (it failed on a bug)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    tracer.incr("circuit_opened", upstream=self.name)
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class GuardedCall:
+    """Run an upstream call under a latency budget, hedging and a circuit breaker.
+
+    If the first attempt has not finished by the observed p95 latency, a second
+    identical attempt is started and whichever succeeds first wins. Only use
+    hedging for idempotent, stateless calls.
+
+    Only exceptions in `failures` (and the deadline) count against the
+    breaker; any other exception is re-raised straight away.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        budget: float,
+        hedge: bool = True,
+        min_hedge_delay: float = 0.05,
+        breaker: Optional[CircuitBreaker] = None,
+        tracker: Optional[LatencyTracker] = None,
+        failures: Tuple[type, ...] = UPSTREAM_ERRORS,
+    ):
+        self.name = name
+        self.budget = budget
+        self.hedge = hedge
+        self.min_hedge_delay = min_hedge_delay
+        self.breaker = breaker or CircuitBreaker(name)
+        self.tracker = tracker or LatencyTracker()
+        self.failures = failures
+
+    def _submit(self, fn: Callable):
+        # Run in a copy of the caller's context so spans nest under the current turn
+        return _executor.submit(contextvars.copy_context().run, fn)
+
+    def call(self, fn: Callable):
+        if not self.breaker.allow():
+            tracer.incr("circuit_rejected", upstream=self.name)
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        start = time.perf_counter()
+        deadline = start + self.budget
+        first = self._submit(fn)
+        # Each attempt's latency counts from its own submission, so a winning
+        # hedge does not feed the hedge wait back into the p95
+        submitted = {first: start}
+        pending = {first}
+        hedge_delay = self.tracker.percentile(95) if self.hedge else None
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            timeout = remaining
+            if hedge_delay is not None and not hedged:
+                timeout = min(remaining, max(self.min_hedge_delay, start + hedge_delay - time.perf_counter()))
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    self.tracker.add(time.perf_counter() - submitted[future])
+                    self.breaker.record_success()
+                    return future.result()
+                if not isinstance(error, self.failures):
+                    self.breaker.release()
+                    raise error
+                last_error = error
+
+            if not done and hedge_delay is not None and not hedged:
+                hedged = True
+                tracer.incr("hedged_requests", upstream=self.name)
+                hedge = self._submit(fn)
+                submitted[hedge] = time.perf_counter()
+                pending.add(hedge)
+            elif not pending and not hedged and hedge_delay is not None and time.perf_counter() < deadline:
+                # The first attempt failed fast; use the hedge as a retry
+                hedged = True
+                retry = self._submit(fn)
+                submitted[retry] = time.perf_counter()
+                pending.add(retry)
+
+        self.breaker.record_failure()
+        if pending:
+            tracer.incr("deadline_exceeded", upstream=self.name)
+            raise DeadlineExceeded(f"{self.name} exceeded its {self.budget:.1f}s budget")
+        raise last_error
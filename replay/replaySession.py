@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fire
+
+from main import DARSVoiceInterface
+from languageModel.llm import DARSAgent
+from speechRecognition.speechRecognition import ClipSpeechRecognizer
+from speechRecognition.batchTranscription import DEFAULT_MODEL_PATH
+from speechSynthesis.speechSynthesis import TarsVoice
+from telemetry.tracing import tracer
+from benchmarks.fakeServers import FakeOpenAIServer, FakeTTSServer
+from benchmarks.latencyBenchmark import BenchmarkPlayer, TurnCollector
+from music.musicLibrary import MusicLibrary
+from replay.sessionArchive import load_turns
+
+
+def _span_durations(spans: List[Dict]) -> Dict[str, float]:
+    """Total milliseconds per span name"""
+    totals = {}
+    for span in spans:
+        if span.get("duration_ms") is not None:
+            totals[span["name"]] = totals.get(span["name"], 0.0) + span["duration_ms"]
+    return totals
+
+
+def _tool_calls(messages: List[Dict]) -> List[Dict]:
+    """The tools the LLM called, as native function calls or langroid JSON requests"""
+    decoder = json.JSONDecoder()
+    calls = []
+    for msg in messages:
+        if msg["role"] != "assistant":
+            continue
+        if msg.get("function_call"):
+            calls.append({"name": msg["function_call"]["name"], "arguments": msg["function_call"]["arguments"]})
+            continue
+        text = msg.get("content") or ""
+        i = 0
+        while (start := text.find("{", i)) != -1:
+            try:
+                obj, i = decoder.raw_decode(text, start)
+            except ValueError:
+                i = start + 1
+                continue
+            if isinstance(obj, dict) and "request" in obj:
+                arguments = dict(obj)
+                calls.append({"name": arguments.pop("request"), "arguments": arguments})
+    return calls
+
+
+def build_llm_script(turns: List[Dict], use_timing: bool) -> List[Dict]:
+    """Turn recorded LLM exchanges into FakeOpenAIServer script entries.
+
+    Entries match the exact utterance the LLM saw, and a repeated utterance
+    gets its recorded replies turn by turn in recording order.
+    """
+    script = []
+    for turn in turns:
+        llm = turn.get("llm")
+        if not llm:
+            continue
+        replies = []
+        for msg in llm["messages"]:
+            if msg["role"] != "assistant":
+                continue
+            if msg.get("function_call"):
+                replies.append({"content": msg.get("content") or "", "tool": msg["function_call"]})
+            else:
+                replies.append(msg.get("content") or "")
+        if not replies:
+            continue
+        utterance = next((m["content"] for m in llm["messages"] if m["role"] == "user"), llm["message"])
+        entry = {"match": utterance, "exact": True, "replies": replies}
+        if use_timing:
+            entry["first_token_delay"] = llm["seconds"] / len(replies)
+            entry["token_delay"] = 0.0
+        script.append(entry)
+    return script
+
+
+def _recorded_tts_delay(turns: List[Dict]) -> float:
+    """Median recorded time to first TTS byte, in seconds"""
+    delays = sorted(
+        span["attributes"]["first_byte_ms"] / 1000
+        for turn in turns for span in turn["spans"]
+        if span["name"] == "tts.generate_speech" and "first_byte_ms" in span["attributes"]
+    )
+    return delays[len(delays) // 2] if delays else 0.0
+
+
+def replay(
+    archive: str,
+    llm: str = "recorded",
+    tts: str = "recorded",
+    realtime: bool = False,
+    model_path: str = DEFAULT_MODEL_PATH,
+    sandbox_home: bool = True,
+) -> List[Dict]:
+    """Push a recorded session back through DARSVoiceInterface.
+
+    llm/tts: "recorded" answers with the recorded replies and timings,
+    "stub" answers instantly with a fixed reply. With sandbox_home, notes,
+    todos, the music library and the TTS phrase cache live in a temporary
+    directory removed afterwards instead of under ~/.config/DARS.
+    """
+    turns = [t for t in load_turns(archive) if t["audio"]]
+    os.environ.setdefault("ELEVENLABS_API_KEY", "replay")
+
+    if llm == "recorded":
+        llm_server = FakeOpenAIServer(build_llm_script(turns, use_timing=True))
+    else:
+        llm_server = FakeOpenAIServer(first_token_delay=0.0, token_delay=0.0)
+    if tts == "recorded":
+        tts_server = FakeTTSServer(first_byte_delay=_recorded_tts_delay(turns))
+    else:
+        tts_server = FakeTTSServer(first_byte_delay=0.0, chunk_delay=0.0)
+
+    # Notes, todos, the music index and the TTS phrase cache go to explicit paths
+    sandbox = tempfile.TemporaryDirectory(prefix="dars-replay-") if sandbox_home else None
+    agent_paths, cache_dir = {}, None
+    if sandbox is not None:
+        root = Path(sandbox.name)
+        agent_paths = {
+            "config_dir": str(root / "config"),
+            "music_library": MusicLibrary(root / "music", root / "music_index.sqlite"),
+        }
+        cache_dir = root / "tts_cache"
+
+    collector = TurnCollector()
+    tracer.exporters.append(collector)
+    llm_server.start()
+    tts_server.start()
+
+    try:
+        interface = DARSVoiceInterface(
+            dars=DARSAgent(api_key="replay", api_base=f"{llm_server.url}/v1", no_cache=True, **agent_paths),
+            speech_recognizer=ClipSpeechRecognizer(
+                [t["audio"] for t in turns], model_path=model_path, realtime=realtime
+            ),
+            tars_voice=TarsVoice(base_url=tts_server.url, player=BenchmarkPlayer(), cache_dir=cache_dir),
+        )
+
+        results = []
+        for turn in turns:
+            interface.dars.last_turn_messages = []
+            interface.run_turn()
+            replayed = collector.turns[-1]
+            replayed_spans = [span.to_dict() for span in replayed.spans]
+            transcript = next(
+                (s["attributes"].get("transcript") for s in replayed_spans if s["name"] == "turn"),
+                None,
+            )
+            results.append({
+                "turn_id": turn["turn_id"],
+                "recorded_transcript": turn["transcript"],
+                "replayed_transcript": transcript,
+                "recorded_tools": _tool_calls(turn["llm"]["messages"]) if turn["llm"] else [],
+                "replayed_tools": _tool_calls(interface.dars.last_turn_messages),
+                "recorded_ms": _span_durations(turn["spans"]),
+                "replayed_ms": _span_durations(replayed_spans),
+            })
+    finally:
+        tracer.exporters.remove(collector)
+        llm_server.stop()
+        tts_server.stop()
+        if sandbox is not None:
+            sandbox.cleanup()
+
+    return results
+
+
+def main(
+    archive: str,
+    llm: str = "recorded",
+    tts: str = "recorded",
+    realtime: bool = False,
+    output: Optional[str] = None,
+    strict: bool = False,
+    model_path: str = DEFAULT_MODEL_PATH,
+):
+    """Replay a recorded DARS session offline and compare it with the recording
+
+    Example:
+        python -m replay.replaySession ~/.config/DARS/sessions/session-20260101-120000.dars --llm stub
+
+    With --strict, exits with status 1 if any transcript differs from the recording,
+    or with --llm recorded, if any turn called different tools.
+    """
+    results = replay(archive, llm, tts, realtime, model_path)
+    mismatches = 0
+
+    for result in results:
+        same = result["recorded_transcript"] == result["replayed_transcript"]
+        same_tools = llm != "recorded" or result["recorded_tools"] == result["replayed_tools"]
+        mismatches += not (same and same_tools)
+        status = "OK" if same and same_tools else "TRANSCRIPT CHANGED" if not same else "TOOLS CHANGED"
+        print(f"Turn {result['turn_id']}: {status}")
+        if not same:
+            print(f"  recorded: {result['recorded_transcript']}")
+            print(f"  replayed: {result['replayed_transcript']}")
+        if not same_tools:
+            print(f"  recorded tools: {json.dumps(result['recorded_tools'])}")
+            print(f"  replayed tools: {json.dumps(result['replayed_tools'])}")
+        for name in sorted(set(result["recorded_ms"]) | set(result["replayed_ms"])):
+            recorded = result["recorded_ms"].get(name)
+            replayed = result["replayed_ms"].get(name)
+            print(
+                f"  {name:<28}"
+                f"{'-' if recorded is None else f'{recorded:.1f}':>10}"
+                f"{'-' if replayed is None else f'{replayed:.1f}':>10} ms"
+            )
+
+    if output:
+        with open(output, "w") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+    if strict and mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
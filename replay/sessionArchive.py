@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import zlib
+import struct
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"DARSREC1"
+
+# Record kinds
+SESSION_START = 1
+TURN_START = 2
+AUDIO = 3
+TRANSCRIPT = 4
+LLM_EXCHANGE = 5
+TTS = 6
+SPANS = 7
+
+# kind, wall time, compressed meta length, compressed payload length
+_HEADER = struct.Struct("<BdII")
+
+
+def write_record(f, kind: int, meta: Dict, payload: bytes = b"") -> None:
+    """Append one compressed record to an open archive"""
+    meta_bytes = zlib.compress(json.dumps(meta).encode())
+    payload_bytes = zlib.compress(payload) if payload else b""
+    f.write(_HEADER.pack(kind, time.time(), len(meta_bytes), len(payload_bytes)))
+    f.write(meta_bytes)
+    f.write(payload_bytes)
+
+
+def read_records(path: str) -> Iterator[Tuple[int, float, Dict, bytes]]:
+    """Yield (kind, time, meta, payload) for every complete record in an archive.
+    A truncated final record (e.g. after a crash) is ignored."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a DARS session archive")
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            kind, timestamp, meta_len, payload_len = _HEADER.unpack(header)
+            meta_bytes = f.read(meta_len)
+            payload_bytes = f.read(payload_len)
+            if len(meta_bytes) < meta_len or len(payload_bytes) < payload_len:
+                return
+            meta = json.loads(zlib.decompress(meta_bytes))
+            payload = zlib.decompress(payload_bytes) if payload_bytes else b""
+            yield kind, timestamp, meta, payload
+
+
+def load_turns(path: str) -> List[Dict]:
+    """Group an archive's records into turns"""
+    turns = []
+    by_id = {}
+    for kind, timestamp, meta, payload in read_records(path):
+        if kind == SESSION_START:
+            continue
+        turn_id = meta.get("turn_id")
+        if kind == TURN_START:
+            turn = {
+                "turn_id": turn_id,
+                "time": timestamp,
+                "audio": b"",
+                "transcript": None,
+                "llm": None,
+                "tts": [],
+                "spans": [],
+            }
+            by_id[turn_id] = turn
+            turns.append(turn)
+            continue
+
+        turn = by_id.get(turn_id)
+        if turn is None:
+            continue
+        if kind == AUDIO:
+            turn["audio"] += payload
+        elif kind == TRANSCRIPT:
+            turn["transcript"] = meta["text"]
+            turn["listen_seconds"] = meta.get("listen_seconds")
+        elif kind == LLM_EXCHANGE:
+            turn["llm"] = meta
+        elif kind == TTS:
+            turn["tts"].append(meta["text"])
+        elif kind == SPANS:
+            turn["spans"] = meta["spans"]
+    return turns
+
+
+class SessionRecorder:
+    """Append each production turn (mic audio, transcript, LLM exchange, TTS text
+    and span timings) to a compact archive for later replay.
+
+    Register it as a tracer exporter so span timings, including tool calls with
+    their arguments, are written when each turn finishes.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._turn_id: Optional[str] = None
+        self._audio: List[bytes] = []
+        self._write(SESSION_START, {"started": datetime.now().isoformat()})
+        self._file.flush()
+
+    @classmethod
+    def from_env(cls) -> Optional["SessionRecorder"]:
+        """Create a recorder when DARS_RECORD_SESSIONS=1, archiving under DARS_RECORD_DIR"""
+        if os.getenv("DARS_RECORD_SESSIONS", "0") != "1":
+            return None
+        record_dir = Path(os.getenv(
+            "DARS_RECORD_DIR",
+            str(Path.home() / ".config" / "DARS" / "sessions"),
+        ))
+        name = f"session-{datetime.now().strftime('%Y%m%d-%H%M%S')}.dars"
+        return cls(str(record_dir / name))
+
+    def _write(self, kind: int, meta: Dict, payload: bytes = b"") -> None:
+        with self._lock:
+            write_record(self._file, kind, meta, payload)
+
+    def begin_turn(self, turn_id: str) -> None:
+        self._turn_id = turn_id
+        self._audio = []
+        self._write(TURN_START, {"turn_id": turn_id})
+
+    def record_audio(self, data: bytes) -> None:
+        """Audio tap for SpeechRecognizer; blocks are buffered until the transcript"""
+        self._audio.append(data)
+
+    def record_transcript(self, text: str, listen_seconds: float) -> None:
+        if self._audio:
+            self._write(AUDIO, {"turn_id": self._turn_id, "rate": 16000}, b"".join(self._audio))
+            self._audio = []
+        self._write(TRANSCRIPT, {"turn_id": self._turn_id, "text": text, "listen_seconds": listen_seconds})
+
+    def record_llm(self, message: str, messages: List[Dict], natural_language: Optional[str],
+                   function_output: Optional[str], seconds: float) -> None:
+        self._write(LLM_EXCHANGE, {
+            "turn_id": self._turn_id,
+            "message": message,
+            "messages": messages,
+            "natural_language": natural_language,
+            "function_output": function_output,
+            "seconds": seconds,
+        })
+
+    def record_tts(self, text: str) -> None:
+        self._write(TTS, {"turn_id": self._turn_id, "text": text})
+
+    def export(self, turn) -> None:
+        """Tracer exporter hook: store the finished turn's spans and flush"""
+        self._write(SPANS, {"turn_id": turn.turn_id, "spans": [span.to_dict() for span in turn.spans]})
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,496 @@
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import threading
+from pathlib import Path
+from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+import fire
+
+from languageModel.llm import DARSAgent, LLM_ERRORS
+from music.musicLibrary import RoomPlayer, get_library
+from network.resilience import GuardedCall
+from telemetry.tracing import tracer, configure_from_env
+
+
+class RoomSession:
+    """One room's conversation: its own agent (humor level, last turn) and turn lock"""
+
+    def __init__(self, session_id: str, agent: DARSAgent, room: Optional[str] = None):
+        self.session_id = session_id
+        self.room = room
+        self.agent = agent
+        self.lock = asyncio.Lock()
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+        self.turns = 0
+        self.recycles = 0
+
+    @property
+    def now_playing(self) -> Optional[Dict]:
+        track = self.agent.music_player.current
+        return {k: track[k] for k in ("title", "artist", "path")} if track else None
+
+    def info(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "room": self.room,
+            "turns": self.turns,
+            "last_turn_messages": len(self.agent.last_turn_messages),
+            "humor_level": self.agent.humor_level,
+            "documents": self.agent.own_document_count,
+            "responses": self.agent.response_count,
+            "recycles": self.recycles,
+            "now_playing": self.now_playing,
+            "idle_seconds": round(time.monotonic() - self.last_active, 1),
+        }
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class RoomServer:
+    """asyncio HTTP server running many DARS room sessions in one process.
+
+    Sessions keep their own DARSAgent, whose notes and todos live in
+    rooms_dir/<session id>; the Vosk model, TTS client, phrase
+    cache, HTTP pool and LLM circuit breaker are shared. Admission control
+    caps open sessions (max_sessions) and concurrent turns (max_active_turns);
+    a turn waits at most queue_timeout seconds for its room, then as long
+    again for a turn slot. Each turn starts from an empty
+    langroid history, so what a session accumulates is langroid's registry
+    entries and the task's responses; both are released after every turn, and
+    a session holding more than max_session_documents or
+    max_session_responses has its agent recycled before its next turn (or the
+    turn is refused while an abandoned run still holds the agent).
+    Music requests never play on the server host: each session records its
+    own track and returns it as "now_playing" for the room's client to play.
+
+    Endpoints:
+        POST   /sessions                 {"room": ...} -> {"session_id": ...}
+        GET    /sessions/<id>
+        DELETE /sessions/<id>
+        POST   /sessions/<id>/text       {"text": ...} -> reply JSON
+        POST   /sessions/<id>/audio      mono 16-bit WAV body -> reply JSON with transcript
+        POST   /sessions/<id>/speech     {"text": ...} -> audio/mpeg (503 while the voice is unavailable)
+        GET    /health, GET /metrics
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        max_sessions: int = 32,
+        max_active_turns: int = 8,
+        queue_timeout: float = 5.0,
+        session_idle_timeout: float = 900.0,
+        max_body_bytes: int = 10 * 1024 * 1024,
+        max_session_documents: Optional[int] = None,
+        max_session_responses: Optional[int] = None,
+        agent_factory: Optional[Callable[[str], DARSAgent]] = None,
+        rooms_dir: Optional[str] = None,
+        model_path: Optional[str] = None,
+        tars_voice=None,
+    ):
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.queue_timeout = queue_timeout
+        self.session_idle_timeout = session_idle_timeout
+        self.max_body_bytes = max_body_bytes
+        # Same limits, and defaults, as a single-room process (main.watch_memory)
+        self.max_session_documents = (
+            max_session_documents if max_session_documents is not None
+            else int(os.getenv("DARS_MAX_DOCUMENTS", "200"))
+        )
+        self.max_session_responses = (
+            max_session_responses if max_session_responses is not None
+            else int(os.getenv("DARS_MAX_RESPONSES", "50"))
+        )
+
+        # One breaker for every session: an OpenAI outage opens it for all rooms at once
+        self.llm_guard = GuardedCall(
+            "openai", budget=float(os.getenv("DARS_LLM_BUDGET", "12")), hedge=False, failures=LLM_ERRORS
+        )
+        # Called with the session's config_dir so rooms never share note or todo files
+        self.agent_factory = agent_factory or self._default_agent
+        self.rooms_dir = Path(rooms_dir) if rooms_dir else Path.home() / ".config" / "DARS" / "rooms"
+        self.model_path = model_path
+        self.model = None
+        self.tars_voice = tars_voice
+        self._voice_lock = threading.Lock()
+
+        self.sessions: Dict[str, RoomSession] = {}
+        self._pending_sessions = 0
+        self.active_turns = 0
+        self.max_active_turns = max_active_turns
+        self._turn_slots: Optional[asyncio.Semaphore] = None
+        # Agents block on langroid/OpenAI, so turns run on worker threads
+        self._executor = ThreadPoolExecutor(max_workers=max_active_turns + 2, thread_name_prefix="room-turn")
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reaper: Optional[asyncio.Task] = None
+
+    def _default_agent(self, config_dir: str) -> DARSAgent:
+        agent = DARSAgent(config_dir=config_dir)
+        agent.llm_guard = self.llm_guard
+        return agent
+
+    # --- lifecycle ---
+
+    async def start(self) -> "RoomServer":
+        self._turn_slots = asyncio.Semaphore(self.max_active_turns)
+        if self.model_path:
+            from vosk import Model, SetLogLevel
+            SetLogLevel(-1)
+            self.model = await asyncio.get_running_loop().run_in_executor(self._executor, Model, self.model_path)
+        # Index the music directory in the background before the first song request
+        get_library()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._reaper = asyncio.create_task(self._reap_idle_sessions())
+        print(f"DARS room server listening on http://{self.host}:{self.port}")
+        return self
+
+    async def stop(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    def run_in_thread(self) -> threading.Thread:
+        """Start the server on its own event loop thread; returns once it is listening"""
+        started = threading.Event()
+
+        def run() -> None:
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(self.start())
+            started.set()
+            self.loop.run_forever()
+
+        thread = threading.Thread(target=run, name="room-server", daemon=True)
+        thread.start()
+        started.wait()
+        return thread
+
+    def stop_thread(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _reap_idle_sessions(self) -> None:
+        while True:
+            await asyncio.sleep(min(60.0, self.session_idle_timeout / 2))
+            now = time.monotonic()
+            for session_id, session in list(self.sessions.items()):
+                if not session.lock.locked() and now - session.last_active > self.session_idle_timeout:
+                    del self.sessions[session_id]
+                    await self.close_session(session)
+                    tracer.incr("server_sessions_expired")
+
+    # --- HTTP ---
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length") or 0)
+        if length > self.max_body_bytes:
+            raise HTTPError(413, f"Body larger than {self.max_body_bytes} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str,
+                        keep_alive: bool, headers: Optional[Dict[str, str]] = None) -> None:
+        lines = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                # Close the connection if the request can't be read in full
+                headers = {"connection": "close"}
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    status, payload, content_type = await self._route(method, path, body)
+                    extra = {}
+                except HTTPError as e:
+                    status, content_type, extra = e.status, "application/json", e.headers
+                    payload = {"error": str(e)}
+                except Exception as e:
+                    status, content_type, extra = 500, "application/json", {}
+                    payload = {"error": f"{type(e).__name__}: {e}"}
+
+                if isinstance(payload, (dict, list)):
+                    payload = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, content_type, keep_alive, extra)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes):
+        if path == "/health" and method == "GET":
+            return 200, self.health(), "application/json"
+        if path == "/metrics" and method == "GET":
+            return 200, tracer.render_prometheus().encode(), "text/plain; version=0.0.4"
+        if path == "/sessions" and method == "POST":
+            return 201, await self.create_session(_json(body).get("room")), "application/json"
+
+        match = re.fullmatch(r"/sessions/([0-9a-f]+)(?:/(text|audio|speech))?/?", path)
+        if not match:
+            raise HTTPError(404, "Not found")
+        session = self._session(match.group(1))
+        action = match.group(2)
+
+        if action is None and method == "GET":
+            return 200, session.info(), "application/json"
+        if action is None and method == "DELETE":
+            self.sessions.pop(session.session_id, None)
+            await self.close_session(session)
+            return 200, {"closed": session.session_id}, "application/json"
+        if method != "POST":
+            raise HTTPError(405, "Method not allowed")
+        if action == "text":
+            text = _json(body).get("text", "").strip()
+            if not text:
+                raise HTTPError(400, "Missing 'text'")
+            return 200, await self._turn(session, lambda: self._text_turn(session, text)), "application/json"
+        if action == "audio":
+            if self.model is None:
+                raise HTTPError(501, "Audio sessions need the server started with a model path")
+            return 200, await self._turn(session, lambda: self._audio_turn(session, body)), "application/json"
+        text = _json(body).get("text", "").strip()
+        if not text:
+            raise HTTPError(400, "Missing 'text'")
+        return 200, await self._turn(session, lambda: self._speech(text)), "audio/mpeg"
+
+    def _session(self, session_id: str) -> RoomSession:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, f"Unknown session {session_id}")
+        return session
+
+    # --- admission control and turns ---
+
+    def health(self) -> Dict:
+        return {
+            "sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "active_turns": self.active_turns,
+            "max_active_turns": self.max_active_turns,
+            "llm_circuit": self.llm_guard.breaker.state,
+        }
+
+    async def create_session(self, room: Optional[str] = None) -> Dict:
+        # Sessions still building their agent hold a slot too
+        if len(self.sessions) + self._pending_sessions >= self.max_sessions:
+            tracer.incr("server_rejections", reason="sessions")
+            raise HTTPError(503, "Session limit reached", {"Retry-After": "30"})
+        self._pending_sessions += 1
+        session_id = uuid.uuid4().hex
+        try:
+            agent = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.agent_factory, str(self.rooms_dir / session_id)
+            )
+        finally:
+            self._pending_sessions -= 1
+        # Music plays on the room's client: song_player only records the track for it
+        agent.music_player = RoomPlayer()
+        session = RoomSession(session_id, agent, room)
+        self.sessions[session.session_id] = session
+        tracer.incr("server_sessions_created")
+        return {"session_id": session.session_id, "room": room}
+
+    async def close_session(self, session: RoomSession) -> None:
+        """Release a session's agent once its running and queued turns are done.
+        Remove it from self.sessions first so no new turn can queue behind."""
+        async with session.lock:
+            await asyncio.get_running_loop().run_in_executor(self._executor, session.agent.close)
+
+    async def _turn(self, session: RoomSession, work: Callable):
+        """Run one blocking turn for a session once a turn slot is free"""
+        queued_at = time.perf_counter()
+        # Turns within one room run in order. Queue on the room first, so a room
+        # sending concurrent requests holds at most one global slot at a time.
+        # Each wait is bounded by queue_timeout, so a room flooding requests
+        # can't pile up connections behind its own lock.
+        try:
+            await asyncio.wait_for(session.lock.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            tracer.incr("server_rejections", reason="room_busy")
+            raise HTTPError(503, "Room busy", {"Retry-After": "1"})
+        try:
+            try:
+                await asyncio.wait_for(self._turn_slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                tracer.incr("server_rejections", reason="busy")
+                raise HTTPError(503, "Server busy", {"Retry-After": "1"})
+            self.active_turns += 1
+            try:
+                queue_ms = round((time.perf_counter() - queued_at) * 1000, 3)
+                result = await asyncio.get_running_loop().run_in_executor(self._executor, work)
+                session.turns += 1
+                session.last_active = time.monotonic()
+            finally:
+                self.active_turns -= 1
+                self._turn_slots.release()
+        finally:
+            session.lock.release()
+        if isinstance(result, dict):
+            result["queue_ms"] = queue_ms
+        return result
+
+    def _over_limits(self, agent: DARSAgent) -> bool:
+        return (agent.own_document_count > self.max_session_documents
+                or agent.response_count > self.max_session_responses)
+
+    def _enforce_session_limits(self, session: RoomSession) -> None:
+        """Compact, then recycle, a session's agent once it holds more than its caps"""
+        agent = session.agent
+        if not self._over_limits(agent):
+            return
+        agent.release_documents()
+        if not self._over_limits(agent):
+            return
+        if not agent.recycle():
+            # A run that blew its budget still holds the agent and keeps adding to it
+            tracer.incr("server_rejections", reason="memory")
+            raise HTTPError(503, "Session over its memory limit", {"Retry-After": "5"})
+        session.recycles += 1
+        tracer.incr("server_session_recycles")
+
+    def _text_turn(self, session: RoomSession, text: str, transcript_ms: Optional[float] = None) -> Dict:
+        self._enforce_session_limits(session)
+        start = time.perf_counter()
+        with tracer.turn(session=session.session_id, room=session.room, transcript=text):
+            tracer.incr("turns")
+            natural_language, function_output = session.agent.process_message(text)
+            session.agent.release_documents()
+            turn_id = tracer.current_turn_id
+        result = {
+            "turn_id": turn_id,
+            "transcript": text,
+            "reply": natural_language,
+            "function": function_output,
+            "now_playing": session.now_playing,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+        if transcript_ms is not None:
+            result["transcription_ms"] = transcript_ms
+        return result
+
+    def _audio_turn(self, session: RoomSession, audio: bytes) -> Dict:
+        from speechRecognition.batchTranscription import transcribe_bytes
+
+        start = time.perf_counter()
+        with tracer.span("stt.transcribe", bytes=len(audio)):
+            record = transcribe_bytes(audio, model=self.model, name=f"session {session.session_id}")
+        if "error" in record:
+            raise HTTPError(400, record["error"])
+        if not record["text"]:
+            raise HTTPError(422, "No speech recognized")
+        transcript_ms = round((time.perf_counter() - start) * 1000, 3)
+        return self._text_turn(session, record["text"], transcript_ms)
+
+    def _speech(self, text: str) -> bytes:
+        with self._voice_lock:
+            if self.tars_voice is None:
+                from speechSynthesis.speechSynthesis import TarsVoice
+                self.tars_voice = TarsVoice()
+        chunks = []
+        fallback = self.tars_voice.generate_speech(text, player=chunks.extend)
+        # A cached recording of the same phrase is as good as fresh audio; the
+        # canned apology and text-only fallbacks are not speech for `text`
+        if fallback in ("canned", "text"):
+            tracer.incr("server_rejections", reason="voice")
+            raise HTTPError(503, "Voice unavailable", {"Retry-After": "5"})
+        return b"".join(chunks)
+
+
+def _json(body: bytes) -> Dict:
+    if not body:
+        return {}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "Body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Body must be a JSON object")
+    return payload
+
+
+def main(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    max_sessions: int = 32,
+    max_active_turns: int = 8,
+    queue_timeout: float = 5.0,
+    model_path: Optional[str] = None,
+):
+    """Serve DARS to many rooms from one process
+
+    Example:
+        python -m server.roomServer --max-sessions 16 --model-path vosk-model-small-en-us-0.15
+    """
+    configure_from_env()
+    server = RoomServer(
+        host=host,
+        port=port,
+        max_sessions=max_sessions,
+        max_active_turns=max_active_turns,
+        queue_timeout=queue_timeout,
+        model_path=model_path,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\nShutting down room server")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,178 @@
+import io
+import os
+import sys
+import json
+import time
+import wave
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+
+import fire
+from vosk import Model, KaldiRecognizer, SetLogLevel
+
+# The model shipped alongside the repo
+DEFAULT_MODEL_PATH = str(Path(__file__).resolve().parent.parent / "vosk-model-small-en-us-0.15")
+
+# Same chunking as the live microphone stream in SpeechRecognizer.listen
+BLOCK_FRAMES = 8000
+
+# Per-process model, loaded once by the pool initializer (or on first use outside the pool)
+_worker_model: Optional[Model] = None
+_worker_model_lock = threading.Lock()
+
+
+def _init_worker(model_path: str) -> None:
+    """Load the Vosk model once per worker process"""
+    global _worker_model
+    SetLogLevel(-1)
+    _worker_model = Model(model_path)
+
+
+def _default_model() -> Model:
+    """The worker's model, loading DEFAULT_MODEL_PATH when called outside the pool"""
+    global _worker_model
+    with _worker_model_lock:
+        if _worker_model is None:
+            if not os.path.exists(DEFAULT_MODEL_PATH):
+                raise ValueError(
+                    f"No Vosk model passed and none at '{DEFAULT_MODEL_PATH}'; "
+                    f"pass model= or download one from https://alphacephei.com/vosk/models"
+                )
+            _init_worker(DEFAULT_MODEL_PATH)
+        return _worker_model
+
+
+def find_wav_files(paths: List[str]) -> List[str]:
+    """Expand files and directories into a sorted list of WAV paths.
+
+    Paths that do not exist are kept, so they come back as error records
+    instead of silently disappearing from the batch.
+    """
+    wav_files = []
+    for path in paths:
+        path = Path(path).expanduser()
+        if path.is_dir():
+            wav_files.extend(str(p) for p in sorted(path.rglob("*.wav")))
+        elif path.suffix.lower() == ".wav" or not path.exists():
+            wav_files.append(str(path))
+    return wav_files
+
+
+def transcribe_file(wav_path: str, model: Optional[Model] = None) -> Dict:
+    """Stream one WAV file through a fresh recognizer and return its transcript record.
+    Without a model, uses the pool worker's or loads DEFAULT_MODEL_PATH."""
+    return _transcribe(wav_path, wav_path, model)
+
+
+def transcribe_bytes(data: bytes, model: Optional[Model] = None, name: str = "<upload>") -> Dict:
+    """Transcribe an in-memory WAV file (e.g. a request body); `name` fills the record's "file" field"""
+    return _transcribe(io.BytesIO(data), name, model)
+
+
+def _transcribe(source: Union[str, BinaryIO], name: str, model: Optional[Model]) -> Dict:
+    start = time.perf_counter()
+
+    try:
+        with wave.open(source, "rb") as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getcomptype() != "NONE":
+                return {"file": name, "error": "Audio must be mono 16-bit PCM WAV"}
+
+            sample_rate = wf.getframerate()
+            duration = wf.getnframes() / float(sample_rate)
+            recognizer = KaldiRecognizer(model or _default_model(), sample_rate)
+            recognizer.SetWords(True)
+
+            segments = []
+            while True:
+                data = wf.readframes(BLOCK_FRAMES)
+                if not data:
+                    break
+                if recognizer.AcceptWaveform(data):
+                    segments.append(json.loads(recognizer.Result()))
+            segments.append(json.loads(recognizer.FinalResult()))
+    except (wave.Error, EOFError, OSError) as e:
+        return {"file": name, "error": str(e)}
+
+    elapsed = time.perf_counter() - start
+    words = [word for segment in segments for word in segment.get("result", [])]
+    text = " ".join(segment.get("text", "") for segment in segments if segment.get("text"))
+
+    return {
+        "file": name,
+        "text": text,
+        "words": [
+            {"word": w["word"], "start": w["start"], "end": w["end"], "conf": w.get("conf")}
+            for w in words
+        ],
+        "duration": round(duration, 3),
+        "processing_time": round(elapsed, 3),
+        "rtf": round(elapsed / duration, 4) if duration else None,
+    }
+
+
+def transcribe_batch(
+    paths: List[str],
+    model_path: str = DEFAULT_MODEL_PATH,
+    workers: Optional[int] = None,
+    chunksize: int = 4,
+) -> Iterator[Dict]:
+    """Transcribe WAV files across a process pool, yielding records in input order"""
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"Please download a model from https://alphacephei.com/vosk/models "
+            f"and unpack it as '{model_path}'."
+        )
+
+    wav_files = find_wav_files(paths)
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_path,),
+    ) as pool:
+        yield from pool.map(transcribe_file, wav_files, chunksize=chunksize)
+
+
+def main(
+    *paths: str,
+    output: str = "-",
+    model_path: str = DEFAULT_MODEL_PATH,
+    workers: Optional[int] = None,
+    chunksize: int = 4,
+):
+    """Transcribe WAV files or directories offline and write JSONL results
+
+    Example:
+        python -m speechRecognition.batchTranscription recordings/ --output results.jsonl
+    """
+    out = sys.stdout if output == "-" else open(output, "w")
+    wall_start = time.perf_counter()
+    total_audio = 0.0
+    count = 0
+    errors = 0
+
+    try:
+        for record in transcribe_batch(list(paths), model_path, workers, chunksize):
+            out.write(json.dumps(record) + "\n")
+            count += 1
+            if "error" in record:
+                errors += 1
+            else:
+                total_audio += record["duration"]
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    wall = time.perf_counter() - wall_start
+    print(
+        f"Transcribed {count} files ({errors} errors), {total_audio:.1f}s of audio "
+        f"in {wall:.1f}s wall time (throughput {total_audio / wall if wall else 0:.1f}x real time)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,107 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SAMPLE_RATE = 16000
+
+
+class NoiseSuppressor:
+    """Streaming spectral noise suppression for 16 kHz int16 audio.
+
+    Each call to process() takes a block of raw audio and returns the cleaned
+    samples available so far (output lags input by frame_size - hop samples).
+    Frames are processed together as one STFT per block; only the overlap
+    and unprocessed tail are carried between calls.
+
+    The noise profile is a per-frequency power estimate from minimum
+    statistics: every block it drops straight to the block's per-bin minimum
+    and otherwise rises towards it with time constant rise_time seconds
+    (whatever the block size), so it follows a fan being switched on or
+    music starting without swallowing speech. Gains use over-subtraction
+    with a floor and are smoothed over neighbouring frames to limit
+    musical-noise artefacts.
+    """
+
+    def __init__(
+        self,
+        frame_size: int = 512,
+        over_subtraction: float = 1.5,
+        gain_floor: float = 0.1,
+        rise_time: float = 10.0,
+        min_bias: float = 2.0,
+        smooth_frames: int = 8,
+    ):
+        if frame_size % 2:
+            raise ValueError("frame_size must be even")
+        self.frame_size = frame_size
+        self.hop = frame_size // 2
+        self.over_subtraction = over_subtraction
+        self.gain_floor = gain_floor
+        self.rise_time = rise_time  # Seconds to close 63% of the gap to a louder noise floor
+        self.min_bias = min_bias  # Minimum-statistics underestimate of the mean noise power
+        self.smooth_frames = smooth_frames  # Power is averaged over this many frames before the minimum
+
+        # Square-root periodic Hann: analysis x synthesis windows sum to one at 50% overlap
+        n = np.arange(frame_size)
+        self.window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * n / frame_size)).astype(np.float32)
+        self.noise_power: np.ndarray = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget buffered audio but keep the learned noise profile"""
+        self._input = np.zeros(self.hop, dtype=np.float32)
+        self._overlap = np.zeros(self.hop, dtype=np.float32)
+        self._last_gain = None
+
+    @property
+    def latency(self) -> float:
+        """Seconds of delay added at 16 kHz"""
+        return (self.frame_size - self.hop) / SAMPLE_RATE
+
+    def _update_noise(self, power: np.ndarray) -> None:
+        # Moving average over frames first: the minimum of raw periodogram values
+        # sits far below the mean noise power
+        width = min(self.smooth_frames, len(power))
+        totals = np.cumsum(np.vstack([np.zeros((1, power.shape[1])), power]), axis=0)
+        smoothed = (totals[width:] - totals[:-width]) / width
+        block_min = smoothed.min(axis=0) * self.min_bias
+        if self.noise_power is None:
+            self.noise_power = block_min
+            return
+        # Scale the step by the audio this block covered, not by the number of calls
+        rate = 1.0 - np.exp(-len(power) * self.hop / SAMPLE_RATE / self.rise_time)
+        rising = self.noise_power + rate * (block_min - self.noise_power)
+        self.noise_power = np.where(block_min < self.noise_power, block_min, rising)
+
+    def _gains(self, power: np.ndarray) -> np.ndarray:
+        ratio = self.noise_power / np.maximum(power, 1e-12)
+        gain = np.sqrt(np.clip(1.0 - self.over_subtraction * ratio, self.gain_floor ** 2, 1.0))
+        # Average each frame's gain with its neighbours, using the previous block's last frame
+        previous = gain[:1] if self._last_gain is None else self._last_gain
+        padded = np.concatenate([previous, gain, gain[-1:]])
+        self._last_gain = gain[-1:]
+        return (padded[:-2] + padded[1:-1] + padded[2:]) / 3
+
+    def process(self, data: bytes) -> bytes:
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+        buffer = np.concatenate([self._input, samples])
+        n_frames = (len(buffer) - self.frame_size) // self.hop + 1
+        if n_frames <= 0:
+            self._input = buffer
+            return b""
+
+        frames = sliding_window_view(buffer, self.frame_size)[::self.hop][:n_frames] * self.window
+        self._input = buffer[n_frames * self.hop:]
+
+        spectrum = np.fft.rfft(frames, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        self._update_noise(power)
+        cleaned = np.fft.irfft(spectrum * self._gains(power), n=self.frame_size, axis=1) * self.window
+
+        # Overlap-add: the first half of each frame completes the previous frame's second half
+        halves = cleaned.reshape(n_frames, 2, self.hop)
+        output = halves[:, 0].copy()
+        output[0] += self._overlap
+        output[1:] += halves[:-1, 1]
+        self._overlap = halves[-1, 1]
+
+        return (np.clip(output.ravel(), -1.0, 1.0) * 32767).astype(np.int16).tobytes()
@@ -1,15 +1,33 @@
 import os
+import math
+import time
+import wave
+import array
 import queue
+import threading
 import sounddevice as sd
 from vosk import Model, KaldiRecognizer
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+from telemetry.tracing import tracer
 
 class SpeechRecognizer:
-    def __init__(self, model_path: Optional[str] = None):
-        """Initialize the speech recognizer with optional custom model path"""
+    def __init__(self, model_path: Optional[str] = None, noise_suppressor=None, max_queued_blocks: int = None):
+        """Initialize the speech recognizer with optional custom model path.
+        noise_suppressor (e.g. a NoiseSuppressor) cleans each block before Vosk;
+        DARS_NOISE_SUPPRESSION=1 enables the default one. At most
+        max_queued_blocks (DARS_STT_QUEUE_BLOCKS, default 64 = 32 s) of
+        unconsumed audio are buffered; the oldest blocks are dropped first."""
         self.MODEL_PATH = model_path or "/users/ewan/DARS/vosk-model-small-en-us-0.15"
-        self.audio_queue = queue.Queue()
+        if max_queued_blocks is None:
+            max_queued_blocks = int(os.getenv("DARS_STT_QUEUE_BLOCKS", "64"))
+        self.audio_queue = queue.Queue(maxsize=max_queued_blocks)
+        self.audio_tap = None  # Optional callable receiving every consumed audio block
+        if noise_suppressor is None and os.getenv("DARS_NOISE_SUPPRESSION", "0") == "1":
+            # Imported here so NumPy is only needed when suppression is on
+            from speechRecognition.noiseSuppression import NoiseSuppressor
+            noise_suppressor = NoiseSuppressor()
+        self.noise_suppressor = noise_suppressor
         self._setup_model()
 
     def _setup_model(self) -> None:
@@ -26,15 +44,24 @@ class SpeechRecognizer:
         """Callback function to put audio data into the queue."""
         if status:
             print(f"Status: {status}", flush=True)
-        self.audio_queue.put(bytes(indata))
+        data = bytes(indata)
+        while True:
+            try:
+                self.audio_queue.put_nowait(data)
+                return
+            except queue.Full:
+                # The recognizer has fallen behind: keep the most recent audio
+                try:
+                    self.audio_queue.get_nowait()
+                    tracer.incr("stt_audio_dropped")
+                except queue.Empty:
+                    pass
 
+    @tracer.traced("stt.listen")
     def listen(self) -> str:
         """Listen for a complete sentence and return the recognized text.
         Returns when the user stops speaking."""
         
-        recognized_text = ""
-        silence_counter = 0  # Count frames of silence
-        
         # Start the microphone input
         with sd.RawInputStream(
             samplerate=16000,
@@ -44,46 +71,205 @@ class SpeechRecognizer:
             callback=self._audio_callback
         ):
             print("Listening... Speak into the microphone.")
-            
             try:
-                while True:
-                    # Get audio data from the queue
-                    data = self.audio_queue.get()
+                return self._recognize_from_queue()
+            finally:
+                self._drain_queue()
+
+    def _drain_queue(self) -> None:
+        """Drop audio the recognizer did not need before the next listen()"""
+        while True:
+            try:
+                self.audio_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _recognize_from_queue(self) -> str:
+        """Consume audio blocks from the queue until the end of the utterance.
+        A None block marks the end of the audio source."""
+        
+        recognized_text = ""
+        silence_counter = 0  # Count frames of silence
+        if self.noise_suppressor is not None:
+            self.noise_suppressor.reset()
+        
+        try:
+            while True:
+                # Get audio data from the queue
+                data = self.audio_queue.get()
+                if data is None:
+                    return recognized_text
+                tracer.incr("stt_audio_blocks")
+                if self.audio_tap is not None:
+                    self.audio_tap(data)
+                if self.noise_suppressor is not None:
+                    suppress_start = time.perf_counter()
+                    data = self.noise_suppressor.process(data)
+                    tracer.incr("stt_noise_suppression_seconds", time.perf_counter() - suppress_start)
+                
+                if self.recognizer.AcceptWaveform(data):
+                    result = eval(self.recognizer.Result())
+                    text = result.get("text", "").strip()
                     
-                    if self.recognizer.AcceptWaveform(data):
-                        result = eval(self.recognizer.Result())
-                        text = result.get("text", "").strip()
+                    if text:
+                        recognized_text = text
+                        silence_counter = 0  # Reset silence counter
+                    else:
+                        silence_counter += 1
                         
-                        if text:
-                            recognized_text = text
-                            silence_counter = 0  # Reset silence counter
-                        else:
-                            silence_counter += 1
-                            
-                        # If we have text and detect silence, return the result
-                        if recognized_text and silence_counter >= 2:
-                            return recognized_text
-                            
-                    # Partial results indicate ongoing speech
+                    # If we have text and detect silence, return the result
+                    if recognized_text and silence_counter >= 2:
+                        return recognized_text
+                        
+                # Partial results indicate ongoing speech
+                else:
+                    partial = eval(self.recognizer.PartialResult())
+                    if not partial.get("partial", "").strip():
+                        silence_counter += 1
                     else:
-                        partial = eval(self.recognizer.PartialResult())
-                        if not partial.get("partial", "").strip():
-                            silence_counter += 1
-                        else:
-                            silence_counter = 0
-                            
-                        # Return recognized text after sustained silence
-                        if recognized_text and silence_counter >= 3:
-                            return recognized_text
-                            
-            except KeyboardInterrupt:
-                return recognized_text if recognized_text else "Recognition interrupted"
-            except Exception as e:
-                return f"Error during recognition: {str(e)}"
+                        silence_counter = 0
+                        
+                    # Return recognized text after sustained silence
+                    if recognized_text and silence_counter >= 3:
+                        return recognized_text
+                        
+        except KeyboardInterrupt:
+            return recognized_text if recognized_text else "Recognition interrupted"
+        except Exception as e:
+            return f"Error during recognition: {str(e)}"
 
     def new(self) -> 'SpeechRecognizer':
         """Create and return a new instance of the speech recognizer"""
-        return SpeechRecognizer(self.MODEL_PATH)
+        return SpeechRecognizer(self.MODEL_PATH, self.noise_suppressor, self.audio_queue.maxsize)
+
+    def recycle(self) -> None:
+        """Replace the Kaldi recognizer, releasing its decoder state; the loaded model is reused"""
+        self._drain_queue()
+        self.recognizer = KaldiRecognizer(self.model, 16000)
+        tracer.incr("stt_recognizer_recycles")
+
+class WavSpeechRecognizer(SpeechRecognizer):
+    """Speech recognizer fed from WAV files instead of the microphone.
+    Each call to listen() plays the next file into the recognizer."""
+
+    def __init__(
+        self,
+        wav_files: List[str],
+        model_path: Optional[str] = None,
+        realtime: bool = True,
+        trailing_silence: float = 10.0,
+        voice_threshold: int = 500,
+        noise_suppressor=None,
+    ):
+        super().__init__(model_path, noise_suppressor)
+        self.sources = list(wav_files)
+        self.realtime = realtime  # Pace blocks like a live microphone
+        self.trailing_silence = trailing_silence  # Seconds of silence appended after the file
+        self.voice_threshold = voice_threshold  # RMS level above which a block counts as speech
+        self.last_voiced_at: Optional[float] = None
+        self.returned_at: Optional[float] = None
+
+    @property
+    def endpoint_delay(self) -> Optional[float]:
+        """Seconds between the last voiced block being fed and listen() returning"""
+        if self.last_voiced_at is None or self.returned_at is None:
+            return None
+        return self.returned_at - self.last_voiced_at
+
+    def _is_voiced(self, data: bytes) -> bool:
+        """Check whether a block of int16 audio is louder than the voice threshold"""
+        samples = array.array("h", data)
+        if not samples:
+            return False
+        rms = math.sqrt(sum(s * s for s in samples) / len(samples))
+        return rms >= self.voice_threshold
+
+    def _check_source(self, wav_path: str) -> None:
+        """Reject files the 16 kHz recognizer cannot consume"""
+        with wave.open(wav_path, "rb") as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != 16000:
+                raise ValueError(f"{wav_path}: audio must be 16 kHz mono 16-bit PCM")
+
+    def _read_blocks(self, wav_path: str, block_frames: int):
+        """Yield blocks of raw int16 audio from a WAV file"""
+        with wave.open(wav_path, "rb") as wf:
+            while True:
+                data = wf.readframes(block_frames)
+                if not data:
+                    break
+                yield data
+
+    def _feed(self, source, stop: threading.Event) -> None:
+        """Push the source audio and trailing silence into the audio queue"""
+        block_frames = 8000
+        block_seconds = block_frames / 16000
+        start = time.perf_counter()
+        blocks_fed = 0
+
+        def put(data: bytes) -> None:
+            nonlocal blocks_fed
+            if self.realtime:
+                delay = start + blocks_fed * block_seconds - time.perf_counter()
+                if delay > 0:
+                    stop.wait(delay)
+            if self._is_voiced(data):
+                self.last_voiced_at = time.perf_counter()
+            self._put(data, stop)
+            blocks_fed += 1
+
+        for data in self._read_blocks(source, block_frames):
+            if stop.is_set():
+                break
+            put(data)
+
+        silence = bytes(block_frames * 2)
+        for _ in range(int(self.trailing_silence / block_seconds)):
+            if stop.is_set():
+                return
+            put(silence)
+        self._put(None, stop)
+
+    def _put(self, data: Optional[bytes], stop: threading.Event) -> None:
+        """Queue a block, waiting while the queue is full unless listen() has returned"""
+        while not stop.is_set():
+            try:
+                self.audio_queue.put(data, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    @tracer.traced("stt.listen")
+    def listen(self) -> str:
+        """Recognize the next WAV file as if it were spoken into the microphone"""
+        source = self.sources.pop(0)
+        self._check_source(source)
+
+        self.last_voiced_at = None
+        self.returned_at = None
+        stop = threading.Event()
+        feeder = threading.Thread(target=self._feed, args=(source, stop), daemon=True)
+        feeder.start()
+
+        try:
+            return self._recognize_from_queue()
+        finally:
+            self.returned_at = time.perf_counter()
+            stop.set()
+            feeder.join()
+            # Drop blocks the recognizer did not need before the next file
+            self._drain_queue()
+            self.recognizer.Reset()
+
+class ClipSpeechRecognizer(WavSpeechRecognizer):
+    """WavSpeechRecognizer fed from in-memory 16 kHz mono int16 clips"""
+
+    def _check_source(self, clip: bytes) -> None:
+        pass
+
+    def _read_blocks(self, clip: bytes, block_frames: int):
+        block_bytes = block_frames * 2
+        for i in range(0, len(clip), block_bytes):
+            yield clip[i:i + block_bytes]
 
 # Example usage:
 if __name__ == "__main__":
@@ -1,37 +1,152 @@
 from elevenlabs import play
 from elevenlabs.client import ElevenLabs
+from elevenlabs.core.api_error import ApiError
 import os
+import time
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional
+from telemetry.tracing import tracer
+from network.resilience import GuardedCall, CircuitOpenError, DeadlineExceeded, UPSTREAM_ERRORS
+from network.httpPool import get_pool
 
-client = ElevenLabs(
-    api_key="YOUR_API_KEY",
-)
+# ElevenLabs failures that mean the service is unavailable rather than a bug
+TTS_ERRORS = UPSTREAM_ERRORS + (ApiError,)
 
-client.text_to_speech.convert(
-    voice_id="VuHE5LKSRPThk7ENDoDX",
-    model_id="eleven_multilingual_v2",
-    text="Hello! 你好! Hola! नमस्ते! Bonjour! こんにちは! مرحبا! 안녕하세요! Ciao! Cześć! Привіт! வணக்கம்!",
-)
+class PhraseCache:
+    """Synthesized audio for short phrases, kept on disk so it survives restarts
+    and can be replayed while the TTS upstream is unavailable"""
+
+    def __init__(self, directory: Path, max_entries: int = 200, max_chars: int = 200):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries = OrderedDict(
+            (p.stem, p) for p in sorted(self.directory.glob("*.mp3"), key=lambda p: p.stat().st_mtime)
+        )
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(text.strip().lower().encode()).hexdigest()
+
+    def get(self, text: str) -> Optional[bytes]:
+        with self._lock:
+            path = self._entries.get(self._key(text))
+            if path is None or not path.exists():
+                return None
+            self._entries.move_to_end(path.stem)
+        return path.read_bytes()
+
+    def put(self, text: str, audio: bytes) -> None:
+        if len(text) > self.max_chars or not audio:
+            return
+        key = self._key(text)
+        path = self.directory / f"{key}.mp3"
+        path.write_bytes(audio)
+        with self._lock:
+            self._entries[key] = path
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                _, old = self._entries.popitem(last=False)
+                old.unlink(missing_ok=True)
 
 # class to set up the model and with a function to generat speech
 class TarsVoice:
-    def __init__(self):
+    def __init__(self, base_url: str = None, player=play, budget: float = None, http_pool=None, cache_dir: Path = None):
+        client_kwargs = {}
+        if base_url:
+            # e.g. a local stand-in server for benchmarks
+            client_kwargs["base_url"] = base_url
+        # Shared keep-alive pool so turns after an idle period skip DNS/TCP/TLS setup
+        self.http_pool = http_pool or get_pool()
+        self.warm_url = base_url or "https://api.elevenlabs.io"
         self.client = ElevenLabs(
                 # get api key from environment variable ELEVENLABS_API_KEY
                 api_key=os.getenv("ELEVENLABS_API_KEY"),
+                timeout=float(os.getenv("DARS_TTS_TIMEOUT", "15")),
+                httpx_client=self.http_pool.client,
+                **client_kwargs,
         )
+        # Callable that receives the audio stream (defaults to elevenlabs.play)
+        self.player = player
         self.voice_id = "VuHE5LKSRPThk7ENDoDX"
         self.model_id = "eleven_multilingual_v2"
+        
+        # Latency budget for the first audio byte, with hedging and a circuit breaker
+        self.guard = GuardedCall(
+            "elevenlabs",
+            budget=budget or float(os.getenv("DARS_TTS_BUDGET", "3")),
+            failures=TTS_ERRORS,
+        )
+        # Benchmarks and tests against fake servers pass their own directory so
+        # fake audio never lands in the real fallback cache
+        self.phrase_cache = PhraseCache(Path(cache_dir) if cache_dir else Path.home() / ".config" / "DARS" / "tts_cache")
+        self.canned_audio_path = Path.home() / ".config" / "dars" / "dars_error.mp3"
         print("TarsVoice initialized")
         print(f"Voice ID: {self.voice_id}")
         print(f"Model ID: {self.model_id}")
 
-    def generate_speech(self, text: str):
-        audio = self.client.generate(
-            voice=self.voice_id,
-            model=self.model_id,
-            text=text,
-        )
-        play(audio)
+    def _open_stream(self, text: str):
+        """Start synthesis and wait for the first audio chunk"""
+        with tracer.span("tts.attempt"):
+            audio = iter(self.client.text_to_speech.stream(
+                voice_id=self.voice_id,
+                model_id=self.model_id,
+                text=text,
+            ))
+            return next(audio, b""), audio
+
+    def play_fallback(self, text: str, player=None) -> str:
+        """Degraded output while ElevenLabs is slow or down; returns its source"""
+        player = player or self.player
+        cached = self.phrase_cache.get(text)
+        if cached is not None:
+            source = "cache"
+            player(iter([cached]))
+        elif self.canned_audio_path.exists():
+            source = "canned"
+            print(f"(Voice unavailable) DARS: {text}")
+            player(iter([self.canned_audio_path.read_bytes()]))
+        else:
+            source = "text"
+            print(f"(Voice unavailable) DARS: {text}")
+        tracer.incr("tts_fallbacks", source=source)
+        return source
+
+    def generate_speech(self, text: str, player=None) -> Optional[str]:
+        """Synthesize and play `text`; `player` overrides self.player for this call.
+        Returns None, or the fallback used ("cache", "canned" or "text") when
+        ElevenLabs was slow or down."""
+        player = player or self.player
+        with tracer.span("tts.generate_speech", chars=len(text)) as span:
+            tracer.incr("tts_characters", len(text))
+            start = time.perf_counter()
+            try:
+                first, rest = self.guard.call(lambda: self._open_stream(text))
+            except (DeadlineExceeded, CircuitOpenError) + TTS_ERRORS as e:
+                if span is not None:
+                    span.set(fallback=type(e).__name__)
+                return self.play_fallback(text, player)
+            if span is not None:
+                span.set(first_byte_ms=round((time.perf_counter() - start) * 1000, 3))
+
+            chunks = [first]
+            complete = False
+            def stream():
+                nonlocal complete
+                yield first
+                for chunk in rest:
+                    chunks.append(chunk)
+                    yield chunk
+                complete = True
+
+            player(stream())
+            if complete:
+                self.phrase_cache.put(text, b"".join(chunks))
+            return None
 
 def main():
     tars_voice = TarsVoice()
@@ -0,0 +1,123 @@
+import os
+import re
+import gzip
+from pathlib import Path
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+import fire
+
+from telemetry.logWriter import HEADER_TURN, log_dir, unescape
+
+_SEGMENT = re.compile(r"^(?P<name>.+)\.(?P<stamp>\d{8}T\d{12})\.log\.gz$")
+
+
+def _parse_time(value) -> Optional[str]:
+    """Accept ISO strings or epoch seconds and return a sortable ISO timestamp"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value).isoformat(timespec="microseconds")
+    return datetime.fromisoformat(str(value)).isoformat(timespec="microseconds")
+
+
+def list_segments(directory: Path, name: str) -> List[Tuple[str, Path]]:
+    """Return (start timestamp, path) for every segment of a log, oldest first"""
+    segments = []
+    for path in directory.glob(f"{name}.*.log.gz"):
+        match = _SEGMENT.match(path.name)
+        if match and match.group("name") == name:
+            start = datetime.strptime(match.group("stamp"), "%Y%m%dT%H%M%S%f")
+            segments.append((start.isoformat(timespec="microseconds"), path))
+    segments.sort()
+
+    active = directory / f"{name}.log"
+    if active.exists() and active.stat().st_size:
+        with open(active, encoding="utf-8") as f:
+            segments.append((f.readline().split("\t", 1)[0], active))
+    return segments
+
+
+def _seek_plain(f, start: str) -> None:
+    """Binary search an uncompressed, time-ordered segment for the first line >= start"""
+    f.seek(0, os.SEEK_END)
+    low, high = 0, f.tell()
+    while low < high:
+        mid = (low + high) // 2
+        f.seek(mid)
+        if mid:
+            f.readline()  # Skip the partial line
+        line = f.readline()
+        if not line or line.split(b"\t", 1)[0].decode() >= start:
+            high = mid
+        else:
+            low = mid + 1
+    f.seek(low)
+    if low:
+        f.readline()
+
+
+def _read_segment(path: Path, start: Optional[str]) -> Iterator[bytes]:
+    if path.suffix == ".gz":
+        # Compressed segments are streamed, never loaded whole
+        with gzip.open(path, "rb") as f:
+            yield from f
+    else:
+        with open(path, "rb") as f:
+            if start:
+                _seek_plain(f, start)
+            yield from f
+
+
+def query(
+    name: str,
+    start=None,
+    end=None,
+    turn: Optional[str] = None,
+    directory: Optional[str] = None,
+) -> Iterator[Tuple[str, str, str]]:
+    """Yield (timestamp, turn id, message) records of a log between start and end"""
+    directory = Path(directory).expanduser() if directory else log_dir()
+    start, end = _parse_time(start), _parse_time(end)
+    segments = list_segments(directory, name)
+
+    for i, (segment_start, path) in enumerate(segments):
+        segment_end = segments[i + 1][0] if i + 1 < len(segments) else None
+        if end and segment_start > end:
+            break
+        if start and segment_end and segment_end < start:
+            continue
+
+        for raw in _read_segment(path, start):
+            fields = raw.decode("utf-8").rstrip("\n").split("\t", 2)
+            if len(fields) < 3 or fields[1] == HEADER_TURN:
+                continue
+            timestamp, turn_id, message = fields
+            if start and timestamp < start:
+                continue
+            if end and timestamp > end:
+                return
+            if turn and turn_id != turn:
+                continue
+            yield timestamp, turn_id, unescape(message)
+
+
+def main(
+    name: str = "LLM-Agent",
+    start=None,
+    end=None,
+    turn: Optional[str] = None,
+    directory: Optional[str] = None,
+):
+    """Print log records by time range and/or turn id
+
+    Examples:
+        python -m telemetry.logQuery LLM-Agent --start 2026-10-18T09:00 --end 2026-10-18T10:00
+        python -m telemetry.logQuery traces --turn 3f2a9c1d0b7e
+    """
+    for timestamp, turn_id, message in query(name, start, end, turn, directory):
+        print(f"{timestamp}\t{turn_id}\t{message}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
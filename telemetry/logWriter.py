@@ -0,0 +1,220 @@
+import os
+import re
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from telemetry.tracing import tracer
+
+# Every record is one line: "<ISO timestamp>\t<turn id or ->\t<escaped message>"
+# A segment's optional header line carries HEADER_TURN in the turn id column
+HEADER_TURN = "#"
+_UNESCAPE = re.compile(r"\\([\\nr])")
+
+
+def escape(message: str) -> str:
+    return message.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def unescape(message: str) -> str:
+    return _UNESCAPE.sub(lambda m: {"\\": "\\", "n": "\n", "r": "\r"}[m.group(1)], message)
+
+
+def log_dir() -> Path:
+    """The single configured log location (DARS_LOG_DIR, default ~/.config/DARS/logs)"""
+    return Path(os.getenv("DARS_LOG_DIR", str(Path.home() / ".config" / "DARS" / "logs"))).expanduser()
+
+
+class AsyncLogWriter:
+    """Append log lines from a background thread in batches.
+
+    The active segment is <name>.log. It is rotated once it exceeds max_bytes
+    or max_age seconds, renamed to <name>.<first timestamp>.log and
+    gzip-compressed; only the newest backup_count compressed segments are kept.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        name: str,
+        max_bytes: int = 5 * 1024 * 1024,
+        max_age: float = 24 * 3600,
+        backup_count: int = 30,
+        flush_interval: float = 0.5,
+        batch_size: int = 512,
+        header: Optional[str] = None,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.path = self.directory / f"{name}.log"
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.header = header
+
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._stamp_lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._segment_start: Optional[str] = None
+        self._open()
+
+        self._thread = threading.Thread(target=self._run, name=f"log-writer-{name}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, message: str, turn_id: Optional[str] = None) -> None:
+        """Queue one record; never blocks on disk I/O.
+
+        Records are stamped with the time they are queued, under a lock, so
+        every segment stays in time order for logQuery's seek.
+        """
+        turn_id = turn_id or tracer.current_turn_id or "-"
+        with self._stamp_lock:
+            ts = datetime.now().isoformat(timespec="microseconds")
+            self._queue.put(f"{ts}\t{turn_id}\t{escape(message)}\n")
+
+    def close(self) -> None:
+        """Flush everything queued so far and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _open(self) -> None:
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+        self._segment_start = None
+        if self._size:
+            # Recover the segment's first timestamp after a restart
+            with open(self.path, encoding="utf-8") as f:
+                first = f.readline()
+            try:
+                self._segment_start = first.split("\t", 1)[0]
+                self._opened_at = datetime.fromisoformat(self._segment_start).timestamp()
+            except ValueError:
+                self._segment_start = datetime.fromtimestamp(os.path.getmtime(self.path)).isoformat(timespec="microseconds")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._maybe_rotate()
+                continue
+
+            stop = item is None
+            batch = [] if stop else [item]
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                self._write_batch(batch)
+            if stop:
+                self._file.close()
+                return
+
+    def _write_batch(self, batch: List[str]) -> None:
+        self._maybe_rotate()
+        if self._segment_start is None:
+            self._segment_start = batch[0].split("\t", 1)[0]
+            if self.header:
+                batch.insert(0, f"{self._segment_start}\t{HEADER_TURN}\t{escape(self.header)}\n")
+        data = "".join(batch)
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data.encode("utf-8"))
+
+    def _maybe_rotate(self) -> None:
+        if self._segment_start is None:
+            return
+        if self._size < self.max_bytes and time.time() - self._opened_at < self.max_age:
+            return
+
+        self._file.close()
+        stamp = re.sub(r"[-:.]", "", self._segment_start)
+        rotated = self.directory / f"{self.name}.{stamp}.log"
+        os.replace(self.path, rotated)
+        with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        rotated.unlink()
+        self._prune()
+        self._open()
+
+    def _prune(self) -> None:
+        segments = sorted(self.directory.glob(f"{self.name}.*.log.gz"))
+        for old in segments[:-self.backup_count] if self.backup_count else segments:
+            old.unlink()
+
+
+class AsyncLogHandler(logging.Handler):
+    """logging.Handler that hands formatted records to an AsyncLogWriter"""
+
+    def __init__(self, writer: AsyncLogWriter):
+        super().__init__()
+        self.writer = writer
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.writer.write(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+class MessageLogger:
+    """Drop-in for langroid's RichFileLogger (only .log() is used)"""
+
+    def __init__(self, writer: AsyncLogWriter):
+        self.writer = writer
+
+    def log(self, message: str) -> None:
+        self.writer.write(message)
+
+
+_writers: Dict[str, AsyncLogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(name: str, header: Optional[str] = None) -> AsyncLogWriter:
+    """Shared writer for a log name under the configured log directory"""
+    with _writers_lock:
+        if name not in _writers:
+            _writers[name] = AsyncLogWriter(
+                log_dir(),
+                name,
+                max_bytes=int(os.getenv("DARS_LOG_MAX_BYTES", str(5 * 1024 * 1024))),
+                max_age=float(os.getenv("DARS_LOG_MAX_AGE", str(24 * 3600))),
+                backup_count=int(os.getenv("DARS_LOG_BACKUPS", "30")),
+                header=header,
+            )
+        return _writers[name]
+
+
+def get_tsv_logger(name: str, header: Optional[str] = None) -> logging.Logger:
+    """logging.Logger writing through the shared background writer"""
+    logger = logging.getLogger(f"dars.logs.{name}")
+    if not logger.handlers:
+        handler = AsyncLogHandler(get_writer(name, header))
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
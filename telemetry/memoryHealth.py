@@ -0,0 +1,277 @@
+import gc
+import os
+import sys
+import json
+import time
+import ctypes
+import threading
+import tracemalloc
+from pathlib import Path
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from telemetry.tracing import tracer
+
+MB = 1024 * 1024
+
+# Source locations attributed to each DARS component in tracemalloc snapshots.
+# A traced allocation belongs to the first component naming one of its path parts.
+COMPONENTS = [
+    ("llm", {"languageModel", "langroid", "openai", "tiktoken", "pydantic", "pydantic_v1"}),
+    ("stt", {"speechRecognition", "vosk", "sounddevice", "numpy"}),
+    ("tts", {"speechSynthesis", "elevenlabs"}),
+    ("music", {"music", "pygame", "sqlite3"}),
+    ("network", {"network", "httpx", "httpcore", "h11", "ssl", "socket"}),
+    ("telemetry", {"telemetry", "replay", "logging"}),
+    ("server", {"server", "asyncio"}),
+]
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No procfs (macOS): fall back to the peak, which still shows growth
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def release_memory() -> None:
+    """Collect garbage and hand freed heap pages back to the OS where glibc allows it"""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def growth_rate(samples: Sequence[Tuple[float, float]]) -> float:
+    """Least-squares slope of (x, y) samples, in y units per x unit"""
+    if len(samples) < 2:
+        return 0.0
+    n = len(samples)
+    mean_x = sum(x for x, _ in samples) / n
+    mean_y = sum(y for _, y in samples) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in samples)
+    if not var_x:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in samples) / var_x
+
+
+def component_of(filename: str) -> str:
+    path = Path(filename)
+    parts = set(path.parts) | {path.stem}
+    for name, markers in COMPONENTS:
+        if parts & markers:
+            return name
+    return "other"
+
+
+class MemoryHealth:
+    """Memory monitoring and enforcement for a long-running DARS process.
+
+    Components register caps: a size function (messages, blocks, registry
+    entries) with a limit and a compaction action, and recyclers that replace
+    a component outright. A background thread samples RSS, the cap sizes and,
+    with tracemalloc on, traced bytes per component, publishing them as gauges
+    and warning when RSS keeps climbing. Enforcement only happens in
+    after_turn(), between turns, where compaction cannot race a running turn.
+    """
+
+    def __init__(
+        self,
+        interval: float = 60.0,
+        max_rss_mb: float = 0.0,
+        recycle_turns: int = 0,
+        recycle_cooldown: float = 600.0,
+        trace_frames: int = 0,
+        leak_mb_per_hour: float = 20.0,
+        leak_window: float = 3600.0,
+        writer=None,
+    ):
+        self.interval = interval
+        self.max_rss_mb = max_rss_mb  # Recycle everything above this RSS (0 = no limit)
+        self.recycle_turns = recycle_turns  # Recycle every N turns (0 = never)
+        self.recycle_cooldown = recycle_cooldown  # Minimum seconds between RSS-triggered recycles
+        self.leak_mb_per_hour = leak_mb_per_hour
+        self.leak_window = leak_window
+        self.writer = writer  # Optional log writer receiving one JSON report per sample
+
+        self.caps: List[Tuple[str, Callable[[], float], Optional[float], Optional[Callable]]] = []
+        self.recyclers: List[Tuple[str, Callable]] = []
+        self.samples: deque = deque(maxlen=max(2, int(leak_window / max(interval, 1.0)) + 1))
+        self.turns = 0
+        self._last_recycle = time.monotonic()
+        self._last_leak_warning = 0.0
+        self._baseline: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if trace_frames and not tracemalloc.is_tracing():
+            tracemalloc.start(trace_frames)
+
+    @classmethod
+    def from_env(cls) -> Optional["MemoryHealth"]:
+        """Create a monitor unless DARS_MEMORY_HEALTH=0.
+
+        DARS_MEMORY_INTERVAL: seconds between samples (60)
+        DARS_MAX_RSS_MB: recycle the agent and recognizer above this RSS (1024, 0 = off)
+        DARS_RECYCLE_TURNS: also recycle every N turns (0 = off)
+        DARS_TRACEMALLOC: traceback frames for per-component tracing (0 = off; costs CPU)
+        DARS_LEAK_MB_PER_HOUR: sustained RSS growth reported as a leak (20)
+        DARS_MEMORY_LOG: log name for the JSON samples ("memory", 0 = off)
+        """
+        if os.getenv("DARS_MEMORY_HEALTH", "1") == "0":
+            return None
+        writer = None
+        log_name = os.getenv("DARS_MEMORY_LOG", "memory")
+        if log_name != "0":
+            from telemetry.logWriter import get_writer
+            writer = get_writer(log_name)
+        return cls(
+            interval=float(os.getenv("DARS_MEMORY_INTERVAL", "60")),
+            max_rss_mb=float(os.getenv("DARS_MAX_RSS_MB", "1024")),
+            recycle_turns=int(os.getenv("DARS_RECYCLE_TURNS", "0")),
+            recycle_cooldown=float(os.getenv("DARS_RECYCLE_COOLDOWN", "600")),
+            trace_frames=int(os.getenv("DARS_TRACEMALLOC", "0")),
+            leak_mb_per_hour=float(os.getenv("DARS_LEAK_MB_PER_HOUR", "20")),
+            writer=writer,
+        )
+
+    def add_cap(self, name: str, size: Callable[[], float], limit: Optional[float] = None,
+                action: Optional[Callable] = None) -> None:
+        """Watch a component's size; above `limit`, `action` compacts it after the turn"""
+        self.caps.append((name, size, limit, action))
+
+    def add_recycler(self, name: str, recycle: Callable) -> None:
+        """Register a component replaced when RSS passes max_rss_mb or every recycle_turns"""
+        self.recyclers.append((name, recycle))
+
+    def _sizes(self) -> Dict[str, float]:
+        sizes = {}
+        for name, size, _, _ in self.caps:
+            try:
+                sizes[name] = size()
+            except Exception as e:
+                print(f"Memory cap {name} unavailable: {str(e)}")
+        return sizes
+
+    def _traced_bytes(self) -> Dict[str, int]:
+        """Live traced bytes per component (empty unless tracemalloc is tracing)"""
+        if not tracemalloc.is_tracing():
+            return {}
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        totals: Dict[str, int] = {}
+        for stat in snapshot.statistics("filename"):
+            name = component_of(stat.traceback[0].filename)
+            totals[name] = totals.get(name, 0) + stat.size
+        return totals
+
+    def sample(self) -> Dict:
+        """Take one RSS/size/tracemalloc sample, publish it and check for a leak"""
+        rss = rss_bytes()
+        now = time.monotonic()
+        sizes = self._sizes()
+        traced = self._traced_bytes()
+        with self._lock:
+            self.samples.append((now, rss / MB))
+            samples = list(self.samples)
+            if traced and self._baseline is None:
+                self._baseline = traced
+            baseline = self._baseline or {}
+
+        tracer.set_gauge("memory_rss_bytes", rss)
+        for name, value in sizes.items():
+            tracer.set_gauge("memory_component_size", value, component=name)
+        for name, value in traced.items():
+            tracer.set_gauge("memory_traced_bytes", value, component=name)
+
+        slope = growth_rate(samples) * 3600
+        report = {
+            "time": time.time(),
+            "rss_mb": round(rss / MB, 2),
+            "rss_mb_per_hour": round(slope, 2),
+            "turns": self.turns,
+            "sizes": sizes,
+            "traced_kb": {name: round(value / 1024, 1) for name, value in traced.items()},
+            "traced_growth_kb": {
+                name: round((value - baseline.get(name, 0)) / 1024, 1) for name, value in traced.items()
+            },
+        }
+
+        # Only trust the trend once it covers a good part of the window
+        covered = samples[-1][0] - samples[0][0]
+        if covered >= self.leak_window / 4 and slope > self.leak_mb_per_hour \
+                and now - self._last_leak_warning > self.leak_window:
+            self._last_leak_warning = now
+            tracer.incr("memory_leak_warnings")
+            growth = report["traced_growth_kb"]
+            top = max(growth, key=growth.get) if growth else "unknown (set DARS_TRACEMALLOC)"
+            print(f"Memory warning: RSS growing {slope:.1f} MB/hour over {covered / 60:.0f} min, "
+                  f"largest traced growth: {top}")
+
+        if self.writer is not None:
+            self.writer.write(json.dumps(report))
+        return report
+
+    def after_turn(self) -> List[str]:
+        """Enforce caps and recycling; call from the main loop between turns.
+        Returns the names of the compactions and recycles performed."""
+        self.turns += 1
+        actions = []
+        for name, size, limit, action in self.caps:
+            if limit is None or action is None:
+                continue
+            try:
+                if size() > limit:
+                    action()
+                    actions.append(name)
+                    tracer.incr("memory_compactions", component=name)
+            except Exception as e:
+                print(f"Memory compaction {name} failed: {str(e)}")
+
+        reason = None
+        if self.recycle_turns and self.turns % self.recycle_turns == 0:
+            reason = "turns"
+        elif self.max_rss_mb and time.monotonic() - self._last_recycle > self.recycle_cooldown \
+                and rss_bytes() / MB > self.max_rss_mb:
+            reason = "rss"
+        if reason is not None:
+            actions.extend(self.recycle(reason))
+        return actions
+
+    def recycle(self, reason: str = "manual") -> List[str]:
+        """Replace every registered component and return freed memory to the OS"""
+        recycled = []
+        for name, recycle in self.recyclers:
+            try:
+                if recycle() is not False:
+                    recycled.append(f"recycle:{name}")
+                    tracer.incr("memory_recycles", component=name, reason=reason)
+            except Exception as e:
+                print(f"Recycling {name} failed: {str(e)}")
+        self._last_recycle = time.monotonic()
+        release_memory()
+        return recycled
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Memory sample failed: {str(e)}")
+
+    def start(self) -> "MemoryHealth":
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="dars-memory-health", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
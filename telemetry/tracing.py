@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import uuid
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Histogram buckets (seconds) for span durations
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Span:
+    """A timed operation inside a turn"""
+    __slots__ = ("name", "span_id", "parent_id", "turn", "start", "end", "attributes")
+
+    def __init__(self, name: str, turn: "Turn", parent_id: Optional[str], attributes: Dict):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent_id
+        self.turn = turn
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "offset_ms": round((self.start - self.turn.start) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3) if self.end is not None else None,
+            "attributes": self.attributes,
+        }
+
+
+class Turn:
+    """All spans sharing one turn id"""
+    __slots__ = ("turn_id", "wall_time", "start", "spans")
+
+    def __init__(self):
+        self.turn_id = uuid.uuid4().hex[:12]
+        self.wall_time = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def to_dict(self) -> Dict:
+        return {
+            "turn_id": self.turn_id,
+            "time": self.wall_time,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+class Tracer:
+    """Per-turn span tracing with counters and span-duration histograms.
+
+    Spans nest through a context variable. A span opened with no parent starts
+    a new turn, and the whole turn is handed to the exporters once it closes.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.exporters = []
+        self._current: contextvars.ContextVar = contextvars.ContextVar("dars_span", default=None)
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[str, List[float]] = {}  # bucket counts, then sum, then count
+
+    @property
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    @property
+    def current_turn_id(self) -> Optional[str]:
+        span = self._current.get()
+        return span.turn.turn_id if span else None
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """Time a block of code as a span nested under the current one"""
+        if not self.enabled:
+            yield None
+            return
+
+        parent = self._current.get()
+        turn = parent.turn if parent else Turn()
+        span = Span(name, turn, parent.span_id if parent else None, attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = type(e).__name__
+            self.incr("span_errors", span=name)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            self._current.reset(token)
+            turn.spans.append(span)
+            self._observe(name, span.end - span.start)
+            if parent is None:
+                self._export(turn)
+
+    @contextmanager
+    def turn(self, **attributes) -> Iterator[Optional[Span]]:
+        """Start a new turn regardless of any span already open"""
+        token = self._current.set(None)
+        try:
+            with self.span("turn", **attributes) as span:
+                yield span
+        finally:
+            self._current.reset(token)
+
+    def traced(self, name: str):
+        """Decorator that wraps every call of a function in a span"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def incr(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a counter, optionally labelled"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Record the latest value of a gauge, optionally labelled"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def mark_first(self, items: Iterable, attribute: str) -> Iterator:
+        """Yield from items, recording ms until the first item on the current span"""
+        span = self._current.get()
+        start = time.perf_counter()
+        first = True
+        for item in items:
+            if first and span is not None:
+                span.attributes[attribute] = round((time.perf_counter() - start) * 1000, 3)
+                first = False
+            yield item
+
+    def _observe(self, name: str, duration: float) -> None:
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = [0] * (len(DURATION_BUCKETS) + 2)
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    hist[i] += 1
+            hist[-2] += duration
+            hist[-1] += 1
+
+    def _export(self, turn: Turn) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(turn)
+            except Exception as e:
+                print(f"Trace export failed: {str(e)}")
+
+    def render_prometheus(self) -> str:
+        """Render counters, gauges and span histograms in the Prometheus text format"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {name: list(hist) for name, hist in self._histograms.items()}
+
+        lines = []
+        seen = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"dars_{name}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_str}}} {value:g}" if label_str else f"{metric} {value:g}")
+
+        for (name, labels), value in sorted(gauges.items()):
+            metric = f"dars_{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} gauge")
+                seen.add(metric)
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_str}}} {value:.15g}" if label_str else f"{metric} {value:.15g}")
+
+        if histograms:
+            lines.append("# TYPE dars_span_duration_seconds histogram")
+        for name, hist in sorted(histograms.items()):
+            for bound, count in zip(DURATION_BUCKETS, hist):
+                lines.append(f'dars_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+            lines.append(f'dars_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {hist[-1]}')
+            lines.append(f'dars_span_duration_seconds_sum{{span="{name}"}} {hist[-2]:.6f}')
+            lines.append(f'dars_span_duration_seconds_count{{span="{name}"}} {hist[-1]}')
+
+        return "\n".join(lines) + "\n"
+
+
+class LogExporter:
+    """Write one JSON line per finished turn through a background log writer.
+
+    The line is stamped when the turn ends; its start time is the JSON "time".
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def export(self, turn: Turn) -> None:
+        self.writer.write(json.dumps(turn.to_dict()), turn_id=turn.turn_id)
+
+
+class PrometheusExporter:
+    """Serve the tracer's metrics at http://host:port/metrics"""
+
+    def __init__(self, tracer: Tracer, host: str = "127.0.0.1", port: int = 9464):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.tracer.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.tracer = tracer
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def export(self, turn: Turn) -> None:
+        # Metrics are pulled from the tracer on scrape
+        pass
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# Shared tracer used across DARS components
+tracer = Tracer()
+
+
+def configure_from_env() -> Tracer:
+    """Attach exporters based on DARS_TRACING, DARS_TRACE_LOG and DARS_METRICS_PORT.
+    Safe to call again: exporters already attached are not added twice."""
+    if os.getenv("DARS_TRACING", "1") == "0":
+        tracer.enabled = False
+        return tracer
+
+    trace_log = os.getenv("DARS_TRACE_LOG", "traces")
+    if trace_log != "0":
+        # Rotated and compressed alongside the agent logs in DARS_LOG_DIR
+        from telemetry.logWriter import get_writer
+        writer = get_writer(trace_log)
+        if not any(isinstance(e, LogExporter) and e.writer is writer for e in tracer.exporters):
+            tracer.exporters.append(LogExporter(writer))
+
+    # Opt-in: a listening port is not something every run should open (9464 is the usual one)
+    metrics_port = int(os.getenv("DARS_METRICS_PORT", "0"))
+    if metrics_port and not any(isinstance(e, PrometheusExporter) for e in tracer.exporters):
+        try:
+            tracer.exporters.append(PrometheusExporter(tracer, port=metrics_port))
+        except OSError as e:
+            print(f"Metrics endpoint disabled: {str(e)}")
+
+    return tracer
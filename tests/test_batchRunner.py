@@ -0,0 +1,71 @@
+import os
+import csv
+import json
+
+import pytest
+
+from benchmarks.fakeServers import FakeOpenAIServer
+from languageModel import batchRunner
+from music import musicLibrary
+
+
+def _tool(name, **arguments):
+    return {"tool": {"name": name, "arguments": arguments}}
+
+
+SCRIPT = [
+    {"match": "milk", "replies": [_tool("todo_operation", operation="new", item_name="buy milk"), "Added."]},
+    {"match": "laundry", "replies": [_tool("todo_operation", operation="new", item_name="do laundry"), "Added."]},
+    {"match": "play", "replies": [_tool("song_player", state=True), "Enjoy."]},
+]
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.setenv("DARS_LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(musicLibrary, "_library", None)
+    llm = FakeOpenAIServer(SCRIPT, first_token_delay=0.0, token_delay=0.0).start()
+    yield llm, tmp_path
+    llm.stop()
+
+
+def _conversations(tmp_path):
+    conversations = tmp_path / "conversations.json"
+    conversations.write_text(json.dumps([
+        {"name": "milk", "turns": [{"text": "add a todo to buy milk", "expect_function": "todo"}]},
+        {"name": "laundry", "turns": [{"text": "add a todo to do laundry", "expect_function": "todo"}]},
+        {"name": "music", "turns": [{"text": "play some music", "expect_function": "now playing"}]},
+    ]))
+    return str(conversations)
+
+
+def test_sandboxed_conversations_keep_their_own_files(home):
+    llm, tmp_path = home
+    output = tmp_path / "results.jsonl"
+    sandbox = tmp_path / "sandbox"
+    batchRunner.main(_conversations(tmp_path), output=str(output), concurrency=3, api_base=f"{llm.url}/v1",
+                     sandbox_dir=str(sandbox))
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert all(r["passed"] for r in records), records
+    assert next(r for r in records if r["conversation"] == "music")["function"] == "Now playing: Daft Punk - Veridis Quo"
+
+    todos = sorted(
+        [row[0] for row in csv.reader(path.open())][1:]
+        for path in sandbox.glob("conversation-*/todolist/todos.csv")
+    )
+    assert todos == [["buy milk"], ["do laundry"]]
+
+
+def test_the_default_sandbox_is_removed_and_home_untouched(home):
+    llm, tmp_path = home
+    output = tmp_path / "results.jsonl"
+    batchRunner.main(_conversations(tmp_path), output=str(output), concurrency=3, api_base=f"{llm.url}/v1")
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert all(r["passed"] for r in records), records
+    assert os.environ["HOME"] == str(tmp_path / "home")
+    assert not (tmp_path / "home" / ".config" / "DARS" / "todolist").exists()
+    assert musicLibrary._library is None
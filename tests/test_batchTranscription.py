@@ -0,0 +1,86 @@
+import json
+import math
+import wave
+import array
+from pathlib import Path
+
+import pytest
+
+from speechRecognition import batchTranscription
+from speechRecognition.batchTranscription import DEFAULT_MODEL_PATH, find_wav_files, main, transcribe_file
+
+HAS_MODEL = (Path(DEFAULT_MODEL_PATH) / "am" / "final.mdl").exists()
+
+
+def _write_wav(path: Path, samples: bytes) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(samples)
+    return path
+
+
+def _tone(seconds: float, pitch: float = 150.0) -> bytes:
+    samples = array.array("h", (int(6000 * math.sin(2 * math.pi * pitch * i / 16000))
+                                for i in range(int(seconds * 16000))))
+    return samples.tobytes() + bytes(int(0.3 * 16000) * 2)
+
+
+def test_directories_expand_to_sorted_wav_files(tmp_path):
+    recordings = tmp_path / "recordings"
+    _write_wav(recordings / "b.wav", bytes(320))
+    _write_wav(recordings / "nested" / "a.wav", bytes(320))
+    (recordings / "notes.txt").write_text("not audio")
+    single = _write_wav(tmp_path / "single.wav", bytes(320))
+    (tmp_path / "song.mp3").write_bytes(b"")
+
+    assert find_wav_files([str(recordings), str(single), str(tmp_path / "song.mp3")]) == [
+        str(recordings / "b.wav"),
+        str(recordings / "nested" / "a.wav"),
+        str(single),
+    ]
+
+
+def test_unreadable_files_become_error_records(tmp_path):
+    broken = tmp_path / "broken.wav"
+    broken.write_bytes(b"RIFF not really")
+    record = transcribe_file(str(broken))
+    assert record["file"] == str(broken) and "error" in record
+
+
+def test_missing_paths_become_error_records(tmp_path):
+    missing = tmp_path / "gone.wav"
+    missing_dir = tmp_path / "no-such-dir"
+    assert find_wav_files([str(missing), str(missing_dir)]) == [str(missing), str(missing_dir)]
+    record = transcribe_file(str(missing))
+    assert record["file"] == str(missing) and "No such file" in record["error"]
+
+
+def test_transcribing_without_any_model_raises_a_clear_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(batchTranscription, "DEFAULT_MODEL_PATH", str(tmp_path / "no-model"))
+    monkeypatch.setattr(batchTranscription, "_worker_model", None)
+    wav = _write_wav(tmp_path / "clip.wav", bytes(320))
+    with pytest.raises(ValueError, match="No Vosk model"):
+        transcribe_file(str(wav))
+
+
+@pytest.mark.skipif(not HAS_MODEL, reason="Vosk model files not present")
+def test_batch_writes_a_jsonl_record_per_file_through_the_pool(tmp_path):
+    recordings = tmp_path / "recordings"
+    first = _write_wav(recordings / "first.wav", _tone(1.0))
+    second = _write_wav(recordings / "later" / "second.wav", _tone(0.5, 220.0))
+    output = tmp_path / "results.jsonl"
+
+    main(str(recordings), output=str(output), workers=2, chunksize=1)
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r["file"] for r in records] == [str(first), str(second)]
+    for record in records:
+        assert "error" not in record
+        assert isinstance(record["text"], str)
+        assert isinstance(record["words"], list)
+        assert all(set(word) == {"word", "start", "end", "conf"} for word in record["words"])
+        assert record["duration"] > 0
+        assert record["rtf"] > 0
@@ -0,0 +1,91 @@
+import pytest
+
+from benchmarks.fakeServers import FakeOpenAIServer, FakeTTSServer
+from benchmarks.soakTest import ScriptedRecognizer
+from languageModel.llm import DARSAgent
+from main import DARSVoiceInterface, ERROR_REPLY
+from replay.sessionArchive import SessionRecorder, load_turns
+from speechSynthesis.speechSynthesis import TarsVoice
+from telemetry.tracing import tracer
+
+SCRIPT = [
+    {"match": "fan", "replies": [
+        {"tool": {"name": "appliance_control", "arguments": {"state": True, "appliance": "room fan"}}},
+        "The room fan is now on.",
+    ]},
+    {"match": "mars", "replies": ["Cold, dusty and a long way off."]},
+]
+
+
+@pytest.fixture
+def servers(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("DARS_LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test")
+    llm = FakeOpenAIServer(SCRIPT, first_token_delay=0.0, token_delay=0.0).start()
+    tts = FakeTTSServer(first_byte_delay=0.0, chunk_delay=0.0).start()
+    yield llm, tts
+    llm.stop()
+    tts.stop()
+
+
+def test_tool_turn_is_served_spoken_and_recorded(servers, tmp_path):
+    llm, tts = servers
+    played = []
+    recorder = SessionRecorder(str(tmp_path / "session.dars"))
+    interface = DARSVoiceInterface(
+        dars=DARSAgent(api_key="test", api_base=f"{llm.url}/v1", no_cache=True),
+        speech_recognizer=ScriptedRecognizer(["turn on the room fan", "tell me about mars"]),
+        tars_voice=TarsVoice(base_url=tts.url, player=lambda audio: played.extend(audio)),
+        recorder=recorder,
+    )
+    try:
+        assert interface.run_turn()
+        # The tool call and the reply after its result
+        assert len(llm.requests) == 2
+        assert interface.dars.last_degraded is None
+        assert interface.run_turn()
+        assert len(llm.requests) == 3
+        assert interface.dars.last_degraded is None
+    finally:
+        recorder.close()
+        tracer.exporters.remove(recorder)
+
+    # One synthesis request per spoken reply
+    assert len(tts.requests) == 2
+    assert b"".join(played)
+
+    fan, mars = load_turns(recorder.path)
+    assert fan["transcript"] == "turn on the room fan"
+    assert fan["llm"]["function_output"] == "Room Fan turned on"
+    assert fan["llm"]["messages"] == [
+        {"role": "user", "content": "turn on the room fan"},
+        {"role": "assistant", "content": '{"request": "appliance_control", "state": true, "appliance": "room fan"}'},
+        {"role": "user", "content": "FUNC: Room Fan turned on\nThe room fan is now on. Starting air circulation."},
+        {"role": "assistant", "content": "The room fan is now on."},
+    ]
+    # The tool's own response and the model's reply, without tool JSON or cost stats
+    assert fan["tts"] == ["The room fan is now on. Starting air circulation. The room fan is now on."]
+
+    # The second turn records its own exchange, not an empty history
+    assert mars["llm"]["messages"] == [
+        {"role": "user", "content": "tell me about mars"},
+        {"role": "assistant", "content": "Cold, dusty and a long way off."},
+    ]
+    assert mars["llm"]["function_output"] is None
+    assert mars["tts"] == ["Cold, dusty and a long way off."]
+
+
+def test_error_reply_falls_back_when_the_voice_fails(servers, capsys):
+    llm, tts = servers
+
+    def broken_speaker(audio):
+        raise OSError("audio device unavailable")
+
+    interface = DARSVoiceInterface(
+        dars=DARSAgent(api_key="test", api_base=f"{llm.url}/v1", no_cache=True),
+        speech_recognizer=ScriptedRecognizer([]),
+        tars_voice=TarsVoice(base_url=tts.url, player=broken_speaker),
+    )
+    interface._apologize()
+    assert f"(Voice unavailable) DARS: {ERROR_REPLY}" in capsys.readouterr().out
@@ -0,0 +1,69 @@
+import json
+
+from benchmarks.fakeServers import FakeOpenAIServer
+
+FAN_TOOL = {"name": "appliance_control", "arguments": {"state": True, "appliance": "room fan"}}
+SCRIPT = [{"match": "fan", "replies": [{"tool": FAN_TOOL}, "The fan is on."]}]
+
+
+def _pick(messages):
+    return FakeOpenAIServer(SCRIPT).pick_reply(messages)[0]
+
+
+def test_first_call_of_a_turn_gets_the_first_reply():
+    assert _pick([{"role": "system", "content": "..."}, {"role": "user", "content": "turn on the fan"}]) == {"tool": FAN_TOOL}
+
+
+def test_json_tool_results_do_not_start_a_new_turn():
+    messages = [
+        {"role": "system", "content": "..."},
+        {"role": "user", "content": "turn on the fan"},
+        {"role": "assistant", "content": json.dumps({"request": "appliance_control", "state": True})},
+        {"role": "user", "content": "FUNC: Room Fan turned on"},
+    ]
+    assert _pick(messages) == "The fan is on."
+
+
+def test_native_tool_results_do_not_start_a_new_turn():
+    messages = [
+        {"role": "user", "content": "turn on the fan"},
+        {"role": "assistant", "content": None, "tool_calls": [{"id": "call_fake"}]},
+        {"role": "tool", "content": "FUNC: Room Fan turned on"},
+    ]
+    assert _pick(messages) == "The fan is on."
+
+
+def test_a_new_utterance_after_a_plain_reply_starts_a_new_turn():
+    messages = [
+        {"role": "user", "content": "turn on the fan"},
+        {"role": "assistant", "content": "The fan is on."},
+        {"role": "user", "content": "the fan again please"},
+    ]
+    assert _pick(messages) == {"tool": FAN_TOOL}
+
+
+def test_unmatched_messages_get_the_default_reply():
+    assert _pick([{"role": "user", "content": "hello"}]) == "Understood."
+
+
+def test_exact_entries_answer_only_the_exact_utterance():
+    server = FakeOpenAIServer([{"match": "turn on the fan", "exact": True, "replies": ["Fan on."]}])
+    assert server.pick_reply([{"role": "user", "content": "turn on the fan please"}])[0] == "Understood."
+    assert server.pick_reply([{"role": "user", "content": "turn on the fan"}])[0] == "Fan on."
+
+
+def test_exact_entries_for_a_repeated_utterance_are_used_turn_by_turn():
+    server = FakeOpenAIServer([
+        {"match": "turn on the fan", "exact": True, "replies": [{"tool": FAN_TOOL}, "The fan is on."]},
+        {"match": "turn on the fan", "exact": True, "replies": ["It already is."]},
+    ])
+    first_call = [{"role": "user", "content": "turn on the fan"}]
+    second_call = first_call + [
+        {"role": "assistant", "content": json.dumps({"request": "appliance_control", "state": True})},
+        {"role": "user", "content": "FUNC: Room Fan turned on"},
+    ]
+    assert server.pick_reply(first_call)[0] == {"tool": FAN_TOOL}
+    assert server.pick_reply(second_call)[0] == "The fan is on."
+    assert server.pick_reply(first_call)[0] == "It already is."
+    # The last entry repeats once the queue is spent
+    assert server.pick_reply(first_call)[0] == "It already is."
@@ -0,0 +1,74 @@
+import ssl
+import time
+
+import pytest
+
+from network.httpPool import HTTPPool
+from benchmarks.fakeServers import FakeTTSServer, make_self_signed_cert
+
+
+@pytest.fixture(scope="module")
+def tls_server(tmp_path_factory):
+    certfile, keyfile = make_self_signed_cert(str(tmp_path_factory.mktemp("tls")))
+    server = FakeTTSServer(first_byte_delay=0.0, chunk_delay=0.0, certfile=certfile, keyfile=keyfile).start()
+    yield server, ssl.create_default_context(cafile=certfile)
+    server.stop()
+
+
+def _speak(pool: HTTPPool, server) -> None:
+    with pool.client.stream("POST", f"{server.url}/v1/text-to-speech/voice", json={"text": "Hi."}) as response:
+        assert response.status_code == 200
+        for _ in response.iter_bytes():
+            pass
+
+
+def test_second_request_reuses_the_tls_connection(tls_server):
+    server, context = tls_server
+    pool = HTTPPool(verify=context, name="test")
+    try:
+        _speak(pool, server)
+        _speak(pool, server)
+        stats = pool.stats()
+    finally:
+        pool.close()
+    assert stats["requests"] == 2
+    assert stats["connections"] == 1
+    assert stats["tls_handshakes"] == 1
+    assert stats["reuse_ratio"] == 0.5
+
+
+def test_warm_opens_the_connection_the_next_request_uses(tls_server):
+    server, context = tls_server
+    pool = HTTPPool(verify=context, name="test")
+    try:
+        assert pool.warm([server.url], background=False) is None
+        _speak(pool, server)
+        stats = pool.stats()
+    finally:
+        pool.close()
+    assert stats["warmups"] == 1
+    assert stats["tls_handshakes"] == 1
+    assert stats["requests"] == 2
+
+
+def test_warm_if_idle_reconnects_only_after_the_idle_period(tls_server):
+    server, context = tls_server
+    # Connections expire before the idle threshold, as they would between spoken turns
+    pool = HTTPPool(verify=context, keepalive_expiry=0.1, name="test")
+    try:
+        _speak(pool, server)
+        assert pool.warm_if_idle([server.url], idle_after=0.3) is None
+        assert pool.stats()["warmups"] == 0
+
+        time.sleep(0.4)
+        thread = pool.warm_if_idle([server.url], idle_after=0.3)
+        assert thread is not None
+        thread.join()
+        _speak(pool, server)
+        stats = pool.stats()
+    finally:
+        pool.close()
+    assert stats["warmups"] == 1
+    # The warm-up paid for the second handshake; the request after it reused it
+    assert stats["tls_handshakes"] == 2
+    assert stats["requests"] == 3
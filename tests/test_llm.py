@@ -0,0 +1,151 @@
+import pytest
+from langroid.language_models.base import LLMMessage, Role
+from langroid.agent.task import TaskConfig
+from langroid.utils.object_registry import ObjectRegistry
+
+from benchmarks.fakeServers import FakeOpenAIServer
+from languageModel.llm import DARSAgent, DARSTask, _object_id
+
+SCRIPT = [
+    {"match": "note", "replies": [
+        {"tool": {"name": "note_operation", "arguments": {"operation": "new", "title": "test", "content": "Hello."}}},
+        "Saved the note.",
+    ]},
+]
+UTTERANCES = ["make a note called test", "what should I cook tonight", "tell me about mars"]
+
+
+@pytest.fixture
+def llm_server():
+    server = FakeOpenAIServer(SCRIPT, first_token_delay=0.0, token_delay=0.0).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def dars(tmp_path, monkeypatch, llm_server):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("DARS_LOG_DIR", str(tmp_path / "logs"))
+    agent = DARSAgent(api_key="test", api_base=f"{llm_server.url}/v1", no_cache=True)
+    yield agent
+    agent.close()
+
+
+def _registered(agent) -> int:
+    agent_id = _object_id(agent.agent)
+    return sum(1 for obj in ObjectRegistry.registry.values()
+               if getattr(getattr(obj, "metadata", None), "agent_id", None) == agent_id)
+
+
+def test_history_since_skips_the_system_prompt(dars):
+    dars.agent.message_history = [
+        LLMMessage(role=Role.SYSTEM, content="system prompt"),
+        LLMMessage(role=Role.USER, content="question 0"),
+        LLMMessage(role=Role.ASSISTANT, content='{"request": "note_operation"}'),
+        LLMMessage(role=Role.USER, content="FUNC: note 0 saved"),
+        LLMMessage(role=Role.ASSISTANT, content="answer 0"),
+    ]
+    messages = dars.history_since(0)
+    assert [m["role"] for m in messages] == ["user", "assistant", "user", "assistant"]
+    assert messages[0]["content"] == "question 0"
+
+
+def test_each_run_starts_from_a_fresh_history(dars):
+    dars.process_message(UTTERANCES[0])
+    assert [m["role"] for m in dars.last_turn_messages] == ["user", "assistant", "user", "assistant"]
+
+    dars.process_message(UTTERANCES[1])
+    assert dars.last_turn_messages[0]["content"] == UTTERANCES[1]
+    contents = [m.content for m in dars.agent.message_history]
+    assert UTTERANCES[0] not in contents
+    assert len(contents) == 3  # System prompt, utterance, reply
+
+
+def test_registry_and_responses_stay_bounded_over_many_turns(dars):
+    counts = []
+    for i in range(24):
+        dars.process_message(UTTERANCES[i % len(UTTERANCES)])
+        # Only the latest run's responses are held until they are released
+        assert 0 < dars.response_count <= 6
+        dars.release_documents()
+        assert dars.response_count == 0
+        counts.append(_registered(dars))
+    assert max(counts[len(UTTERANCES):]) <= max(counts[:len(UTTERANCES)])
+
+
+def test_recycle_replaces_the_agent_and_unregisters_the_old_one(dars):
+    for text in UTTERANCES:
+        dars.process_message(text)
+    dars.humor_level = 80
+    old = dars.agent
+    assert _registered(dars) > 0
+    assert dars.recycle()
+    assert dars.agent is not old
+    assert _object_id(old) not in ObjectRegistry.registry
+    assert not any(getattr(getattr(obj, "metadata", None), "agent_id", None) == _object_id(old)
+                   for obj in ObjectRegistry.registry.values())
+    assert dars.humor_level == 80
+
+    natural_language, function_output = dars.process_message(UTTERANCES[0])
+    assert function_output and "test" in function_output
+    assert dars.last_degraded is None
+
+
+def test_recycle_waits_for_a_running_task(dars):
+    with dars._task_lock:
+        assert not dars.recycle()
+
+
+def test_task_loggers_follow_enable_loggers(dars):
+    dars.process_message(UTTERANCES[1])
+    assert dars.task.logger is not None
+    assert dars.task.html_logger is None
+
+    dars.task = DARSTask(dars.agent, interactive=False, restart=True, config=TaskConfig(enable_loggers=False))
+    dars.process_message(UTTERANCES[1])
+    assert dars.task.logger is None and dars.task.tsv_logger is None
+    assert dars.task.html_logger is None
+
+
+def _failing_agent(tmp_path, monkeypatch, server):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("DARS_LOG_DIR", str(tmp_path / "logs"))
+    return DARSAgent(api_key="test", api_base=f"{server.url}/v1", no_cache=True)
+
+
+def test_breaker_opens_when_every_request_fails(tmp_path, monkeypatch):
+    server = FakeOpenAIServer(first_token_delay=0.0, token_delay=0.0, error_rate=1.0).start()
+    agent = _failing_agent(tmp_path, monkeypatch, server)
+    try:
+        for _ in range(agent.llm_guard.breaker.failure_threshold):
+            reply, _ = agent.process_message(UTTERANCES[2])
+            assert agent.last_degraded == "LLMUnavailable"
+            assert reply.startswith("My uplink to the language model is down")
+        # One request per turn: retries belong to llm_guard alone
+        assert len(server.requests) == agent.llm_guard.breaker.failure_threshold
+        assert agent.llm_guard.breaker.state == "open"
+
+        agent.process_message(UTTERANCES[2])
+        assert agent.last_degraded == "CircuitOpenError"
+        assert len(server.requests) == agent.llm_guard.breaker.failure_threshold
+    finally:
+        agent.close()
+        server.stop()
+
+
+def test_turns_behind_an_abandoned_run_count_against_the_breaker(tmp_path, monkeypatch):
+    monkeypatch.setenv("DARS_LLM_BUDGET", "0.3")
+    server = FakeOpenAIServer(first_token_delay=3.0, token_delay=0.0).start()
+    agent = _failing_agent(tmp_path, monkeypatch, server)
+    try:
+        agent.process_message(UTTERANCES[2])
+        assert agent.last_degraded == "DeadlineExceeded"
+        for _ in range(agent.llm_guard.breaker.failure_threshold - 1):
+            agent.process_message(UTTERANCES[2])
+            assert agent.last_degraded == "busy"
+        assert agent.llm_guard.breaker.state == "open"
+        agent.process_message(UTTERANCES[2])
+        assert agent.last_degraded == "CircuitOpenError"
+    finally:
+        agent.close()
+        server.stop()
@@ -0,0 +1,92 @@
+import gzip
+import io
+import threading
+from datetime import datetime, timedelta
+
+from telemetry.logQuery import _seek_plain, list_segments, query
+from telemetry.logWriter import AsyncLogWriter, escape
+
+BASE = datetime(2026, 10, 18, 9, 0, 0)
+
+
+def _line(seconds: int, turn: str = "-", message: str = "") -> str:
+    stamp = (BASE + timedelta(seconds=seconds)).isoformat(timespec="microseconds")
+    return f"{stamp}\t{turn}\t{escape(message or f'record {seconds}')}\n"
+
+
+def _write_segment(directory, name, seconds, compressed):
+    lines = "".join(_line(s, f"turn{s % 3}") for s in seconds)
+    if not compressed:
+        (directory / f"{name}.log").write_text(lines)
+        return
+    stamp = (BASE + timedelta(seconds=seconds[0])).strftime("%Y%m%dT%H%M%S%f")
+    with gzip.open(directory / f"{name}.{stamp}.log.gz", "wt") as f:
+        f.write(lines)
+
+
+def _iso(seconds: int) -> str:
+    return (BASE + timedelta(seconds=seconds)).isoformat()
+
+
+def test_seek_plain_finds_first_line_at_or_after_start():
+    data = "".join(_line(s) for s in range(0, 2000, 2)).encode()
+    for target in (0, 1, 2, 999, 1000, 1998):
+        f = io.BytesIO(data)
+        _seek_plain(f, (BASE + timedelta(seconds=target)).isoformat(timespec="microseconds"))
+        first = f.readline().decode()
+        assert first == _line(target + target % 2)
+
+    f = io.BytesIO(data)
+    _seek_plain(f, _iso(5000))
+    assert f.readline() == b""
+
+
+def test_segments_are_listed_oldest_first_with_the_active_log_last(tmp_path):
+    _write_segment(tmp_path, "agent", [100, 101], compressed=True)
+    _write_segment(tmp_path, "agent", [0, 1], compressed=True)
+    _write_segment(tmp_path, "agent", [200, 201], compressed=False)
+    _write_segment(tmp_path, "agent-other", [0], compressed=True)
+
+    segments = list_segments(tmp_path, "agent")
+    assert [path.name for _, path in segments][-1] == "agent.log"
+    assert [start for start, _ in segments] == sorted(start for start, _ in segments)
+    assert len(segments) == 3
+
+
+def test_query_by_time_range_across_segments(tmp_path):
+    _write_segment(tmp_path, "agent", list(range(0, 100)), compressed=True)
+    _write_segment(tmp_path, "agent", list(range(100, 200)), compressed=True)
+    _write_segment(tmp_path, "agent", list(range(200, 300)), compressed=False)
+
+    records = list(query("agent", start=_iso(95), end=_iso(205), directory=str(tmp_path)))
+    assert records[0][2] == "record 95"
+    assert records[-1][2] == "record 205"
+    assert len(records) == 111
+
+
+def test_query_by_turn_and_unescaping(tmp_path):
+    (tmp_path / "agent.log").write_text(_line(0, "a", "two\nlines") + _line(1, "b") + _line(2, "a", "back\\slash"))
+    records = list(query("agent", turn="a", directory=str(tmp_path)))
+    assert [message for _, _, message in records] == ["two\nlines", "back\\slash"]
+
+
+def test_writer_keeps_concurrent_records_in_time_order_and_query_skips_the_header(tmp_path):
+    writer = AsyncLogWriter(tmp_path, "agent", header="time\tturn\tmessage")
+
+    def write_many(turn):
+        for i in range(200):
+            writer.write(f"{turn} {i}", turn_id=turn)
+
+    threads = [threading.Thread(target=write_many, args=(f"t{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    stamps = [line.split("\t", 1)[0] for line in (tmp_path / "agent.log").read_text().splitlines()]
+    assert stamps == sorted(stamps)
+
+    records = list(query("agent", start=stamps[1], directory=str(tmp_path)))
+    assert len(records) == 800
+    assert all(turn_id.startswith("t") for _, turn_id, _ in records)
@@ -0,0 +1,88 @@
+import wave
+
+import pytest
+
+from music.musicLibrary import MusicLibrary, normalize, song_query
+
+
+def _write_wav(path, seconds=0.05, rate=8000):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(bytes(int(seconds * rate) * 2))
+
+
+@pytest.fixture
+def library(tmp_path):
+    music = tmp_path / "music"
+    for name in ["Daft Punk - Veridis Quo", "Daft Punk - Digital Love", "Beyoncé - Halo", "Hans Zimmer - Cornfield Chase"]:
+        _write_wav(music / f"{name}.wav")
+    library = MusicLibrary(music, tmp_path / "index.sqlite")
+    library.scan()
+    return library
+
+
+def test_normalize_and_song_query():
+    assert normalize("Beyoncé - Halo!") == ["beyonce", "halo"]
+    assert song_query("play some daft punk please") == "daft punk"
+    assert song_query("play some music") is None
+    assert song_query("put on take me to church") == "take me to church"
+
+
+def test_scan_reads_artist_and_title_from_file_names(library):
+    titles = {(t["artist"], t["title"]) for t in library.tracks}
+    assert ("Daft Punk", "Veridis Quo") in titles
+    assert all(t["duration"] == pytest.approx(0.05) for t in library.tracks)
+
+
+def test_find_exact_and_misrecognized_names(library):
+    assert library.best_match("play veridis quo")["title"] == "Veridis Quo"
+    assert library.best_match("play veritas quo by daft punk")["title"] == "Veridis Quo"
+    assert library.best_match("play halo by beyonce")["title"] == "Halo"
+    assert library.best_match("play corn field chase") is None or \
+        library.best_match("play corn field chase")["title"] == "Cornfield Chase"
+
+
+def test_titles_made_of_command_words(library):
+    _write_wav(library.music_dir / "Hozier - Take Me To Church.wav")
+    _write_wav(library.music_dir / "Madonna - Music.wav")
+    library.scan()
+    assert library.best_match("play take me to church")["title"] == "Take Me To Church"
+    assert library.best_match("music")["title"] == "Music"
+    assert library.best_match("play music by madonna")["title"] == "Music"
+    # Without a name, "play some music" still asks for any music
+    assert library.best_match("play some music") is None
+
+
+def test_unknown_song_has_no_match(library):
+    assert library.best_match("play bohemian rhapsody") is None
+    assert library.find("play some music") == []
+
+
+def test_rescan_only_touches_changed_files(library):
+    stats = library.scan()
+    assert stats["added"] == stats["updated"] == stats["removed"] == 0
+
+    (library.music_dir / "Beyoncé - Halo.wav").unlink()
+    _write_wav(library.music_dir / "Daft Punk - One More Time.wav")
+    stats = library.scan()
+    assert (stats["added"], stats["removed"]) == (1, 1)
+    assert library.best_match("play one more time")["title"] == "One More Time"
+    assert library.best_match("play halo") is None
+
+
+def test_index_persists_across_instances(library, tmp_path):
+    reopened = MusicLibrary(library.music_dir, tmp_path / "index.sqlite")
+    assert len(reopened.tracks) == len(library.tracks)
+
+
+def test_background_refresh_serves_the_current_index(library):
+    _write_wav(library.music_dir / "Daft Punk - One More Time.wav")
+    library.refresh(0, wait=False)
+    # Lookups don't wait for the scan
+    assert library.best_match("play halo")["title"] == "Halo"
+    library._scanner.join()
+    assert not library.scanning
+    assert library.best_match("play one more time")["title"] == "One More Time"
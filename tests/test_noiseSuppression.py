@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from speechRecognition.noiseSuppression import NoiseSuppressor
+
+
+def _to_bytes(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def _run(suppressor: NoiseSuppressor, samples: np.ndarray, block: int) -> np.ndarray:
+    data = _to_bytes(samples)
+    out = b"".join(suppressor.process(data[i:i + block * 2]) for i in range(0, len(data), block * 2))
+    return np.frombuffer(out, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+@pytest.mark.parametrize("block", [160, 512, 1000, 4000])
+def test_unit_gain_reconstructs_the_input_delayed_by_one_hop(block):
+    rng = np.random.default_rng(0)
+    samples = 0.3 * rng.standard_normal(16000).astype(np.float32)
+    suppressor = NoiseSuppressor(over_subtraction=0.0)
+    out = _run(suppressor, samples, block)
+
+    delay = suppressor.frame_size - suppressor.hop
+    assert suppressor.latency == delay / 16000
+    expected = np.frombuffer(_to_bytes(samples), dtype=np.int16).astype(np.float32) / 32768.0
+    n = len(out) - delay
+    assert n > 15000
+    np.testing.assert_allclose(out[delay:], expected[:n], atol=2e-4)
+
+
+def test_stationary_noise_is_attenuated_and_a_new_tone_survives():
+    rng = np.random.default_rng(1)
+    t = np.arange(16000 * 3) / 16000
+    noise = 0.05 * rng.standard_normal(len(t))
+    tone = np.where(t > 2.0, 0.3 * np.sin(2 * np.pi * 440 * t), 0.0)
+    out = _run(NoiseSuppressor(), (noise + tone).astype(np.float32), 1600)
+
+    noise_only = slice(16000, 16000 * 2 - 512)
+    assert np.std(out[noise_only]) < 0.5 * np.std(noise[noise_only])
+    # Steady sounds are slowly learned as noise, so only the onset is kept in full
+    onset = slice(16000 * 2 + 512, int(16000 * 2.2))
+    assert np.std(out[onset]) > 0.8 * 0.3 / np.sqrt(2)
+
+
+@pytest.mark.parametrize("frames_per_block", [1, 5, 31, 155])
+def test_noise_floor_rises_at_the_same_speed_whatever_the_block_size(frames_per_block):
+    suppressor = NoiseSuppressor(rise_time=2.0)
+    bins = suppressor.frame_size // 2 + 1
+    suppressor._update_noise(np.full((8, bins), 1e-4))
+    # A louder, steady noise floor for 155 hops (~2.5 s)
+    for _ in range(155 // frames_per_block):
+        suppressor._update_noise(np.full((frames_per_block, bins), 1e-2))
+
+    target = 1e-2 * suppressor.min_bias
+    start = 1e-4 * suppressor.min_bias
+    expected = target - (target - start) * np.exp(-155 * suppressor.hop / 16000 / 2.0)
+    np.testing.assert_allclose(suppressor.noise_power, expected, rtol=1e-6)
+
+
+def test_odd_frame_size_is_rejected():
+    with pytest.raises(ValueError):
+        NoiseSuppressor(frame_size=511)
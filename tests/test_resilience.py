@@ -0,0 +1,133 @@
+import time
+
+import pytest
+
+from network.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, GuardedCall, LatencyTracker,
+)
+
+
+def _raise(error):
+    def fn():
+        raise error
+    return fn
+
+
+def test_breaker_opens_after_threshold_and_half_opens_for_one_trial():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # The trial call
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # Only one trial at a time
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_breaker_release_frees_the_trial_without_a_verdict():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_latency_tracker_needs_min_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.add(0.1)
+    tracker.add(0.3)
+    assert tracker.percentile(95) is None
+    tracker.add(0.2)
+    assert tracker.percentile(50) == 0.2
+
+
+def test_guarded_call_returns_result_and_records_latency():
+    guard = GuardedCall("test", budget=1.0, hedge=False)
+    assert guard.call(lambda: 42) == 42
+    assert len(guard.tracker.samples) == 1
+    assert guard.breaker.state == "closed"
+
+
+def test_upstream_errors_count_against_the_breaker():
+    guard = GuardedCall("test", budget=1.0, hedge=False, breaker=CircuitBreaker("test", failure_threshold=2))
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            guard.call(_raise(ConnectionError("down")))
+    assert guard.breaker.state == "open"
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        guard.call(lambda: calls.append(1))
+    assert not calls
+
+
+def test_bugs_propagate_without_touching_the_breaker():
+    guard = GuardedCall("test", budget=1.0, hedge=False, breaker=CircuitBreaker("test", failure_threshold=1))
+    with pytest.raises(AttributeError):
+        guard.call(_raise(AttributeError("no such method")))
+    assert guard.breaker.state == "closed"
+    assert guard.breaker.failures == 0
+
+
+def test_custom_failure_types():
+    class ApiError(Exception):
+        pass
+
+    guard = GuardedCall("test", budget=1.0, hedge=False, failures=(ApiError,),
+                        breaker=CircuitBreaker("test", failure_threshold=1))
+    with pytest.raises(ApiError):
+        guard.call(_raise(ApiError("503")))
+    assert guard.breaker.state == "open"
+
+
+def test_deadline_exceeded_counts_as_failure():
+    guard = GuardedCall("test", budget=0.05, hedge=False)
+    with pytest.raises(DeadlineExceeded):
+        guard.call(lambda: time.sleep(0.5))
+    assert guard.breaker.failures == 1
+
+
+def test_slow_attempt_is_hedged():
+    tracker = LatencyTracker(min_samples=1)
+    tracker.add(0.01)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            time.sleep(1.0)
+            return "slow"
+        return "hedge"
+
+    guard = GuardedCall("test", budget=2.0, tracker=tracker, min_hedge_delay=0.02)
+    start = time.perf_counter()
+    assert guard.call(fn) == "hedge"
+    assert time.perf_counter() - start < 0.5
+
+
+def test_winning_hedge_records_its_own_latency():
+    tracker = LatencyTracker(min_samples=1)
+    tracker.add(0.2)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            time.sleep(1.0)
+            return "slow"
+        return "hedge"
+
+    guard = GuardedCall("test", budget=2.0, tracker=tracker)
+    assert guard.call(fn) == "hedge"
+    # The hedge started after ~0.2s of waiting and answered at once
+    assert tracker.samples[-1] < 0.1
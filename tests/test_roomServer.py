@@ -0,0 +1,240 @@
+import io
+import json
+import http.client
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from langroid.utils.object_registry import ObjectRegistry
+
+from benchmarks.fakeServers import FakeOpenAIServer, FakeTTSServer
+from languageModel.llm import DARSAgent, _object_id
+from music import musicLibrary
+from server.roomServer import RoomServer
+from speechSynthesis.speechSynthesis import TarsVoice
+from speechRecognition.batchTranscription import DEFAULT_MODEL_PATH, transcribe_bytes
+
+HAS_MODEL = (Path(DEFAULT_MODEL_PATH) / "am" / "final.mdl").exists()
+
+
+def _wav(samples: bytes, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(samples)
+    return buffer.getvalue()
+
+
+def _request(port: int, method: str, path: str, body: bytes = None, content_type: str = "application/json"):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        conn.request(method, path, body=body, headers={"Content-Type": content_type} if body else {})
+        response = conn.getresponse()
+        data = response.read()
+        kind = response.getheader("Content-Type", "")
+        return response.status, json.loads(data) if kind == "application/json" and data else data
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("DARS_LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setenv("ELEVENLABS_API_KEY", "test")
+    script = [
+        {"match": "mars", "replies": ["Cold and dusty."]},
+        {"match": "slowly", "replies": ["Eventually."], "first_token_delay": 0.8},
+        {"match": "halo", "replies": [
+            {"tool": {"name": "song_player", "arguments": {"state": True, "song": "halo"}}},
+            "Enjoy.",
+        ]},
+        {"match": "milk", "replies": [
+            {"tool": {"name": "todo_operation", "arguments": {"operation": "new", "item_name": "buy milk"}}},
+            "Added.",
+        ]},
+    ]
+    llm = FakeOpenAIServer(script, first_token_delay=0.0, token_delay=0.0).start()
+    yield llm
+    llm.stop()
+
+
+def _start(llm, **kwargs) -> RoomServer:
+    server = RoomServer(
+        port=0,
+        agent_factory=lambda config_dir: DARSAgent(api_key="test", api_base=f"{llm.url}/v1", no_cache=True,
+                                                   config_dir=config_dir),
+        **kwargs,
+    )
+    server.run_in_thread()
+    return server
+
+
+@pytest.fixture
+def server(env):
+    server = _start(env)
+    yield server
+    server.stop_thread()
+
+
+def _session(server) -> str:
+    status, created = _request(server.port, "POST", "/sessions", json.dumps({"room": "kitchen"}).encode())
+    assert status == 201
+    return f"/sessions/{created['session_id']}"
+
+
+def test_text_turn(server):
+    path = _session(server)
+    status, reply = _request(server.port, "POST", f"{path}/text", json.dumps({"text": "tell me about mars"}).encode())
+    assert status == 200
+    assert reply["reply"] == "Cold and dusty."
+    status, info = _request(server.port, "GET", path)
+    assert info["turns"] == 1
+
+
+def test_each_room_keeps_its_own_todos(server, tmp_path):
+    kitchen, garage = _session(server), _session(server)
+    status, reply = _request(server.port, "POST", f"{kitchen}/text",
+                             json.dumps({"text": "add buy milk to my todo list"}).encode())
+    assert status == 200 and reply["function"].startswith("Added todo item: buy milk")
+
+    rooms = tmp_path / ".config" / "DARS" / "rooms"
+    assert "buy milk" in (rooms / kitchen.rsplit("/", 1)[1] / "todolist" / "todos.csv").read_text()
+    assert not (rooms / garage.rsplit("/", 1)[1] / "todolist").exists()
+    assert not (tmp_path / ".config" / "DARS" / "todolist").exists()
+
+
+def test_music_plays_on_the_room_not_the_host(server, tmp_path, monkeypatch):
+    music_dir = tmp_path / ".config" / "DARS" / "music"
+    music_dir.mkdir(parents=True)
+    (music_dir / "Beyonce - Halo.wav").write_bytes(_wav(bytes(3200)))
+    library = musicLibrary.MusicLibrary()
+    library.scan()
+    monkeypatch.setattr(musicLibrary, "_library", library)
+    monkeypatch.setattr(musicLibrary, "_player", None)
+
+    playing, quiet = _session(server), _session(server)
+    status, reply = _request(server.port, "POST", f"{playing}/text", json.dumps({"text": "play halo"}).encode())
+    assert status == 200
+    assert reply["function"] == "Now playing: Beyonce - Halo"
+    assert reply["now_playing"] == {"title": "Halo", "artist": "Beyonce", "path": str(music_dir / "Beyonce - Halo.wav")}
+    assert _request(server.port, "GET", playing)[1]["now_playing"]["title"] == "Halo"
+    assert _request(server.port, "GET", quiet)[1]["now_playing"] is None
+    assert musicLibrary._player is None
+
+
+def test_delete_waits_for_a_run_that_outlived_its_turn(env, monkeypatch):
+    monkeypatch.setenv("DARS_LLM_BUDGET", "0.3")
+    server = _start(env)
+    try:
+        path = _session(server)
+        agent = server.sessions[path.rsplit("/", 1)[1]].agent
+        status, reply = _request(server.port, "POST", f"{path}/text", json.dumps({"text": "answer slowly"}).encode())
+        # The turn is answered locally while the run keeps going on its worker thread
+        assert status == 200 and agent.last_degraded == "DeadlineExceeded"
+        assert agent._task_lock.locked()
+
+        status, _ = _request(server.port, "DELETE", path)
+        assert status == 200
+        assert not agent._task_lock.locked()
+        agent_id = _object_id(agent.agent)
+        assert not any(doc_id == agent_id or getattr(getattr(obj, "metadata", None), "agent_id", None) == agent_id
+                       for doc_id, obj in ObjectRegistry.registry.items())
+        assert _request(server.port, "GET", path)[0] == 404
+    finally:
+        server.stop_thread()
+
+
+def test_a_room_flooding_requests_is_turned_away_after_queue_timeout(env):
+    server = _start(env, queue_timeout=0.2)
+    try:
+        path = _session(server)
+        body = json.dumps({"text": "answer slowly"}).encode()
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(lambda _: _request(server.port, "POST", f"{path}/text", body), range(3)))
+        statuses = sorted(status for status, _ in results)
+        assert statuses == [200, 503, 503]
+        assert {"error": "Room busy"} in [reply for _, reply in results]
+    finally:
+        server.stop_thread()
+
+
+def test_a_session_over_its_memory_caps_is_recycled(env):
+    server = _start(env, max_session_responses=0)
+    try:
+        path = _session(server)
+        session = server.sessions[path.rsplit("/", 1)[1]]
+        body = json.dumps({"text": "tell me about mars"}).encode()
+        assert _request(server.port, "POST", f"{path}/text", body)[0] == 200
+        first_agent = session.agent.agent
+
+        # Pretend the release after the turn never ran
+        session.agent.task.response_sequence.extend([None, None])
+        assert _request(server.port, "POST", f"{path}/text", body)[0] == 200
+        info = _request(server.port, "GET", path)[1]
+        assert info["responses"] == 0
+        assert info["recycles"] == 0  # Compaction was enough
+
+        server.max_session_documents = -1
+        assert _request(server.port, "POST", f"{path}/text", body)[0] == 200
+        info = _request(server.port, "GET", path)[1]
+        assert info["recycles"] == 1
+        assert session.agent.agent is not first_agent
+    finally:
+        server.stop_thread()
+
+
+def test_a_session_over_its_caps_is_refused_while_a_run_holds_its_agent(env):
+    server = _start(env, max_session_documents=-1)
+    try:
+        path = _session(server)
+        agent = server.sessions[path.rsplit("/", 1)[1]].agent
+        with agent._task_lock:
+            status, body = _request(server.port, "POST", f"{path}/text", json.dumps({"text": "mars"}).encode())
+        assert (status, body) == (503, {"error": "Session over its memory limit"})
+    finally:
+        server.stop_thread()
+
+
+@pytest.mark.parametrize("error_rate, status", [(0.0, 200), (1.0, 503)])
+def test_speech_returns_audio_or_an_error(env, error_rate, status):
+    tts = FakeTTSServer(first_byte_delay=0.0, chunk_delay=0.0, error_rate=error_rate).start()
+    server = _start(env, tars_voice=TarsVoice(base_url=tts.url))
+    try:
+        status_, body = _request(server.port, "POST", f"{_session(server)}/speech",
+                                 json.dumps({"text": "Hello there."}).encode())
+        assert status_ == status
+        if status == 200:
+            assert isinstance(body, bytes) and body
+        else:
+            assert body == {"error": "Voice unavailable"}
+    finally:
+        server.stop_thread()
+        tts.stop()
+
+
+def test_transcribe_bytes_rejects_what_is_not_mono_pcm_wav():
+    assert "error" in transcribe_bytes(b"not a wav file")
+    record = transcribe_bytes(_wav(bytes(3200), channels=2), name="upload")
+    assert record == {"file": "upload", "error": "Audio must be mono 16-bit PCM WAV"}
+
+
+def test_audio_needs_a_model(server):
+    status, body = _request(server.port, "POST", f"{_session(server)}/audio", _wav(bytes(32000)), "audio/wav")
+    assert status == 501
+
+
+@pytest.mark.skipif(not HAS_MODEL, reason="Vosk model files not present")
+def test_audio_turn_posts_real_wav_bytes(env):
+    server = _start(env, model_path=DEFAULT_MODEL_PATH)
+    try:
+        path = _session(server)
+        status, body = _request(server.port, "POST", f"{path}/audio", _wav(bytes(32000)), "audio/wav")
+        assert (status, body) == (422, {"error": "No speech recognized"})
+        status, body = _request(server.port, "POST", f"{path}/audio", b"RIFF garbage", "audio/wav")
+        assert status == 400
+    finally:
+        server.stop_thread()
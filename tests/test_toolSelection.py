@@ -0,0 +1,28 @@
+from languageModel.toolSelection import ToolSelector, TOOL_KEYWORDS
+
+TOOLS = set(TOOL_KEYWORDS)
+
+
+def test_match_uses_whole_words_and_phrases():
+    selector = ToolSelector(TOOLS)
+    assert selector.match("turn on the room fan") == {"appliance_control"}
+    assert selector.match("add a to-do for tomorrow") == {"todo_operation"}
+    assert selector.match("play veridis quo") == {"song_player"}
+    assert selector.match("what a fantastic day") == set()  # "fan" only as a word
+
+
+def test_unmatched_message_gets_every_tool():
+    selector = ToolSelector(TOOLS)
+    assert selector.select("yes, go ahead") == TOOLS
+
+
+def test_previous_tools_stay_offered_for_one_turn():
+    selector = ToolSelector(TOOLS)
+    selector.select("turn on the fan")
+    assert selector.select("and play some music too") == {"appliance_control", "song_player"}
+    assert selector.select("stop the music") == {"song_player"}
+
+
+def test_keywords_for_unknown_tools_are_ignored():
+    selector = ToolSelector({"song_player"})
+    assert selector.match("turn on the fan and play a song") == {"song_player"}
@@ -0,0 +1,122 @@
+import socket
+
+import pytest
+
+from telemetry.tracing import LogExporter, PrometheusExporter, Tracer, configure_from_env, tracer
+
+
+class Collector:
+    def __init__(self):
+        self.turns = []
+
+    def export(self, turn) -> None:
+        self.turns.append(turn)
+
+
+@pytest.fixture
+def traced():
+    collector = Collector()
+    local = Tracer()
+    local.exporters.append(collector)
+    return local, collector
+
+
+@pytest.fixture
+def exporters(monkeypatch):
+    monkeypatch.setenv("DARS_TRACE_LOG", "0")
+    monkeypatch.setattr(tracer, "exporters", [])
+    yield tracer.exporters
+    for exporter in tracer.exporters:
+        if isinstance(exporter, PrometheusExporter):
+            exporter.stop()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_metrics_endpoint_is_opt_in(exporters, monkeypatch):
+    monkeypatch.delenv("DARS_METRICS_PORT", raising=False)
+    configure_from_env()
+    assert not any(isinstance(e, PrometheusExporter) for e in exporters)
+
+    monkeypatch.setenv("DARS_METRICS_PORT", str(_free_port()))
+    configure_from_env()
+    assert sum(isinstance(e, PrometheusExporter) for e in exporters) == 1
+
+
+def test_configure_from_env_is_idempotent(exporters, monkeypatch, tmp_path):
+    monkeypatch.setenv("DARS_LOG_DIR", str(tmp_path))
+    monkeypatch.setenv("DARS_TRACE_LOG", "traces-test")
+    monkeypatch.setenv("DARS_METRICS_PORT", str(_free_port()))
+    for _ in range(3):
+        configure_from_env()
+    assert sum(isinstance(e, LogExporter) for e in exporters) == 1
+    assert sum(isinstance(e, PrometheusExporter) for e in exporters) == 1
+
+
+def test_spans_nest_under_their_parent_and_export_once_per_turn(traced):
+    local, collector = traced
+    with local.span("turn") as root:
+        with local.span("llm") as llm:
+            with local.span("tool.fan") as tool:
+                assert local.current_turn_id == root.turn.turn_id
+        with local.span("tts"):
+            pass
+    assert local.current_span is None
+
+    assert len(collector.turns) == 1
+    spans = {span.name: span for span in collector.turns[0].spans}
+    assert root.parent_id is None
+    assert llm.parent_id == root.span_id
+    assert tool.parent_id == llm.span_id
+    assert spans["tts"].parent_id == root.span_id
+    assert all(span.turn is root.turn for span in spans.values())
+    assert all(span.duration >= 0 for span in spans.values())
+
+
+def test_turn_starts_a_new_turn_and_restores_the_open_span(traced):
+    local, collector = traced
+    with local.span("outer") as outer:
+        with local.turn(room="kitchen") as inner:
+            assert inner.parent_id is None
+            assert inner.turn is not outer.turn
+            assert inner.attributes == {"room": "kitchen"}
+        assert local.current_span is outer
+        assert len(collector.turns) == 1
+    assert [turn.spans[-1].name for turn in collector.turns] == ["turn", "outer"]
+
+
+def test_errors_are_attributed_to_the_span_that_raised(traced):
+    local, collector = traced
+    with pytest.raises(ValueError):
+        with local.span("turn"):
+            with local.span("tool.fan"):
+                raise ValueError("broken")
+    spans = {span.name: span for span in collector.turns[0].spans}
+    assert spans["tool.fan"].attributes["error"] == "ValueError"
+    assert spans["turn"].attributes["error"] == "ValueError"
+    assert local._counters[("span_errors", (("span", "tool.fan"),))] == 1
+
+
+def test_render_prometheus(traced):
+    local, _ = traced
+    local.incr("turns")
+    local.incr("hedged_requests", upstream="elevenlabs")
+    local.set_gauge("memory_rss_bytes", 1048576)
+    with local.span("turn"):
+        pass
+    lines = local.render_prometheus().splitlines()
+
+    assert "# TYPE dars_turns_total counter" in lines
+    assert "dars_turns_total 1" in lines
+    assert 'dars_hedged_requests_total{upstream="elevenlabs"} 1' in lines
+    assert "# TYPE dars_memory_rss_bytes gauge" in lines
+    assert "dars_memory_rss_bytes 1048576" in lines
+    assert "# TYPE dars_span_duration_seconds histogram" in lines
+    assert 'dars_span_duration_seconds_bucket{span="turn",le="0.005"} 1' in lines
+    assert 'dars_span_duration_seconds_bucket{span="turn",le="+Inf"} 1' in lines
+    assert 'dars_span_duration_seconds_count{span="turn"} 1' in lines
+    assert lines.count("# TYPE dars_turns_total counter") == 1